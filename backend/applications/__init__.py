@@ -4,9 +4,22 @@ from flask_cors import CORS
 from flask_jwt_extended import JWTManager
 from flask_restful import Api
 from applications.models import db, create_default_admin
+from applications.database import configure_engines, apply_sqlite_pragmas
+from applications.migrations import schema_cli, upgrade
 from applications.config import Config
 from applications.worker import celery
 from applications.api import cache
+from applications.occupancy import occupancy
+from applications.rollups import rollups_cli
+from applications.gate_events import events_cli
+from applications.cache_tags import register_cache_invalidation, init_local_caches
+from applications.authz import is_token_revoked
+from applications.passwords import hasher
+from applications.mailer import mailer
+from applications.outbox import outbox
+from applications.http_clients import http_clients
+from applications.export_progress import export_progress
+from applications.export_storage import export_storage
 
 
 def create_app():
@@ -16,16 +29,36 @@ def create_app():
     # Enable CORS for frontend (you may restrict origin in production)
     CORS(app, resources={r"/api/*": {"origins": "*"}})
 
+    configure_engines(app)
     db.init_app(app)
+    with app.app_context():
+        apply_sqlite_pragmas(app, db.engines)
     cache.init_app(app)
+    init_local_caches(app)
+    hasher.init_app(app)
+    mailer.init_app(app)
+    outbox.init_app(app)
+    http_clients.init_app(app)
+    export_progress.init_app(app)
+    export_storage.init_app(app)
+    occupancy.init_app(app)
+
+    app.cli.add_command(rollups_cli)
+    app.cli.add_command(schema_cli)
+    app.cli.add_command(events_cli)
 
     jwt = JWTManager(app)
+    jwt.token_in_blocklist_loader(is_token_revoked)
     api = Api(app)
 
     with app.app_context():
-        db.create_all()
+        db.create_all(bind_key=None)  # the reader bind has no tables of its own
+        upgrade()
         create_default_admin()
 
+    # Invalidate tagged cache entries whenever tracked models are committed
+    register_cache_invalidation(db.session)
+
     # Import routes *after* app and db are ready
     from applications.routes import register_routes, register_extra_routes
     register_routes(api)
@@ -0,0 +1,37 @@
+# applications/activity.py
+from datetime import datetime, timedelta
+from sqlalchemy import case, or_, update
+from applications.models import db, Users
+
+# Users' last-activity columns, kept current on booking and login so that the
+# daily reminders select inactive users with one indexed range query.
+# Written with Core UPDATEs: the columns are not part of any cached payload.
+
+# A login only rewrites last_seen_at when the stored value is older than this
+LAST_SEEN_RESOLUTION = timedelta(minutes=15)
+
+
+def record_reservation_activity(user_id, parked_at):
+    """Advance last_reservation_at (never backwards) in the caller's transaction."""
+    users = Users.__table__
+    last = users.c.last_reservation_at
+    db.session.execute(
+        update(users)
+        .where(users.c.id == user_id)
+        .values(last_reservation_at=case((or_(last.is_(None), last < parked_at), parked_at), else_=last))
+    )
+
+
+def record_login(user, now=None):
+    """Stamp last_seen_at; returns True if a write was queued (the caller commits)."""
+    now = now or datetime.utcnow()
+    if user.last_seen_at and now - user.last_seen_at < LAST_SEEN_RESOLUTION:
+        return False
+    users = Users.__table__
+    db.session.execute(update(users).where(users.c.id == user.id).values(last_seen_at=now))
+    return True
+
+
+def inactive_users_filter(cutoff):
+    """Criteria for users who have not booked since `cutoff` (including never)."""
+    return or_(Users.last_reservation_at.is_(None), Users.last_reservation_at < cutoff)
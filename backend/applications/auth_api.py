@@ -1,10 +1,19 @@
 from flask import request
 from flask_restful import Resource, abort
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
-from werkzeug.security import check_password_hash, generate_password_hash
+from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity, get_jwt
 from applications.models import Users, db
+from applications.authz import user_required, revoke_token
+from applications.passwords import hasher, HashingBusy
+from applications.activity import record_login
 import re
 
+# Seconds a client should wait when the hashing queue is full
+HASH_RETRY_AFTER = 1
+
+
+def hashing_busy_response():
+    return {"message": "Server busy, please retry shortly"}, 503, {"Retry-After": str(HASH_RETRY_AFTER)}
+
 class LoginAPI(Resource):
     def _validate_fields(self, email, password):
         if not email:
@@ -30,9 +39,18 @@ class LoginAPI(Resource):
         if not user:
             abort(404, message="User not found")
 
-        # Password check
-        if not check_password_hash(user.password, password):
-            abort(401, message="Incorrect password")
+        # Password check (and transparent upgrade of outdated hash parameters)
+        try:
+            if not hasher.verify(user.password, password):
+                abort(401, message="Incorrect password")
+            if hasher.needs_rehash(user.password):
+                user.password = hasher.hash(password)
+                db.session.commit()
+        except HashingBusy:
+            return hashing_busy_response()
+
+        if record_login(user):
+            db.session.commit()
 
         # Create JWT token
         token = create_access_token(
@@ -88,7 +106,10 @@ class SignupAPI(Resource):
         self._validate_email(email)
 
         # Create user
-        hashed_pw = generate_password_hash(password)
+        try:
+            hashed_pw = hasher.hash(password)
+        except HashingBusy:
+            return hashing_busy_response()
         new_user = Users(name=name, email=email, password=hashed_pw, is_admin=False)
         db.session.add(new_user)
         db.session.commit()
@@ -96,6 +117,13 @@ class SignupAPI(Resource):
         return {"message": "User signup successful"}, 201
 
 
+class LogoutAPI(Resource):
+    @user_required
+    def post(self):
+        revoke_token(get_jwt())
+        return {"message": "User logged out successfully"}, 200
+
+
 class ProfileAPI(Resource):
     @jwt_required()
     def get(self):
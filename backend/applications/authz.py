@@ -0,0 +1,90 @@
+# applications/authz.py
+import time
+import redis
+from collections import namedtuple
+from functools import wraps
+from flask import current_app
+from flask_jwt_extended import get_jwt, get_jwt_identity, verify_jwt_in_request
+from flask_restful import abort
+from applications.api import cache
+from applications.cache_tags import LocalLRU
+
+# Identity and role as signed into the access token by LoginAPI
+Principal = namedtuple("Principal", ["id", "is_admin"])
+
+REVOKED_JTI_KEY = "revoked_jti:{}"
+DELETED_USER_KEY = "deleted_user:{}"
+
+# Short-lived per-process memo of revocation checks, so most requests skip Redis too.
+# revoke_token/mark_user_deleted only clear this worker's memo: other workers
+# keep accepting a revoked token for up to the TTL, so it is the cross-worker
+# revocation bound (10 seconds).
+principal_cache = LocalLRU(max_entries=4096, ttl=10, enabled=True)
+
+
+def current_principal():
+    """The authenticated caller, built from JWT claims without touching the database."""
+    return Principal(int(get_jwt_identity()), bool(get_jwt().get("is_admin", False)))
+
+
+def user_required(fn):
+    """Require a valid, non-revoked access token."""
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        verify_jwt_in_request()
+        return fn(*args, **kwargs)
+    return wrapper
+
+
+def admin_required(fn):
+    """Require a valid, non-revoked access token carrying the is_admin claim."""
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        verify_jwt_in_request()
+        if not get_jwt().get("is_admin"):
+            abort(403, message="Admin access required")
+        return fn(*args, **kwargs)
+    return wrapper
+
+
+def _token_ttl():
+    return int(current_app.config["JWT_ACCESS_TOKEN_EXPIRES"].total_seconds())
+
+
+def revoke_token(jwt_payload):
+    """Blocklist one token (logout) until it would have expired anyway."""
+    cache.set(REVOKED_JTI_KEY.format(jwt_payload["jti"]), 1, timeout=_token_ttl())
+    principal_cache.clear()
+
+
+def mark_user_deleted(user_id):
+    """
+    Reject every outstanding token of a deleted user. The marker holds the
+    deletion time and only tokens issued up to then are refused: SQLite can
+    hand the id to a new signup, whose own tokens must stay valid while the
+    old ones must not come back.
+    """
+    cache.set(DELETED_USER_KEY.format(user_id), int(time.time()), timeout=_token_ttl())
+    principal_cache.clear()
+
+
+def is_token_revoked(jwt_header, jwt_payload):
+    """
+    flask-jwt-extended blocklist loader: one cache round trip at most, never
+    SQL. Fails closed with 503 while the cache is unreachable: logouts are
+    only recorded there, so there is nothing to fall back on.
+    """
+    key = (jwt_payload.get("jti"), jwt_payload.get("sub"))
+    revoked = principal_cache.get(key)
+    if revoked is LocalLRU.MISSING:
+        try:
+            logged_out, deleted_at = cache.get_many(
+                REVOKED_JTI_KEY.format(key[0]), DELETED_USER_KEY.format(key[1])
+            )
+        except redis.RedisError:
+            current_app.logger.warning("Token revocation check failed: cache unavailable")
+            abort(503, message="Service temporarily unavailable, please retry shortly")
+        # iat has one-second resolution: a token from the deletion second is refused too
+        revoked = bool(logged_out) or (deleted_at is not None and jwt_payload.get("iat", 0) <= deleted_at)
+        principal_cache.set(key, revoked)
+    return revoked
@@ -0,0 +1,222 @@
+# applications/cache_tags.py
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app
+from sqlalchemy import event, select
+from applications.api import cache
+from applications.models import ParkingLot, ParkingSpot, Reservation, Users
+
+# Tags used by cached endpoints:
+#   "lots"        - every lot/spot listing (occupancy changes included)
+#   "lot:<id>"    - one lot and its spots
+#   "lot_catalog" - lot names/prices (user summaries show lot names)
+#   "summary"     - global admin summary
+#   "user:<id>"   - everything derived from one user's reservations
+TAG_VERSION_KEY = "tagver:{}"
+DEFAULT_TAGGED_TIMEOUT = 3600
+
+
+class LocalLRU:
+    """
+    Optional in-process L1 in front of the shared cache (L2), bounded by
+    entry count and TTL. Tagged keys embed tag versions read from L2, so a
+    change in any process makes other processes' L1 entries unreachable;
+    the TTL bounds memory and covers version counters lost on an L2 flush.
+    The versions themselves are memoised for CACHE_L1_VERSION_TTL seconds
+    (see version_cache), which bounds how long another process serves a
+    stale entry.
+    """
+
+    MISSING = object()
+
+    def __init__(self, max_entries=512, ttl=30, enabled=False):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.enabled = enabled
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+
+    def init_app(self, app):
+        self.enabled = app.config.get("CACHE_L1_ENABLED", False)
+        self.max_entries = app.config.get("CACHE_L1_MAX_ENTRIES", self.max_entries)
+        self.ttl = app.config.get("CACHE_L1_TTL", self.ttl)
+        self.clear()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.stats["misses"] += 1
+                return self.MISSING
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._data[key]
+                self.stats["expirations"] += 1
+                self.stats["misses"] += 1
+                return self.MISSING
+            self._data.move_to_end(key)
+            self.stats["hits"] += 1
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    def pop(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+local_cache = LocalLRU()
+# Tag versions for tagged_key while L1 is enabled, so an L1 hit needs no round trip to L2
+version_cache = LocalLRU(max_entries=1024, ttl=1)
+shared_stats = {"hits": 0, "misses": 0}
+_shared_stats_lock = threading.Lock()
+
+
+def init_local_caches(app):
+    local_cache.init_app(app)
+    version_cache.enabled = local_cache.enabled
+    version_cache.ttl = app.config.get("CACHE_L1_VERSION_TTL", version_cache.ttl)
+    version_cache.clear()
+
+
+def cache_get(key):
+    """Read through L1 (if enabled) then the shared Flask-Caching backend."""
+    if local_cache.enabled:
+        value = local_cache.get(key)
+        if value is not LocalLRU.MISSING:
+            return value
+
+    value = cache.get(key)
+    with _shared_stats_lock:
+        shared_stats["hits" if value is not None else "misses"] += 1
+    if value is not None and local_cache.enabled:
+        local_cache.set(key, value)
+    return value
+
+
+def cache_set(key, value, timeout=None):
+    if timeout is None:
+        timeout = current_app.config.get("CACHE_TAGGED_TIMEOUT", DEFAULT_TAGGED_TIMEOUT)
+    cache.set(key, value, timeout=timeout)
+    if local_cache.enabled:
+        local_cache.set(key, value)
+
+
+def cache_stats():
+    """Per-process hit/miss/eviction counters for both tiers."""
+    return {
+        "l1": {**local_cache.stats, "enabled": local_cache.enabled, "size": len(local_cache)},
+        "l1_versions": {**version_cache.stats, "size": len(version_cache)},
+        "l2": dict(shared_stats),
+    }
+
+
+def tag_versions(tags):
+    values = cache.get_many(*[TAG_VERSION_KEY.format(tag) for tag in tags])
+    return [value or 0 for value in values]
+
+
+def local_tag_versions(tags):
+    """tag_versions() through version_cache; only versions missing there are read from L2."""
+    if not version_cache.enabled:
+        return tag_versions(tags)
+    versions = {tag: version_cache.get(tag) for tag in tags}
+    missing = [tag for tag, version in versions.items() if version is LocalLRU.MISSING]
+    if missing:
+        for tag, version in zip(missing, tag_versions(missing)):
+            version_cache.set(tag, version)
+            versions[tag] = version
+    return [versions[tag] for tag in tags]
+
+
+def tagged_key(name, tags):
+    """Cache key embedding the current version of every tag; bumping a tag orphans it."""
+    versions = local_tag_versions(tags)
+    return name + "|" + ",".join(f"{tag}@{version}" for tag, version in zip(tags, versions))
+
+
+def cached(name, tags, compute, timeout=None):
+    """Return the cached value for (name, tags), computing and storing it on a miss."""
+    key = tagged_key(name, tags)
+    value = cache_get(key)
+    if value is None:
+        value = compute()
+        cache_set(key, value, timeout)
+    return value
+
+
+def invalidate(*tags):
+    """Bump tag versions so every key built with them is ignored from now on."""
+    for tag in set(tags):
+        cache.cache.inc(TAG_VERSION_KEY.format(tag))
+        version_cache.pop(tag)  # this process sees its own changes at once
+
+
+def invalidate_on_commit(session, *tags):
+    """Queue tags for the session's next commit (for Core statements the ORM events do not see)."""
+    session.info.setdefault("cache_tags", set()).update(tags)
+
+
+def _lot_of_spot(session, spot_id):
+    if spot_id is None:
+        return None
+    spot = session.identity_map.get(session.identity_key(ParkingSpot, spot_id))
+    if spot is not None:
+        return spot.lot_id
+    return session.connection().execute(
+        select(ParkingSpot.lot_id).where(ParkingSpot.id == spot_id)
+    ).scalar()
+
+
+def tags_for(session, obj):
+    if isinstance(obj, ParkingLot):
+        return {"lots", f"lot:{obj.id}", "lot_catalog", "summary"}
+    if isinstance(obj, ParkingSpot):
+        return {"lots", f"lot:{obj.lot_id}", "summary"}
+    if isinstance(obj, Reservation):
+        tags = {"lots", "summary", f"user:{obj.user_id}"}
+        lot_id = _lot_of_spot(session, obj.spot_id)
+        if lot_id:
+            tags.add(f"lot:{lot_id}")
+        return tags
+    if isinstance(obj, Users):
+        return {f"user:{obj.id}"}
+    return set()
+
+
+def _collect_tags(session, flush_context):
+    pending = session.info.setdefault("cache_tags", set())
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        pending |= tags_for(session, obj)
+
+
+def _flush_tags(session):
+    tags = session.info.pop("cache_tags", None)
+    if tags:
+        invalidate(*tags)
+
+
+def _drop_tags(session):
+    session.info.pop("cache_tags", None)
+
+
+def register_cache_invalidation(session):
+    """Invalidate cache tags for every committed change to the tracked models."""
+    event.listen(session, "after_flush", _collect_tags)
+    event.listen(session, "after_commit", _flush_tags)
+    event.listen(session, "after_rollback", _drop_tags)
@@ -8,18 +8,92 @@ class Config:
     JWT_SECRET_KEY = "jwt-super-secret"
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=1)
 
-    SQLALCHEMY_DATABASE_URI = "sqlite:///" + os.path.join(base_dir, "database.sqlite3")
+    # Password hashing: werkzeug method string in its normalized form (as stored
+    # in the hash prefix); users with older parameters are rehashed on login
+    PASSWORD_HASH_METHOD = "scrypt:32768:8:1"
+    PASSWORD_HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", 2))  # 0 = hash inline
+    PASSWORD_HASH_MAX_PENDING = 32  # queued hash jobs before answering 503
+    PASSWORD_HASH_TIMEOUT = 10  # seconds
+
+    SQLALCHEMY_DATABASE_URI = os.environ.get(
+        "DATABASE_URL", "sqlite:///" + os.path.join(base_dir, "database.sqlite3")
+    )
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # Engine profile: "sqlite-wal" (WAL + pragmas, separate reader pool),
+    # "sqlite-default" (stock SQLite settings) or "server" (pooled server database)
+    DB_PROFILE = os.environ.get("DB_PROFILE", "sqlite-wal")
+    DATABASE_READ_URL = os.environ.get("DATABASE_READ_URL")  # optional read replica
+    SQLITE_BUSY_TIMEOUT_MS = 5000
+    SQLITE_MMAP_SIZE = 256 * 1024 * 1024
+    DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 10))
+    DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", 20))
+    DB_POOL_RECYCLE = 1800  # seconds
+
     # Redis cache configuration
     CACHE_TYPE = "RedisCache"
     CACHE_REDIS_HOST = "localhost"
     CACHE_REDIS_PORT = 6379
     CACHE_REDIS_DB = 0
     CACHE_DEFAULT_TIMEOUT = 300  # 5 min expiry
+    CACHE_TAGGED_TIMEOUT = 3600  # tagged entries are invalidated on change, so they can live long
+
+    # Optional in-process L1 cache in front of Redis for hot read endpoints
+    CACHE_L1_ENABLED = os.environ.get("CACHE_L1_ENABLED", "0") == "1"
+    CACHE_L1_MAX_ENTRIES = 512
+    CACHE_L1_TTL = 30  # seconds
+    CACHE_L1_VERSION_TTL = 1  # seconds another process may serve an entry after its tags changed
 
     # Celery + Redis backend
     CELERY_BROKER_URL = "redis://localhost:6379/0"
     CELERY_RESULT_BACKEND = "redis://localhost:6379/1"
+    CELERY_RESULT_EXPIRES = 24 * 3600  # seconds; matches EXPORT_TTL so results never outlive their files
     CELERY_TIMEZONE = "Asia/Kolkata"  # match your timezone
     CELERY_ENABLE_UTC = False
+
+    # Outgoing mail (pooled SMTP transport, see applications/mailer.py)
+    SMTP_HOST = os.environ.get("SMTP_HOST", "localhost")
+    SMTP_PORT = int(os.environ.get("SMTP_PORT", 1025))
+    SMTP_SENDER = "noreply@parkingapp.com"
+    SMTP_CONCURRENCY = int(os.environ.get("SMTP_CONCURRENCY", 4))  # parallel connections per process
+    SMTP_MAX_MESSAGES_PER_CONNECTION = 100  # reconnect after this many (servers cap per-session messages)
+    SMTP_TIMEOUT = 10  # seconds
+
+    # Monthly report templates (compiled once per worker, bytecode cached on disk)
+    REPORT_TEMPLATE_DIR = os.environ.get(
+        "REPORT_TEMPLATE_DIR", os.path.normpath(os.path.join(base_dir, "..", "..", "templates"))
+    )
+    REPORT_TEMPLATE_CACHE_DIR = os.environ.get("REPORT_TEMPLATE_CACHE_DIR")  # None = system temp dir
+
+    # Notification outbox (see applications/outbox.py)
+    OUTBOX_RATE_LIMITS = {  # channel -> (messages per second, burst), shared by all workers
+        "email": (20, 40),
+        "gchat": (1, 5),  # Google Chat allows ~1 message/second per space
+        "sms": (5, 10),
+    }
+    OUTBOX_BATCH_SIZE = 200  # messages claimed per round
+    OUTBOX_MAX_ATTEMPTS = 5
+    OUTBOX_RETRY_BASE = 30  # seconds before the first retry, doubled per attempt
+    OUTBOX_RETRY_MAX = 3600
+    OUTBOX_CLAIM_TIMEOUT = 300  # seconds before a claimed, unfinished message is requeued
+    OUTBOX_DRAIN_SECONDS = 25  # each drain run stops after this long (beat starts one every 30s)
+    OUTBOX_RETENTION_DAYS = 7  # finished messages (and their dedupe keys) are kept this long
+
+    # Google Chat / Twilio delivery (pooled keep-alive clients, see applications/http_clients.py)
+    HTTP_POOL_SIZE = 10  # keep-alive connections per host per process
+    HTTP_TIMEOUT = 5  # seconds
+    GCHAT_DIGEST_WINDOW = int(os.environ.get("GCHAT_DIGEST_WINDOW", 0))  # seconds; > 0 coalesces alerts per webhook
+    GCHAT_DIGEST_MAX_CHARS = 4000  # longer digests are split into several posts
+
+    # Export reuse (see applications/export_reuse.py)
+    EXPORT_REUSE_TTL = 3600  # seconds a finished export is handed out again for identical requests
+    EXPORT_REUSE_PENDING_TTL = 600  # seconds an in-flight export is shared before a new request may restart it
+
+    # Export storage (see applications/export_storage.py; compacted by the compact-exports beat task)
+    EXPORTS_DIR = os.environ.get("EXPORTS_DIR", os.path.normpath(os.path.join(base_dir, "..", "exports")))
+    EXPORT_TTL = 24 * 3600  # seconds an export is kept
+    EXPORT_USER_QUOTA = 200 * 1024 ** 2  # bytes of exports per user; oldest evicted first
+    EXPORT_TOTAL_QUOTA = 5 * 1024 ** 3  # bytes of exports overall
+    EXPORT_COMPRESS_THRESHOLD = 8 * 1024 ** 2  # plain CSV/JSONL exports this large are gzipped
+    EXPORT_GRACE = 300  # seconds before a new export may be compressed
+    EXPORT_PART_TTL = 3600  # seconds before leftover chunk files of a failed admin export are removed
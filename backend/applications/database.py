@@ -0,0 +1,101 @@
+# applications/database.py
+from functools import wraps
+from flask import g, has_app_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+
+READ_BIND = "reader"
+
+
+class RoutingSession(Session):
+    """
+    Sends queries issued inside @read_only handlers to the "reader" bind
+    (a replica, or a separate connection pool on the same SQLite file);
+    everything else, and anything flushed, goes to the primary.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (
+            bind is None
+            and not self._flushing
+            and has_app_context()
+            and g.get("db_read_only")
+            and READ_BIND in self._db.engines
+        ):
+            return self._db.engines[READ_BIND]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def read_only(fn):
+    """Route this handler's queries to the read bind."""
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        previous = g.get("db_read_only", False)
+        g.db_read_only = True
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            g.db_read_only = previous
+    return wrapper
+
+
+def is_memory_sqlite(uri):
+    """True for SQLite URIs where each connection opens its own private database."""
+    return uri.startswith("sqlite") and (
+        uri.rstrip("/") in ("sqlite:", "sqlite:/") or ":memory:" in uri or "mode=memory" in uri
+    )
+
+
+def configure_engines(app):
+    """
+    Fill SQLALCHEMY_ENGINE_OPTIONS / SQLALCHEMY_BINDS from the DB_* settings.
+    Must run before db.init_app(app).
+    """
+    config = app.config
+    uri = config["SQLALCHEMY_DATABASE_URI"]
+    options = dict(config.get("SQLALCHEMY_ENGINE_OPTIONS") or {})
+
+    if not uri.startswith("sqlite"):
+        options.setdefault("pool_size", config["DB_POOL_SIZE"])
+        options.setdefault("max_overflow", config["DB_MAX_OVERFLOW"])
+        options.setdefault("pool_recycle", config["DB_POOL_RECYCLE"])
+        options.setdefault("pool_pre_ping", True)
+    config["SQLALCHEMY_ENGINE_OPTIONS"] = options
+
+    read_uri = config.get("DATABASE_READ_URL")
+    if read_uri is None and config["DB_PROFILE"] == "sqlite-wal" and uri.startswith("sqlite:///"):
+        # WAL lets readers run beside the writer; give them their own pool
+        read_uri = uri
+    if read_uri and is_memory_sqlite(read_uri):
+        # A second engine on an in-memory database would see an empty one of its own
+        read_uri = None
+    if read_uri:
+        binds = dict(config.get("SQLALCHEMY_BINDS") or {})
+        binds[READ_BIND] = {"url": read_uri, **options}
+        config["SQLALCHEMY_BINDS"] = binds
+
+
+def apply_sqlite_pragmas(app, engines):
+    """
+    Tune every SQLite connection on connect when DB_PROFILE is sqlite-wal.
+    Must run right after db.init_app(app), before any connection is opened.
+    """
+    if app.config["DB_PROFILE"] != "sqlite-wal":
+        return
+
+    pragmas = [
+        "PRAGMA journal_mode=WAL",
+        f"PRAGMA busy_timeout={int(app.config['SQLITE_BUSY_TIMEOUT_MS'])}",
+        "PRAGMA synchronous=NORMAL",
+        f"PRAGMA mmap_size={int(app.config['SQLITE_MMAP_SIZE'])}",
+    ]
+
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+    for engine in engines.values():
+        if engine.dialect.name == "sqlite":
+            event.listen(engine, "connect", on_connect)
@@ -0,0 +1,45 @@
+# applications/events_api.py
+from flask import request
+from flask_restful import Resource
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from applications.models import db
+from applications.authz import admin_required
+from applications.occupancy import occupancy
+from applications.gate_events import MAX_EVENTS, ingest_events
+
+
+class GateEventsAPI(Resource):
+    @admin_required
+    def post(self):
+        """
+        Admin/gate device: apply a batch of check-in/check-out events in one transaction.
+        Body: { "events": [ { "key": "<idempotency key>", "type": "check_in" | "check_out",
+                              "reservation_id": 1, "timestamp": "<ISO 8601, optional>" }, ... ] }
+        Returns per-event results in request order: applied / duplicate / rejected.
+        """
+        data = request.get_json(silent=True) or {}
+        events = data.get("events")
+        if not isinstance(events, list) or not events:
+            return {"error": "events must be a non-empty list"}, 400
+        if len(events) > MAX_EVENTS:
+            return {"error": f"At most {MAX_EVENTS} events per request"}, 400
+
+        # A concurrent request may store the same key first; the retry then reports it as duplicate
+        for attempt in range(2):
+            try:
+                results, changes = ingest_events(events)
+                db.session.commit()
+                break
+            except IntegrityError:
+                db.session.rollback()
+                if attempt:
+                    return {"error": "Conflicting concurrent events, retry"}, 409
+            except SQLAlchemyError as e:
+                db.session.rollback()
+                return {"error": "Database error", "details": str(e)}, 500
+
+        occupancy.mark_many(changes)
+        counts = {"applied": 0, "duplicate": 0, "rejected": 0}
+        for result in results:
+            counts[result["status"]] += 1
+        return {"results": results, **counts}, 200
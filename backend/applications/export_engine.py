@@ -0,0 +1,225 @@
+# applications/export_engine.py
+import csv, gzip, json, os, shutil
+from datetime import datetime
+from sqlalchemy import func, select
+from applications.models import db, Reservation, ParkingSpot, ParkingLot
+from applications.database import read_only
+from applications.reservation_api import parse_iso_datetime
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet output is optional
+    pa = pq = None
+
+EXPORT_COLUMNS = [
+    "reservation_id",
+    "user_id",
+    "vehicle_number",
+    "lot_id",
+    "lot_name",
+    "spot_id",
+    "parking_timestamp",
+    "leaving_timestamp",
+    "parking_cost",
+]
+
+# Rows fetched from the database per round trip while streaming
+BATCH_SIZE = 2000
+
+EXPORT_FORMATS = ("csv", "jsonl", "parquet")
+
+
+def export_statement(user_id=None, filters=None, id_range=None):
+    """
+    SELECT of the exported reservation columns joined to spot/lot names.
+    - user_id: restrict to one user (None = every user)
+    - filters: optional dict with date_from/date_to on parking_timestamp
+    - id_range: optional inclusive (low, high) reservation id range
+    """
+    stmt = (
+        select(
+            Reservation.id,
+            Reservation.user_id,
+            Reservation.vehicle_number,
+            ParkingLot.id,
+            ParkingLot.prime_location_name,
+            Reservation.spot_id,
+            Reservation.parking_timestamp,
+            Reservation.leaving_timestamp,
+            Reservation.parking_cost,
+        )
+        .outerjoin(ParkingSpot, ParkingSpot.id == Reservation.spot_id)
+        .outerjoin(ParkingLot, ParkingLot.id == ParkingSpot.lot_id)
+        .order_by(Reservation.id)
+    )
+    return apply_export_filters(stmt, user_id, filters, id_range)
+
+
+def apply_export_filters(stmt, user_id=None, filters=None, id_range=None):
+    if user_id is not None:
+        stmt = stmt.where(Reservation.user_id == int(user_id))
+    if filters:
+        if filters.get("date_from"):
+            stmt = stmt.where(Reservation.parking_timestamp >= parse_iso_datetime(filters["date_from"]))
+        if filters.get("date_to"):
+            stmt = stmt.where(Reservation.parking_timestamp <= parse_iso_datetime(filters["date_to"]))
+    if id_range:
+        stmt = stmt.where(Reservation.id.between(*id_range))
+    return stmt
+
+
+def format_row(row):
+    return ["" if v is None else v.isoformat() if isinstance(v, datetime) else v for v in row]
+
+
+def format_record(row):
+    return {
+        col: v.isoformat() if isinstance(v, datetime) else v
+        for col, v in zip(EXPORT_COLUMNS, row)
+    }
+
+
+def parquet_available():
+    return pq is not None
+
+
+def export_extension(fmt="csv", compress=False):
+    # Parquet is compressed internally, so it is never gzipped on top
+    if fmt == "parquet":
+        return ".parquet"
+    return f".{fmt}" + (".gz" if compress else "")
+
+
+def open_export(path, compress=False, mode="w"):
+    """Open an export file for text writing, gzip-compressed on the fly if requested."""
+    if compress:
+        return gzip.open(path, mode + "t", newline="")
+    return open(path, mode, newline="")
+
+
+class CsvSink:
+    def __init__(self, path, compress=False, header=True):
+        self.file = open_export(path, compress)
+        self.writer = csv.writer(self.file)
+        if header:
+            self.writer.writerow(EXPORT_COLUMNS)
+
+    def write_batch(self, rows):
+        self.writer.writerows(format_row(r) for r in rows)
+
+    def close(self):
+        self.file.close()
+
+
+class JsonlSink:
+    def __init__(self, path, compress=False, header=True):
+        self.file = open_export(path, compress)
+
+    def write_batch(self, rows):
+        self.file.writelines(json.dumps(format_record(r)) + "\n" for r in rows)
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetSink:
+    def __init__(self, path, compress=False, header=True):
+        self.schema = pa.schema([
+            ("reservation_id", pa.int64()),
+            ("user_id", pa.int64()),
+            ("vehicle_number", pa.string()),
+            ("lot_id", pa.int64()),
+            ("lot_name", pa.string()),
+            ("spot_id", pa.int64()),
+            ("parking_timestamp", pa.timestamp("us")),
+            ("leaving_timestamp", pa.timestamp("us")),
+            ("parking_cost", pa.float64()),
+        ])
+        self.writer = pq.ParquetWriter(path, self.schema)
+
+    def write_batch(self, rows):
+        # One row group per database batch keeps memory bounded
+        columns = list(zip(*rows))
+        self.writer.write_table(pa.Table.from_arrays(
+            [pa.array(col, type=field.type) for col, field in zip(columns, self.schema)],
+            schema=self.schema,
+        ))
+
+    def close(self):
+        self.writer.close()
+
+
+SINKS = {"csv": CsvSink, "jsonl": JsonlSink, "parquet": ParquetSink}
+
+
+@read_only
+def write_rows(path, user_id=None, filters=None, id_range=None, compress=False, header=True, fmt="csv",
+               progress=None):
+    """
+    Stream matching reservations into an export file in BATCH_SIZE batches,
+    so memory stays flat regardless of export size. Returns the row count.
+    progress, if given, is called with the rows written so far after each batch.
+    """
+    stmt = export_statement(user_id, filters, id_range).execution_options(yield_per=BATCH_SIZE)
+    sink = SINKS[fmt](path, compress, header)
+    rows = 0
+    try:
+        for batch in db.session.execute(stmt).partitions():
+            sink.write_batch(batch)
+            rows += len(batch)
+            if progress:
+                progress(rows)
+    finally:
+        sink.close()
+    return rows
+
+
+@read_only
+def count_rows(user_id=None, filters=None):
+    """Number of reservations an export will contain (for progress percentages)."""
+    stmt = apply_export_filters(select(func.count(Reservation.id)), user_id, filters)
+    return db.session.execute(stmt).scalar()
+
+
+@read_only
+def id_ranges(chunks, user_id=None, filters=None):
+    """Split the matching reservation id space into at most `chunks` inclusive ranges."""
+    stmt = apply_export_filters(
+        select(func.min(Reservation.id), func.max(Reservation.id)), user_id, filters
+    )
+    low, high = db.session.execute(stmt).one()
+    if low is None:
+        return []
+    step = max((high - low + 1 + chunks - 1) // chunks, 1)
+    return [(start, min(start + step - 1, high)) for start in range(low, high + 1, step)]
+
+
+def merge_parts(path, parts, compress=False, fmt="csv"):
+    """
+    Combine headerless part files, in order, into the final export.
+    Text parts are appended byte-for-byte (concatenated gzip members form a
+    valid gzip stream, so nothing is recompressed); Parquet parts are
+    copied row group by row group.
+    """
+    if fmt == "parquet":
+        writer = None
+        for part in parts:
+            part_file = pq.ParquetFile(part)
+            if writer is None:
+                writer = pq.ParquetWriter(path, part_file.schema_arrow)
+            for i in range(part_file.num_row_groups):
+                writer.write_table(part_file.read_row_group(i))
+        if writer:
+            writer.close()
+    else:
+        if fmt == "csv":
+            with open_export(path, compress) as f:
+                csv.writer(f).writerow(EXPORT_COLUMNS)
+        with open(path, "ab") as out:
+            for part in parts:
+                with open(part, "rb") as f:
+                    shutil.copyfileobj(f, out)
+
+    for part in parts:
+        os.remove(part)
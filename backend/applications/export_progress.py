@@ -0,0 +1,151 @@
+# applications/export_progress.py
+import json
+import time
+import redis
+from flask import current_app
+
+STATE_KEY = "export:progress:{}"   # JSON snapshot of the latest state
+ROWS_KEY = "export:progress:{}:rows"  # shared row counter of parallel writers
+EVENTS_CHANNEL = "export:events:{}"  # pub/sub channel carrying every update
+TERMINAL_STATES = ("SUCCESS", "FAILURE")
+
+# Snapshots outlive the export so a late subscriber still gets the outcome
+STATE_TTL = 24 * 3600
+# Row updates are published at most this often (start and finish always are)
+PUBLISH_INTERVAL = 0.5  # seconds
+
+
+class ExportProgress:
+    """
+    Export progress pushed by the tasks (rows written, percent, ETA) and
+    read by the status/SSE endpoints, via Redis: a snapshot key per task and
+    a pub/sub channel for live updates, so clients are told about every
+    state change without polling the Celery result backend.
+    Uses the Redis instance configured by CACHE_REDIS_*; pass `client` to
+    init_app to use something else.
+    """
+
+    def __init__(self, client=None):
+        self._client = client
+
+    def init_app(self, app, client=None):
+        if client is not None:
+            self._client = client
+        elif self._client is None:
+            self._client = redis.Redis(
+                host=app.config.get("CACHE_REDIS_HOST", "localhost"),
+                port=app.config.get("CACHE_REDIS_PORT", 6379),
+                db=app.config.get("CACHE_REDIS_DB", 0),
+            )
+        app.extensions["export_progress"] = self
+
+    @property
+    def client(self):
+        return self._client
+
+    def _publish(self, task_id, state):
+        state["updated_at"] = time.time()
+        payload = json.dumps(state)
+        try:
+            pipe = self.client.pipeline()
+            pipe.set(STATE_KEY.format(task_id), payload, ex=STATE_TTL)
+            pipe.publish(EVENTS_CHANNEL.format(task_id), payload)
+            pipe.execute()
+        except redis.RedisError:
+            # Progress is best effort: the export itself must not fail on it
+            current_app.logger.warning(f"Could not publish progress for export {task_id}")
+
+    def get(self, task_id):
+        """Latest snapshot for a task, or None."""
+        try:
+            payload = self.client.get(STATE_KEY.format(task_id))
+        except redis.RedisError:
+            return None
+        return json.loads(payload) if payload else None
+
+    def queued(self, task_id, user_id):
+        """Record a just-enqueued export (so its owner is known before a worker picks it up)."""
+        self._publish(task_id, {
+            "task_id": task_id, "user_id": user_id, "state": "PENDING",
+            "rows": 0, "total": None, "percent": 0.0, "eta_seconds": None, "started_at": None,
+        })
+
+    def start(self, task_id, user_id, total):
+        self._publish(task_id, {
+            "task_id": task_id, "user_id": user_id, "state": "STARTED",
+            "rows": 0, "total": total, "percent": 0.0 if total else 100.0,
+            "eta_seconds": None, "started_at": time.time(),
+        })
+        return ProgressTracker(self, task_id, user_id, total)
+
+    def add_rows(self, task_id, count):
+        """Count rows written by one of several parallel writers; returns the new total (or None)."""
+        key = ROWS_KEY.format(task_id)
+        try:
+            pipe = self.client.pipeline()
+            pipe.incrby(key, count)
+            pipe.expire(key, STATE_TTL)
+            return pipe.execute()[0]
+        except redis.RedisError:
+            return None
+
+    def finish(self, task_id, result, state="SUCCESS"):
+        snapshot = self.get(task_id) or {"task_id": task_id}
+        snapshot.update(state=state, result=result, eta_seconds=0)
+        if state == "SUCCESS":
+            snapshot["rows"] = result.get("rows", snapshot.get("rows", 0))
+            snapshot["percent"] = 100.0
+        self._publish(task_id, snapshot)
+
+    def forget(self, task_id):
+        """Drop a task's snapshot and row counter (its export file is gone)."""
+        try:
+            self.client.delete(STATE_KEY.format(task_id), ROWS_KEY.format(task_id))
+        except redis.RedisError:
+            pass
+
+    def subscribe(self, task_id):
+        """A pub/sub subscription for one task's updates (subscribe before reading the snapshot)."""
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(EVENTS_CHANNEL.format(task_id))
+        return pubsub
+
+
+class ProgressTracker:
+    """
+    Throttled PROGRESS updates for one export, called with the rows the
+    writer has done so far. With shared=True several writers (the chunks of
+    an admin export) add to one counter and report the combined total.
+    """
+
+    def __init__(self, progress, task_id, user_id, total, started=None, shared=False):
+        self.progress = progress
+        self.task_id = task_id
+        self.user_id = user_id
+        self.total = total
+        self.started = started or time.time()
+        self.shared = shared
+        self.reported = 0
+        self.last_publish = 0.0
+
+    def __call__(self, rows_done):
+        if self.shared:
+            delta, self.reported = rows_done - self.reported, rows_done
+            rows_done = self.progress.add_rows(self.task_id, delta) if delta else None
+            if rows_done is None:
+                return
+        now = time.time()
+        if now - self.last_publish < PUBLISH_INTERVAL:
+            return
+        self.last_publish = now
+        elapsed = now - self.started
+        percent = min(100.0, 100.0 * rows_done / self.total) if self.total else 100.0
+        eta = elapsed * (self.total - rows_done) / rows_done if rows_done and self.total else None
+        self.progress._publish(self.task_id, {
+            "task_id": self.task_id, "user_id": self.user_id, "state": "PROGRESS",
+            "rows": rows_done, "total": self.total, "percent": round(percent, 1),
+            "eta_seconds": round(eta, 1) if eta is not None else None, "started_at": self.started,
+        })
+
+
+export_progress = ExportProgress()
@@ -0,0 +1,85 @@
+# applications/export_reuse.py
+import hashlib
+import json
+import os
+from flask import current_app
+from sqlalchemy import func, select
+from applications.api import cache
+from applications.cache_tags import tag_versions
+from applications.database import read_only
+from applications.export_engine import apply_export_filters
+from applications.export_progress import export_progress
+from applications.export_storage import export_storage
+from applications.models import db, Reservation
+
+# Identical export requests share one run: the request is keyed by (scope,
+# user, filters, format, compression, recipient, data watermark) and the key
+# points at the in-flight task, then at its finished file. The watermark
+# changes whenever the exported data can have changed, so a reused file is
+# never stale. Entries live in the shared cache; claiming a key is an atomic
+# add, so concurrent submissions still start a single task.
+
+REUSE_KEY = "export:reuse:{}"
+
+
+@read_only
+def data_watermark(user_id=None, filters=None):
+    """
+    Version of the data an export would read: the cache-tag versions bumped on
+    every reservation/lot change (see cache_tags), plus the row count and
+    highest id so a cache flush that resets tag versions cannot yield a match.
+    """
+    tags = [f"user:{user_id}" if user_id is not None else "summary", "lot_catalog"]
+    count, high = db.session.execute(
+        apply_export_filters(select(func.count(Reservation.id), func.max(Reservation.id)), user_id, filters)
+    ).one()
+    return f"{','.join(str(v) for v in tag_versions(tags))}|{count}|{high or 0}"
+
+
+def export_key(scope, user_id, filters, fmt, compress, email=None):
+    request = {
+        "scope": scope,
+        "user_id": user_id,
+        "filters": {k: v for k, v in sorted((filters or {}).items()) if v},
+        "format": fmt,
+        "gzip": bool(compress),
+        "email": email,
+        "watermark": data_watermark(None if scope == "all" else user_id, filters),
+    }
+    return hashlib.sha1(json.dumps(request, sort_keys=True).encode()).hexdigest()
+
+
+def lookup(key):
+    """
+    The reusable entry for a key: {"task_id", "state": "pending"|"done", "result"?},
+    or None. Entries whose task failed or whose file was evicted are dropped.
+    """
+    entry = cache.get(REUSE_KEY.format(key))
+    if entry is None:
+        return None
+    if entry["state"] == "done":
+        if export_storage.locate(os.path.basename(entry["result"]["csv_file"])):
+            return entry
+    else:
+        snapshot = export_progress.get(entry["task_id"])
+        if not snapshot or snapshot["state"] != "FAILURE":
+            return entry
+    cache.delete(REUSE_KEY.format(key))
+    return None
+
+
+def claim(key, task_id):
+    """Register task_id as the run for key; False if another request got there first."""
+    timeout = current_app.config.get("EXPORT_REUSE_PENDING_TTL", 600)
+    return cache.add(REUSE_KEY.format(key), {"task_id": task_id, "state": "pending"}, timeout=timeout)
+
+
+def complete(key, task_id, result):
+    """Point key at the finished file (called by the export task)."""
+    if not key:
+        return
+    if result.get("error"):
+        cache.delete(REUSE_KEY.format(key))
+        return
+    timeout = current_app.config.get("EXPORT_REUSE_TTL", 3600)
+    cache.set(REUSE_KEY.format(key), {"task_id": task_id, "state": "done", "result": result}, timeout=timeout)
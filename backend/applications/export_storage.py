@@ -0,0 +1,211 @@
+# applications/export_storage.py
+import gzip
+import os
+import re
+import shutil
+import time
+from collections import namedtuple
+import click
+from flask.cli import AppGroup
+from werkzeug.security import safe_join
+
+# Export files are named by export_filename(): the owner (a user id, or "all"
+# for admin-wide exports) and the Celery task id are recovered from the name,
+# so the directory itself is the index and needs no bookkeeping table.
+# Chunk parts and compaction temp files are "parts": not counted against the
+# quotas, only removed once orphaned.
+EXPORT_NAME = re.compile(
+    r"^parking_export_(?:user_(?P<user_id>\d+)|all)_(?P<task_id>[0-9a-f-]{36})(?P<ext>\.[a-z.]+?)(?P<part>\.part\d+|\.tmp)?$"
+)
+COMPRESSIBLE = (".csv", ".jsonl")  # Parquet is compressed internally; .gz already is
+
+ExportFile = namedtuple("ExportFile", ["name", "path", "size", "mtime", "user_id", "task_id", "part"])
+
+
+class ExportStorage:
+    """
+    The export directory: where the tasks write and the download route reads,
+    kept bounded by a TTL, a per-user and a global size quota (oldest files
+    evicted first) and gzip compaction of large plain-text exports. Evicting
+    a file also forgets its Celery result and progress snapshot.
+    """
+
+    def __init__(self):
+        self.root = None
+        self.ttl = 24 * 3600
+        self.user_quota = 200 * 1024 ** 2
+        self.total_quota = 5 * 1024 ** 3
+        self.compress_threshold = 8 * 1024 ** 2
+        self.grace = 300
+        self.part_ttl = 3600
+
+    def init_app(self, app):
+        self.root = app.config["EXPORTS_DIR"]
+        self.ttl = app.config.get("EXPORT_TTL", self.ttl)
+        self.user_quota = app.config.get("EXPORT_USER_QUOTA", self.user_quota)
+        self.total_quota = app.config.get("EXPORT_TOTAL_QUOTA", self.total_quota)
+        self.compress_threshold = app.config.get("EXPORT_COMPRESS_THRESHOLD", self.compress_threshold)
+        self.grace = app.config.get("EXPORT_GRACE", self.grace)
+        self.part_ttl = app.config.get("EXPORT_PART_TTL", self.part_ttl)
+        os.makedirs(self.root, exist_ok=True)
+        app.extensions["export_storage"] = self
+        app.cli.add_command(exports_cli)
+
+    def path(self, filename):
+        """Absolute path for an export file name (None if it would leave the root)."""
+        return safe_join(self.root, filename)
+
+    def locate(self, filename):
+        """Path of an export as stored now: itself, or its compacted .gz; None if gone."""
+        path = self.path(filename)
+        if path is None:
+            return None
+        for candidate in (path, path + ".gz"):
+            if os.path.isfile(candidate):
+                return candidate
+        return None
+
+    def files(self):
+        """Every export file under the root (other files are left alone)."""
+        found = []
+        with os.scandir(self.root) as entries:
+            for entry in entries:
+                match = EXPORT_NAME.match(entry.name)
+                if not match or not entry.is_file():
+                    continue
+                try:
+                    st = entry.stat()
+                except FileNotFoundError:
+                    continue
+                user_id = match.group("user_id")
+                found.append(ExportFile(
+                    entry.name, entry.path, st.st_size, st.st_mtime,
+                    int(user_id) if user_id else None, match.group("task_id"), bool(match.group("part")),
+                ))
+        return found
+
+    def usage(self):
+        """(total bytes, {user_id: bytes}) of finished exports."""
+        per_user = {}
+        total = 0
+        for f in self.files():
+            if f.part:
+                continue
+            total += f.size
+            if f.user_id is not None:
+                per_user[f.user_id] = per_user.get(f.user_id, 0) + f.size
+        return total, per_user
+
+    def remove(self, f):
+        """Delete an export with its Celery result and progress snapshot."""
+        try:
+            os.remove(f.path)
+        except FileNotFoundError:
+            pass
+        if f.part:
+            return
+        # Imported here: the worker module imports the tasks, which import this module
+        from applications.worker import celery
+        from applications.export_progress import export_progress
+        try:
+            celery.AsyncResult(f.task_id).forget()
+        except Exception:
+            pass  # backends without forget(), or Redis down; result_expires still applies
+        export_progress.forget(f.task_id)
+
+    def _over_quota(self, files, quota, keep):
+        """Oldest-first files to drop so `files` fit in `quota` (never `keep`)."""
+        used = sum(f.size for f in files)
+        evict = []
+        for f in sorted(files, key=lambda f: f.mtime):
+            if used <= quota:
+                break
+            if f.name == keep:
+                continue
+            evict.append(f)
+            used -= f.size
+        return evict
+
+    def enforce_quotas(self, keep=None, user_id=None):
+        """
+        Evict oldest exports over the user quota (one user's, or every user's
+        when user_id is None) and then over the global quota. `keep` names a
+        file that must stay, e.g. the export just written.
+        """
+        finished = [f for f in self.files() if not f.part]
+        evict = []
+        owners = {f.user_id for f in finished if f.user_id is not None} if user_id is None else {user_id}
+        for owner in owners:
+            evict += self._over_quota([f for f in finished if f.user_id == owner], self.user_quota, keep)
+        gone = {f.name for f in evict}
+        evict += self._over_quota([f for f in finished if f.name not in gone], self.total_quota, keep)
+        for f in evict:
+            self.remove(f)
+        return len(evict)
+
+    def admit(self, filename, user_id=None):
+        """Called once an export is written: make room for it within the quotas."""
+        return self.enforce_quotas(keep=filename, user_id=user_id)
+
+    def compress(self, f):
+        """Replace a plain-text export by its .gz (downloads of the old name are served from it)."""
+        target = f.path + ".gz"
+        tmp = target + ".tmp"
+        with open(f.path, "rb") as src, gzip.open(tmp, "wb", compresslevel=6) as dst:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+        # Keep the original mtime so the TTL still counts from when the export was made
+        os.utime(tmp, (f.mtime, f.mtime))
+        os.replace(tmp, target)
+        os.remove(f.path)
+        return os.path.getsize(target)
+
+    def compact(self, now=None):
+        """
+        One maintenance pass: drop expired exports and orphaned chunk parts,
+        gzip large plain-text exports, then enforce the quotas.
+        Returns counts and bytes freed.
+        """
+        now = now or time.time()
+        stats = {"expired": 0, "parts": 0, "compressed": 0, "evicted": 0, "bytes_freed": 0}
+        for f in self.files():
+            age = now - f.mtime
+            if f.part:
+                if age > self.part_ttl:
+                    self.remove(f)
+                    stats["parts"] += 1
+                    stats["bytes_freed"] += f.size
+            elif age > self.ttl:
+                self.remove(f)
+                stats["expired"] += 1
+                stats["bytes_freed"] += f.size
+            elif (age > self.grace and f.size >= self.compress_threshold
+                  and os.path.splitext(f.name)[1] in COMPRESSIBLE):
+                try:
+                    stats["bytes_freed"] += f.size - self.compress(f)
+                    stats["compressed"] += 1
+                except FileNotFoundError:
+                    pass  # removed meanwhile
+        before = self.usage()[0]
+        stats["evicted"] = self.enforce_quotas()
+        stats["bytes_freed"] += before - self.usage()[0]
+        return stats
+
+
+export_storage = ExportStorage()
+
+exports_cli = AppGroup("exports", help="Export file storage.")
+
+
+@exports_cli.command("status")
+def status_command():
+    """Disk used by exports, overall and by the largest users."""
+    total, per_user = export_storage.usage()
+    click.echo(f"{export_storage.root}: {total} bytes (quota {export_storage.total_quota})")
+    for user_id, used in sorted(per_user.items(), key=lambda item: -item[1])[:20]:
+        click.echo(f"user {user_id:<8} {used}")
+
+
+@exports_cli.command("compact")
+def compact_command():
+    """Expire, compress and evict exports now (what the beat task does)."""
+    click.echo(export_storage.compact())
@@ -1,48 +1,198 @@
 # applications/exports_api.py
+import json
+import os
+import time
 from flask_restful import Resource
-from flask import request
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from applications.tasks import export_parking_data  # ✅ updated import
+from flask import Response, request, stream_with_context
+from applications.tasks import export_parking_data, export_all_parking_data  # ✅ updated import
+from applications.authz import current_principal, user_required
+from applications.export_engine import EXPORT_FORMATS, parquet_available
+from applications.reservation_api import parse_iso_datetime
+from applications.export_progress import export_progress, TERMINAL_STATES
+from applications.export_storage import EXPORT_NAME
+from applications import export_reuse
 from celery.result import AsyncResult
+from celery.utils import uuid
 from applications.worker import celery
 
 
 class ExportCSVAPI(Resource):
-    @jwt_required()
+    @user_required
     def post(self):
         """
         Trigger an async export of the current user's parking reservations.
-        Body (optional): { "date_from": "...", "date_to": "...", "email": "..." }
+        Body (optional): { "date_from": "...", "date_to": "...", "email": "...",
+                           "format": "csv" | "jsonl" | "parquet",
+                           "gzip": true, "scope": "all" (admin only) }
         Returns: { "task_id": "<celery id>" }
+        An identical request over unchanged data is not exported again: it gets
+        the finished export ({ "task_id", "reused": true, "state": "SUCCESS",
+        "result" }, 200) or the id of the export already running for it.
         """
-        user_id = get_jwt_identity()
+        user = current_principal()
+        user_id = user.id
         data = request.get_json(silent=True) or {}
         filters = {}
 
-        if data.get("date_from"):
-            filters["date_from"] = data["date_from"]
-        if data.get("date_to"):
-            filters["date_to"] = data["date_to"]
+        for name in ("date_from", "date_to"):
+            if data.get(name):
+                try:
+                    parse_iso_datetime(data[name])
+                except (ValueError, TypeError):
+                    return {"error": f"Invalid {name}; use an ISO 8601 datetime"}, 400
+                filters[name] = data[name]
+        compress = bool(data.get("gzip"))
+        fmt = str(data.get("format") or "csv").lower()
+        if fmt not in EXPORT_FORMATS:
+            return {"error": f"Unsupported format. Use one of: {', '.join(EXPORT_FORMATS)}"}, 400
+        if fmt == "parquet" and not parquet_available():
+            return {"error": "Parquet export requires pyarrow on the server"}, 400
+
+        scope = "all" if data.get("scope") == "all" else "user"
+        if scope == "all" and not user.is_admin:
+            return {"error": "Admin access required"}, 403
+
+        key = export_reuse.export_key(scope, user_id, filters, fmt, compress, data.get("email"))
+        entry = export_reuse.lookup(key)
+        task_id = uuid()
+        if entry is None and not export_reuse.claim(key, task_id):
+            # A concurrent identical request claimed the key first: share its run
+            entry = export_reuse.lookup(key)
+        if entry is not None:
+            if entry["state"] == "done":
+                return {"task_id": entry["task_id"], "reused": True, "state": "SUCCESS", "result": entry["result"]}
+            return {"task_id": entry["task_id"], "reused": True}, 202
+
+        # Recorded before enqueueing so status/events know the task and its owner from the start
+        export_progress.queued(task_id, user_id)
+        if scope == "all":
+            async_result = export_all_parking_data.apply_async(
+                args=(data.get("email"), filters, compress, fmt),
+                kwargs={"requested_by": user_id, "reuse_key": key}, task_id=task_id,
+            )
+            return {"task_id": async_result.id}, 202
 
         # enqueue Celery task
-        async_result = export_parking_data.apply_async(args=(user_id, data.get("email"), filters))
+        async_result = export_parking_data.apply_async(
+            args=(user_id, data.get("email"), filters, compress, fmt), kwargs={"reuse_key": key}, task_id=task_id
+        )
         return {"task_id": async_result.id}, 202
 
 
+# Server-Sent Events stream of export progress
+EVENTS_HEARTBEAT = 15  # seconds between keep-alive comments (and result backend checks)
+EVENTS_MAX_SECONDS = 60  # streams are closed after this long (freeing the worker); clients reconnect
+
+
+def backend_state(task_id):
+    """State (and result when finished) from the Celery result backend."""
+    res = AsyncResult(task_id, app=celery)
+    response = {"task_id": task_id, "state": res.state}
+
+    if res.ready():
+        try:
+            response["result"] = res.result
+        except Exception:
+            response["result"] = {"error": "unable_to_fetch_result"}
+    return response
+
+
+def export_state(task_id):
+    """The progress snapshot, else the result backend's state of a finished task; None if unknown."""
+    snapshot = export_progress.get(task_id)
+    if snapshot is not None:
+        return snapshot
+    state = backend_state(task_id)
+    # The backend reports PENDING for ids it has never seen
+    return None if state["state"] == "PENDING" else state
+
+
+def export_owner(state):
+    """Id of the user an export belongs to (None: admin-wide or unknown)."""
+    if "user_id" in state:
+        return state["user_id"]
+    result = state.get("result")
+    match = EXPORT_NAME.match(os.path.basename(result.get("csv_file") or "")) if isinstance(result, dict) else None
+    return int(match.group("user_id")) if match and match.group("user_id") else None
+
+
+def may_watch(principal, state):
+    return principal.is_admin or (export_owner(state) is not None and export_owner(state) == principal.id)
+
+
 class ExportStatusAPI(Resource):
-    @jwt_required()
+    @user_required
     def get(self, task_id):
         """
         Check status of a previously enqueued export task.
-        Returns status and result info if available.
+        Returns status, progress and result info if available; answered from
+        the progress snapshot when there is one, else the result backend.
+        Only the export's owner (or an admin) may look.
         """
-        res = AsyncResult(task_id, app=celery)
-        response = {"task_id": task_id, "state": res.state}
+        state = export_state(task_id)
+        if state is None:
+            return {"error": "Unknown export"}, 404
+        if not may_watch(current_principal(), state):
+            return {"error": "Not your export"}, 403
+        return state
 
-        if res.ready():
+
+class ExportEventsAPI(Resource):
+    @user_required
+    def get(self, task_id):
+        """
+        Stream an export's progress as Server-Sent Events: the current state
+        first, then every update (STARTED, PROGRESS with rows/percent/ETA,
+        SUCCESS/FAILURE with the result); the stream ends on a final state.
+        """
+        principal = current_principal()
+        # Subscribe before reading the state so no update falls in between
+        pubsub = export_progress.subscribe(task_id)
+        initial = export_state(task_id)
+        if initial is None:
+            pubsub.close()
+            return {"error": "Unknown export"}, 404
+        if not may_watch(principal, initial):
+            pubsub.close()
+            return {"error": "Not your export"}, 403
+
+        def event(state):
+            return f"data: {json.dumps(state)}\n\n"
+
+        def stream():
             try:
-                response["result"] = res.result
-            except Exception:
-                response["result"] = {"error": "unable_to_fetch_result"}
+                yield event(initial)
+                if initial["state"] in TERMINAL_STATES or "result" in initial:
+                    return
+
+                deadline = time.time() + EVENTS_MAX_SECONDS
+                last_message = time.time()
+                while time.time() < deadline:
+                    message = pubsub.get_message(timeout=1.0)
+                    if message is None:
+                        if time.time() - last_message < EVENTS_HEARTBEAT:
+                            continue
+                        # Quiet for a while: make sure the task did not end without publishing
+                        last_message = time.time()
+                        state = backend_state(task_id)
+                        if "result" in state:
+                            yield event(state)
+                            return
+                        yield ": keep-alive\n\n"
+                        continue
+
+                    last_message = time.time()
+                    state = json.loads(message["data"])
+                    if not may_watch(principal, state):
+                        return
+                    yield event(state)
+                    if state["state"] in TERMINAL_STATES:
+                        return
+            finally:
+                pubsub.close()
 
-        return response
+        return Response(
+            stream_with_context(stream()),
+            mimetype="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
@@ -0,0 +1,209 @@
+# applications/gate_events.py
+import click
+from datetime import datetime, timedelta
+from flask.cli import AppGroup
+from sqlalchemy import bindparam, case, delete, insert, select, update
+from applications.models import db, GateEvent, ParkingLot, ParkingSpot, Reservation
+from applications.reservation_api import IST, parse_iso_datetime
+from applications.rollups import record_reservations
+from applications.cache_tags import invalidate_on_commit
+
+EVENT_TYPES = ("check_in", "check_out")
+MAX_EVENTS = 1000
+MAX_KEY_LENGTH = 100
+
+# Keys of applied events are kept this long so device retries stay idempotent
+EVENT_RETENTION_DAYS = 7
+
+
+def parse_event(event):
+    """Validate one raw event; returns (key, type, reservation_id, timestamp) or raises ValueError."""
+    if not isinstance(event, dict):
+        raise ValueError("Event must be an object")
+
+    key = event.get("key")
+    if not isinstance(key, str) or not key.strip() or len(key) > MAX_KEY_LENGTH:
+        raise ValueError(f"key must be a non-empty string of at most {MAX_KEY_LENGTH} characters")
+    event_type = event.get("type")
+    if event_type not in EVENT_TYPES:
+        raise ValueError(f"type must be one of: {', '.join(EVENT_TYPES)}")
+    try:
+        reservation_id = int(event.get("reservation_id"))
+    except (TypeError, ValueError):
+        raise ValueError("reservation_id must be an integer")
+
+    if event.get("timestamp"):
+        timestamp = parse_iso_datetime(event["timestamp"])
+    else:
+        timestamp = datetime.now(IST).replace(tzinfo=None)
+    return key.strip(), event_type, reservation_id, timestamp
+
+
+def load_reservation_state(reservation_ids):
+    """One query for everything the events touch: reservation, spot, lot and lot price."""
+    rows = db.session.execute(
+        select(
+            Reservation.id, Reservation.spot_id, Reservation.user_id,
+            Reservation.parking_timestamp, Reservation.leaving_timestamp, Reservation.parking_cost,
+            ParkingSpot.lot_id, ParkingLot.price,
+        )
+        .outerjoin(ParkingSpot, ParkingSpot.id == Reservation.spot_id)
+        .outerjoin(ParkingLot, ParkingLot.id == ParkingSpot.lot_id)
+        .where(Reservation.id.in_(reservation_ids))
+    )
+    return {row.id: dict(row._mapping) for row in rows}
+
+
+def ingest_events(events):
+    """
+    Apply a batch of gate/sensor events inside the caller's transaction
+    using set-based statements: one UPDATE per spot status, one executemany
+    UPDATE for check-outs, one upsert per touched rollup row and one
+    executemany INSERT of the idempotency keys.
+
+    Events are applied in order; a key seen before (in an earlier request
+    or earlier in this batch) is reported as "duplicate" and skipped.
+    Returns (results, occupancy_changes); the caller commits and then
+    applies occupancy_changes to the occupancy index.
+    """
+    results = [None] * len(events)
+    parsed = []
+    for index, event in enumerate(events):
+        try:
+            parsed.append((index, *parse_event(event)))
+        except ValueError as e:
+            key = event.get("key") if isinstance(event, dict) else None
+            results[index] = {"key": key, "status": "rejected", "error": str(e)}
+
+    keys = {key for _, key, _, _, _ in parsed}
+    seen = set(db.session.scalars(select(GateEvent.key).where(GateEvent.key.in_(keys)))) if keys else set()
+    state = load_reservation_state({rid for _, _, _, rid, _ in parsed}) if parsed else {}
+
+    spot_status = {}  # spot_id -> (lot_id, "O" | "A", reservation_id), last event wins
+    releases = {}     # reservation_id -> leaving time and cost
+    rollup_entries = {}  # reservation_id -> rollup delta of its check-out
+    checkouts = {}    # reservation_id -> (result, applied entry) of its check-out
+    applied = []
+    tags = set()
+
+    for index, key, event_type, reservation_id, timestamp in parsed:
+        result = {"key": key, "reservation_id": reservation_id}
+        results[index] = result
+        if key in seen:
+            result["status"] = "duplicate"
+            continue
+
+        reservation = state.get(reservation_id)
+        error = None
+        if reservation is None:
+            error = "Reservation not found"
+        elif reservation["spot_id"] is None:
+            error = "Reservation's spot no longer exists"
+        elif reservation["leaving_timestamp"] is not None:
+            error = "Reservation already checked out"
+        elif event_type == "check_out" and timestamp < reservation["parking_timestamp"]:
+            error = "Check-out time is before the parking time"
+        if error:
+            result.update(status="rejected", error=error)
+            continue
+
+        lot_id = reservation["lot_id"]
+        entry = {
+            "key": key, "reservation_id": reservation_id,
+            "event_type": event_type, "occurred_at": timestamp,
+        }
+        if event_type == "check_in":
+            spot_status[reservation["spot_id"]] = (lot_id, "O", reservation_id)
+        else:
+            hours = (timestamp - reservation["parking_timestamp"]).total_seconds() / 3600
+            cost = round(hours * reservation["price"], 2)
+            releases[reservation_id] = (timestamp, cost)
+            spot_status[reservation["spot_id"]] = (lot_id, "A", reservation_id)
+            rollup_entries[reservation_id] = (
+                reservation["parking_timestamp"], lot_id, reservation["user_id"],
+                0, cost - (reservation["parking_cost"] or 0),
+            )
+            checkouts[reservation_id] = (result, entry)
+            reservation["leaving_timestamp"] = timestamp
+            result["parking_cost"] = cost
+
+        seen.add(key)
+        applied.append(entry)
+        result["status"] = "applied"
+        tags |= {"lots", "summary", f"lot:{lot_id}", f"user:{reservation['user_id']}"}
+
+    if releases:
+        # Released elsewhere (e.g. a PATCH) since the state was read: those check-outs lose
+        for reservation_id in set(releases) - release_reservations(releases):
+            result, entry = checkouts[reservation_id]
+            result.pop("parking_cost", None)
+            result.update(status="rejected", error="Reservation already checked out")
+            applied.remove(entry)
+            del rollup_entries[reservation_id]
+            spot_status = {
+                spot_id: change for spot_id, change in spot_status.items() if change[2] != reservation_id
+            }
+    if not applied:
+        return results, []
+
+    for status in ("O", "A"):
+        spot_ids = [spot_id for spot_id, (_, s, _) in spot_status.items() if s == status]
+        if spot_ids:
+            db.session.execute(
+                update(ParkingSpot.__table__).where(ParkingSpot.id.in_(spot_ids)).values(status=status)
+            )
+    record_reservations(list(rollup_entries.values()))
+    db.session.execute(insert(GateEvent.__table__), applied)
+    invalidate_on_commit(db.session, *tags)
+
+    changes = [(lot_id, spot_id, status == "O") for spot_id, (lot_id, status, _) in spot_status.items()]
+    return results, changes
+
+
+def release_reservations(releases):
+    """
+    Close {reservation_id: (leaving time, cost)} in one UPDATE that only
+    touches still-open reservations; returns the ids it actually closed.
+    """
+    reservations = Reservation.__table__
+    still_open = reservations.c.leaving_timestamp.is_(None)
+    if db.session.get_bind().dialect.update_returning:
+        ids = reservations.c.id
+        stmt = (
+            update(reservations)
+            .where(ids.in_(list(releases)), still_open)
+            .values(
+                leaving_timestamp=case({rid: leaving for rid, (leaving, _) in releases.items()}, value=ids),
+                parking_cost=case({rid: cost for rid, (_, cost) in releases.items()}, value=ids),
+            )
+            .returning(ids)
+        )
+        return set(db.session.scalars(stmt))
+
+    stmt = (
+        update(reservations)
+        .where(reservations.c.id == bindparam("b_id"), still_open)
+        .values(leaving_timestamp=bindparam("b_leaving"), parking_cost=bindparam("b_cost"))
+    )
+    return {
+        rid for rid, (leaving, cost) in releases.items()
+        if db.session.execute(stmt, {"b_id": rid, "b_leaving": leaving, "b_cost": cost}).rowcount
+    }
+
+
+def prune_events(days=EVENT_RETENTION_DAYS):
+    """Forget idempotency keys older than `days`. Returns the number deleted."""
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    deleted = db.session.execute(delete(GateEvent).where(GateEvent.received_at < cutoff)).rowcount
+    db.session.commit()
+    return deleted
+
+
+events_cli = AppGroup("events", help="Gate/sensor event ingestion.")
+
+
+@events_cli.command("prune")
+@click.option("--days", default=EVENT_RETENTION_DAYS, show_default=True, help="Keep keys this many days.")
+def prune_command(days):
+    """Delete stored idempotency keys older than --days."""
+    click.echo(f"Pruned {prune_events(days)} gate events")
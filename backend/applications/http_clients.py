@@ -0,0 +1,81 @@
+# applications/http_clients.py
+import importlib
+import os
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class HttpClients:
+    """
+    Per-process HTTP clients for the notification channels: one pooled
+    requests.Session (keep-alive connections reused across webhook posts)
+    and one Twilio Client per account, instead of a new connection or
+    client per message. Rebuilt after a fork so workers never share sockets.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.pool_size = 10
+        self.timeout = 5
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._session = None
+        self._twilio = {}
+        self._twilio_class = None
+
+    def init_app(self, app):
+        self.close()
+        self.pool_size = app.config.get("HTTP_POOL_SIZE", 10)
+        self.timeout = app.config.get("HTTP_TIMEOUT", 5)
+        app.extensions["http_clients"] = self
+
+    def _check_fork(self):
+        if self._pid != os.getpid():
+            self._reset()
+
+    def session(self):
+        """The shared keep-alive Session."""
+        self._check_fork()
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.pool_size)
+                    session.mount("https://", adapter)
+                    session.mount("http://", adapter)
+                    self._session = session
+        return self._session
+
+    def post_json(self, url, payload):
+        response = self.session().post(url, json=payload, timeout=self.timeout)
+        response.raise_for_status()
+        return response
+
+    def twilio(self, account_sid, auth_token):
+        """A cached twilio.rest.Client, or None when the twilio package is not installed."""
+        self._check_fork()
+        key = (account_sid, auth_token)
+        client = self._twilio.get(key)
+        if client is None:
+            with self._lock:
+                if self._twilio_class is None:
+                    # imported dynamically so twilio stays an optional dependency
+                    try:
+                        self._twilio_class = importlib.import_module("twilio.rest").Client
+                    except ImportError:
+                        self._twilio_class = False
+                if not self._twilio_class:
+                    return None
+                client = self._twilio.setdefault(key, self._twilio_class(account_sid, auth_token))
+        return client
+
+    def close(self):
+        if self._session is not None and self._pid == os.getpid():
+            self._session.close()
+        self._reset()
+
+
+http_clients = HttpClients()
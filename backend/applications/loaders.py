@@ -0,0 +1,75 @@
+# applications/loaders.py
+from collections import defaultdict
+from sqlalchemy import func
+from sqlalchemy.orm import aliased
+from applications.models import db, ParkingLot, ParkingSpot, Reservation
+
+
+def active_reservations_query(lot_id=None):
+    """Query for the latest open reservation of every occupied spot (optionally in one lot)."""
+    ranked = (
+        db.session.query(
+            Reservation,
+            func.row_number().over(
+                partition_by=Reservation.spot_id,
+                order_by=(Reservation.parking_timestamp.desc(), Reservation.id.desc()),
+            ).label("rn"),
+        )
+        .join(ParkingSpot, ParkingSpot.id == Reservation.spot_id)
+        .filter(Reservation.leaving_timestamp.is_(None), ParkingSpot.status == "O")
+    )
+    if lot_id:
+        ranked = ranked.filter(ParkingSpot.lot_id == lot_id)
+    ranked = ranked.subquery()
+
+    active = aliased(Reservation, ranked)
+    return db.session.query(active).filter(ranked.c.rn == 1)
+
+
+def load_active_reservations(lot_id=None):
+    """
+    Return {spot_id: Reservation} holding only the latest open reservation
+    of every occupied spot, in a single windowed query.
+    """
+    return {r.spot_id: r for r in active_reservations_query(lot_id)}
+
+
+def build_spot_data(spot, reservation=None):
+    """Serialize a spot, attaching its active reservation if it is occupied."""
+    spot_info = spot.convert_to_json()
+    if spot.status == "O" and reservation:
+        spot_info["reservation"] = reservation.convert_to_json()
+        spot_info["user_id"] = reservation.user_id
+        spot_info["car_number"] = reservation.vehicle_number
+    return spot_info
+
+
+def load_lots_with_spots(lot_id=None):
+    """
+    Load lots, their spots and each occupied spot's active reservation
+    in three queries, independent of reservation history size.
+    Returns a list of serialized lots (each with a "spots" list).
+    """
+    lots_q = ParkingLot.query
+    spots_q = ParkingSpot.query
+    if lot_id:
+        lots_q = lots_q.filter(ParkingLot.id == lot_id)
+        spots_q = spots_q.filter(ParkingSpot.lot_id == lot_id)
+
+    lots = lots_q.order_by(ParkingLot.id).all()
+    if not lots:
+        return []
+
+    spots_by_lot = defaultdict(list)
+    for spot in spots_q.order_by(ParkingSpot.id).all():
+        spots_by_lot[spot.lot_id].append(spot)
+
+    active = load_active_reservations(lot_id)
+
+    return [
+        {
+            **lot.convert_to_json(include_spots=False),
+            "spots": [build_spot_data(spot, active.get(spot.id)) for spot in spots_by_lot[lot.id]],
+        }
+        for lot in lots
+    ]
@@ -0,0 +1,151 @@
+# applications/mailer.py
+import os
+import queue
+import smtplib
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from email.mime.application import MIMEApplication
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from flask import current_app
+
+
+def is_connection_error(error):
+    """True for errors after which the connection is unusable and a retry on a fresh one may work."""
+    if isinstance(error, (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError)):
+        return True
+    # SMTPException subclasses OSError; anything else OSError is a socket problem
+    return isinstance(error, OSError) and not isinstance(error, smtplib.SMTPException)
+
+
+def build_message(sender, receiver, subject, html_body, attachment_path=None):
+    msg = MIMEMultipart()
+    msg["From"], msg["To"], msg["Subject"] = sender, receiver, subject
+    msg.attach(MIMEText(html_body, "html"))
+
+    if attachment_path:
+        with open(attachment_path, "rb") as f:
+            part = MIMEApplication(f.read(), Name=os.path.basename(attachment_path))
+        part['Content-Disposition'] = f'attachment; filename="{os.path.basename(attachment_path)}"'
+        msg.attach(part)
+    return msg
+
+
+class Mailer:
+    """
+    SMTP transport that keeps up to SMTP_CONCURRENCY connections open and
+    reuses them across messages (recycled after SMTP_MAX_MESSAGES_PER_CONNECTION),
+    reconnecting and retrying once when a connection has gone stale.
+
+    send() delivers one message; send_many() fans a list out over the pool
+    (the notification outbox hands each claimed batch to send_many).
+    """
+
+    def __init__(self):
+        self._idle = queue.LifoQueue()
+        self._pid = os.getpid()
+
+    def init_app(self, app):
+        self.close()
+        app.extensions["mailer"] = self
+
+    def _settings(self):
+        config = current_app.config
+        return {
+            "host": config.get("SMTP_HOST", "localhost"),
+            "port": int(config.get("SMTP_PORT", 1025)),
+            "timeout": config.get("SMTP_TIMEOUT", 10),
+            "username": config.get("SMTP_USERNAME"),
+            "password": config.get("SMTP_PASSWORD"),
+            "starttls": config.get("SMTP_USE_TLS", False),
+            "max_messages": config.get("SMTP_MAX_MESSAGES_PER_CONNECTION", 100),
+            "concurrency": max(1, int(config.get("SMTP_CONCURRENCY", 4))),
+        }
+
+    def _connect(self, settings):
+        server = smtplib.SMTP(host=settings["host"], port=settings["port"], timeout=settings["timeout"])
+        if settings["starttls"]:
+            server.starttls()
+        if settings["username"]:
+            server.login(settings["username"], settings["password"])
+        server.sent = 0
+        return server
+
+    @staticmethod
+    def _discard(server):
+        try:
+            server.quit()
+        except Exception:
+            server.close()
+
+    @contextmanager
+    def connection(self, settings, fresh=False):
+        """Borrow an open connection (or open one); it goes back to the pool unless it broke."""
+        if self._pid != os.getpid():
+            # Forked (e.g. a Celery prefork child): never share the parent's sockets
+            self._idle, self._pid = queue.LifoQueue(), os.getpid()
+        server = None
+        if not fresh:
+            try:
+                server = self._idle.get_nowait()
+            except queue.Empty:
+                pass
+        if server is None:
+            server = self._connect(settings)
+        try:
+            yield server
+        except Exception as e:
+            if is_connection_error(e):
+                server.close()
+            else:
+                self._discard(server)
+            raise
+        if server.sent >= settings["max_messages"] or self._idle.qsize() >= settings["concurrency"]:
+            self._discard(server)
+        else:
+            self._idle.put(server)
+
+    def _deliver(self, msg, settings):
+        for attempt in range(2):
+            try:
+                # A pooled connection may have been dropped by the server; retry on a new one
+                with self.connection(settings, fresh=attempt > 0) as server:
+                    server.send_message(msg)
+                    server.sent += 1
+                return True
+            except Exception as e:
+                if not is_connection_error(e) or attempt:
+                    current_app.logger.exception(f"Email send to {msg['To']} failed")
+                    return False
+        return False
+
+    def send(self, msg):
+        """Deliver one message. Returns True on success."""
+        return self._deliver(msg, self._settings())
+
+    def send_many(self, messages):
+        """Deliver messages over up to SMTP_CONCURRENCY connections; returns a success flag per message."""
+        if not messages:
+            return []
+        settings = self._settings()
+        app = current_app._get_current_object()
+
+        def deliver(msg):
+            with app.app_context():
+                return self._deliver(msg, settings)
+
+        if settings["concurrency"] == 1 or len(messages) == 1:
+            return [self._deliver(msg, settings) for msg in messages]
+        with ThreadPoolExecutor(max_workers=settings["concurrency"]) as pool:
+            return list(pool.map(deliver, messages))
+
+    def close(self):
+        """Close every idle connection."""
+        while True:
+            try:
+                self._discard(self._idle.get_nowait())
+            except queue.Empty:
+                return
+
+
+mailer = Mailer()
@@ -0,0 +1,123 @@
+# applications/migrations.py
+import click
+from datetime import datetime
+from flask.cli import AppGroup
+from sqlalchemy import inspect, text
+from applications.models import db
+from applications.rollups import backfill_rollups
+
+# db.create_all() creates missing tables (and their indexes) but never alters
+# existing ones; schema changes to existing tables go here as ordered,
+# idempotent steps recorded in schema_migrations.
+
+
+def _create_indexes(conn, indexes):
+    for name, table, columns in indexes:
+        conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({', '.join(columns)})"))
+
+
+def _add_columns(conn, table, columns):
+    existing = {column["name"] for column in inspect(conn).get_columns(table)}
+    for name, ddl in columns:
+        if name not in existing:
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {name} {ddl}"))
+
+
+def m0001_reservation_listing_indexes(conn):
+    _create_indexes(conn, [
+        ("ix_reservations_parking_ts_id", "reservations", ["parking_timestamp", "id"]),
+        ("ix_reservations_user_parking_ts_id", "reservations", ["user_id", "parking_timestamp", "id"]),
+        ("ix_reservations_leaving_ts", "reservations", ["leaving_timestamp"]),
+        ("ix_reservations_vehicle_number", "reservations", ["vehicle_number"]),
+        ("ix_monthly_user_stats_user_month", "monthly_user_stats", ["user_id", "month"]),
+    ])
+
+
+def m0002_hot_path_indexes(conn):
+    _create_indexes(conn, [
+        ("ix_reservations_spot_leaving_ts", "reservations", ["spot_id", "leaving_timestamp"]),
+        ("ix_parking_spots_lot_status", "parking_spots", ["lot_id", "status"]),
+    ])
+
+
+def m0003_activity_columns(conn):
+    _add_columns(conn, "users", [("last_reservation_at", "DATETIME"), ("last_seen_at", "DATETIME")])
+    _add_columns(conn, "parking_lots", [("created_at", "DATETIME")])
+    # Existing lots keep a NULL created_at so they are never announced as new
+    conn.execute(text(
+        "UPDATE users SET last_reservation_at = ("
+        "SELECT MAX(parking_timestamp) FROM reservations WHERE reservations.user_id = users.id)"
+    ))
+    _create_indexes(conn, [
+        ("ix_users_last_reservation_at", "users", ["last_reservation_at"]),
+        ("ix_parking_lots_created_at", "parking_lots", ["created_at"]),
+    ])
+
+
+def m0004_backfill_rollups(conn):
+    # The rollup tables start empty on databases that predate them
+    backfill_rollups(conn)
+
+
+MIGRATIONS = [
+    ("0001_reservation_listing_indexes", m0001_reservation_listing_indexes),
+    ("0002_hot_path_indexes", m0002_hot_path_indexes),
+    ("0003_activity_columns", m0003_activity_columns),
+    ("0004_backfill_rollups", m0004_backfill_rollups),
+]
+
+
+def applied_migrations(conn):
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS schema_migrations ("
+        "version VARCHAR(64) PRIMARY KEY, applied_at TIMESTAMP NOT NULL)"
+    ))
+    return {row[0] for row in conn.execute(text("SELECT version FROM schema_migrations"))}
+
+
+def upgrade():
+    """Apply pending migrations in order, each in its own transaction. Returns applied versions."""
+    with db.engine.begin() as conn:
+        done = applied_migrations(conn)
+
+    applied = []
+    for version, migrate in MIGRATIONS:
+        if version in done:
+            continue
+        with db.engine.begin() as conn:
+            migrate(conn)
+            conn.execute(
+                text("INSERT INTO schema_migrations (version, applied_at) VALUES (:v, :t)"),
+                {"v": version, "t": datetime.utcnow()},
+            )
+        applied.append(version)
+    return applied
+
+
+schema_cli = AppGroup("schema", help="Database schema migrations.")
+
+
+@schema_cli.command("upgrade")
+def upgrade_command():
+    """Apply pending schema migrations."""
+    applied = upgrade()
+    click.echo("Applied: " + ", ".join(applied) if applied else "Schema is up to date")
+
+
+@schema_cli.command("check-plans")
+def check_plans_command():
+    """EXPLAIN every hot API query; exit 1 if any falls back to a full table scan."""
+    from applications.query_plans import check_plans
+
+    failures = check_plans(click.echo)
+    if failures:
+        raise SystemExit(1)
+
+
+@schema_cli.command("status")
+def status_command():
+    """List migrations and whether they have been applied."""
+    with db.engine.begin() as conn:
+        done = applied_migrations(conn)
+    for version, _ in MIGRATIONS:
+        click.echo(f"[{'x' if version in done else ' '}] {version}")
@@ -1,8 +1,9 @@
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
 from werkzeug.security import generate_password_hash
+from applications.database import RoutingSession
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 
 
 class Users(db.Model):
@@ -13,9 +14,16 @@ class Users(db.Model):
     email = db.Column(db.String(120), unique=True, nullable=False)
     password = db.Column(db.String(200), nullable=False)
     is_admin = db.Column(db.Boolean, default=False)  # True only for admin user
+    last_reservation_at = db.Column(db.DateTime, nullable=True)  # parking time of the latest booking
+    last_seen_at = db.Column(db.DateTime, nullable=True)  # last login (UTC)
 
     reservations = db.relationship("Reservation", backref="user", lazy=True)
 
+    __table_args__ = (
+        # Inactive-user selection for the daily reminders
+        db.Index("ix_users_last_reservation_at", "last_reservation_at"),
+    )
+
     def __repr__(self):
         return f"<User {self.name} - Admin: {self.is_admin}>"
 
@@ -37,6 +45,7 @@ class ParkingLot(db.Model):
     address = db.Column(db.String(255), nullable=False)
     pin_code = db.Column(db.String(10), nullable=False)
     number_of_spots = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
 
     spots = db.relationship(
         "ParkingSpot",
@@ -71,6 +80,10 @@ class ParkingSpot(db.Model):
 
     reservations = db.relationship("Reservation", backref="spot", lazy=True)
 
+    __table_args__ = (
+        db.Index("ix_parking_spots_lot_status", "lot_id", "status"),
+    )
+
     def __repr__(self):
         return f"<ParkingSpot {self.id} - Lot {self.lot_id} - Status {self.status}>"
 
@@ -98,6 +111,15 @@ class Reservation(db.Model):
     leaving_timestamp = db.Column(db.DateTime, nullable=True)
     parking_cost = db.Column(db.Float, nullable=True)
 
+    __table_args__ = (
+        # Keyset pagination and per-user listings in ReservationAPI.get
+        db.Index("ix_reservations_parking_ts_id", "parking_timestamp", "id"),
+        db.Index("ix_reservations_user_parking_ts_id", "user_id", "parking_timestamp", "id"),
+        db.Index("ix_reservations_leaving_ts", "leaving_timestamp"),
+        db.Index("ix_reservations_spot_leaving_ts", "spot_id", "leaving_timestamp"),
+        db.Index("ix_reservations_vehicle_number", "vehicle_number"),
+    )
+
     def __repr__(self):
         return f"<Reservation User {self.user_id} - Spot {self.spot_id} - Vehicle {self.vehicle_number}>"
 
@@ -113,6 +135,69 @@ class Reservation(db.Model):
         }
 
 
+class DailyLotStats(db.Model):
+    """Rollup of bookings and revenue per lot per day (by parking_timestamp)."""
+    __tablename__ = "daily_lot_stats"
+
+    day = db.Column(db.Date, primary_key=True)
+    lot_id = db.Column(db.Integer, primary_key=True)  # 0 when the spot/lot no longer exists
+    bookings = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0.0)
+
+
+class MonthlyUserStats(db.Model):
+    """Rollup of bookings and spend per user per month (by parking_timestamp)."""
+    __tablename__ = "monthly_user_stats"
+
+    month = db.Column(db.Date, primary_key=True)  # first day of the month
+    user_id = db.Column(db.Integer, primary_key=True)
+    bookings = db.Column(db.Integer, nullable=False, default=0)
+    spend = db.Column(db.Float, nullable=False, default=0.0)
+
+    __table_args__ = (
+        db.Index("ix_monthly_user_stats_user_month", "user_id", "month"),
+    )
+
+
+class GateEvent(db.Model):
+    """Applied check-in/check-out event from a gate or bay sensor, keyed for idempotent retries."""
+    __tablename__ = "gate_events"
+
+    key = db.Column(db.String(100), primary_key=True)  # idempotency key chosen by the device
+    reservation_id = db.Column(db.Integer, nullable=False)
+    event_type = db.Column(db.String(20), nullable=False)  # check_in / check_out
+    occurred_at = db.Column(db.DateTime, nullable=False)
+    received_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+
+class NotificationOutbox(db.Model):
+    """Queued notification; written by producers, delivered by the outbox drain task."""
+    __tablename__ = "notification_outbox"
+
+    id = db.Column(db.Integer, primary_key=True)
+    dedupe_key = db.Column(db.String(200), unique=True, nullable=True)  # same key is only queued once
+    user_id = db.Column(db.Integer, nullable=True)
+    channel = db.Column(db.String(10), nullable=False)  # email / gchat / sms
+    recipient = db.Column(db.String(500), nullable=False)  # address, webhook URL or phone number
+    subject = db.Column(db.String(255), nullable=False, default="")
+    body = db.Column(db.Text, nullable=False)
+    attachment = db.Column(db.String(500), nullable=True)
+    status = db.Column(db.String(10), nullable=False, default="pending")  # pending / sending / sent / failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    claimed_by = db.Column(db.String(36), nullable=True)
+    claimed_at = db.Column(db.DateTime, nullable=True)
+    last_error = db.Column(db.String(500), nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        # Drain: due messages of a channel, oldest first
+        db.Index("ix_notification_outbox_due", "status", "channel", "next_attempt_at"),
+        db.Index("ix_notification_outbox_claim", "claimed_by"),
+    )
+
+
 def create_default_admin(): 
     from sqlalchemy.exc import IntegrityError
 
@@ -0,0 +1,193 @@
+# applications/occupancy.py
+import click
+import redis
+from flask import current_app
+from flask.cli import AppGroup
+
+# One bitmap for all spots (bit <spot_id> = 1 when occupied): spot ids are
+# global, so per-lot bitmaps would each grow to max(spot_id) / 8 bytes.
+BITS_KEY = "occupancy:spots"
+FREE_KEY = "occupancy:free"       # hash lot_id -> free spots
+OCCUPIED_KEY = "occupancy:occupied"  # hash lot_id -> occupied spots
+BUILT_KEY = "occupancy:built"    # set once the index has been populated
+
+
+class OccupancyIndex:
+    """
+    Live per-lot occupancy kept in Redis so availability questions never hit SQL.
+    Uses the Redis instance configured by CACHE_REDIS_*; pass `client` to
+    init_app (e.g. a fakeredis instance) to use something else.
+    """
+
+    def __init__(self, app=None, client=None):
+        self._client = client
+        self._stale = False
+        if app is not None:
+            self.init_app(app, client)
+
+    def init_app(self, app, client=None):
+        if client is not None:
+            self._client = client
+        elif self._client is None:
+            self._client = redis.Redis(
+                host=app.config.get("CACHE_REDIS_HOST", "localhost"),
+                port=app.config.get("CACHE_REDIS_PORT", 6379),
+                db=app.config.get("CACHE_REDIS_DB", 0),
+            )
+        app.extensions["occupancy"] = self
+        app.cli.add_command(occupancy_cli)
+
+    @property
+    def client(self):
+        return self._client
+
+    def _safe(self, fn, *args):
+        # The index is derived data: never fail a request because Redis is down.
+        # An update lost meanwhile leaves it wrong, so the first call that reaches
+        # Redis again drops BUILT_KEY and the next read rebuilds from the database.
+        try:
+            if self._stale:
+                self.client.delete(BUILT_KEY)
+                self._stale = False
+            return fn(*args)
+        except redis.RedisError:
+            self._stale = True
+            current_app.logger.warning("Occupancy index unavailable; it is rebuilt once Redis is back")
+            return None
+
+    def _flip(self, lot_id, spot_id, occupied):
+        prev = self.client.setbit(BITS_KEY, spot_id, 1 if occupied else 0)
+        # Only the caller that actually flipped the bit moves the counters
+        if prev == (0 if occupied else 1):
+            pipe = self.client.pipeline()
+            pipe.hincrby(FREE_KEY, lot_id, -1 if occupied else 1)
+            pipe.hincrby(OCCUPIED_KEY, lot_id, 1 if occupied else -1)
+            pipe.execute()
+
+    def mark_occupied(self, lot_id, spot_id):
+        self._safe(self._flip, lot_id, spot_id, True)
+
+    def mark_free(self, lot_id, spot_id):
+        self._safe(self._flip, lot_id, spot_id, False)
+
+    def _flip_many(self, changes):
+        pipe = self.client.pipeline(transaction=False)
+        for lot_id, spot_id, occupied in changes:
+            pipe.setbit(BITS_KEY, spot_id, 1 if occupied else 0)
+        previous = pipe.execute()
+
+        pipe = self.client.pipeline(transaction=False)
+        for (lot_id, spot_id, occupied), prev in zip(changes, previous):
+            if prev == (0 if occupied else 1):
+                pipe.hincrby(FREE_KEY, lot_id, -1 if occupied else 1)
+                pipe.hincrby(OCCUPIED_KEY, lot_id, 1 if occupied else -1)
+        pipe.execute()
+
+    def mark_many(self, changes):
+        """Apply (lot_id, spot_id, occupied) changes in two round trips."""
+        if changes:
+            self._safe(self._flip_many, list(changes))
+
+    def _add_free_spots(self, lot_id, count):
+        self.client.hincrby(FREE_KEY, lot_id, count)
+
+    def add_spots(self, lot_id, count):
+        """Register `count` newly created (free) spots in a lot."""
+        self._safe(self._add_free_spots, lot_id, count)
+
+    def remove_spots(self, lot_id, count):
+        """Unregister `count` deleted free spots from a lot."""
+        self._safe(self._add_free_spots, lot_id, -count)
+
+    def _drop_lot(self, lot_id):
+        # The lot's spots were all free when it was deleted, so their bits are already 0
+        pipe = self.client.pipeline()
+        pipe.hdel(FREE_KEY, lot_id)
+        pipe.hdel(OCCUPIED_KEY, lot_id)
+        pipe.execute()
+
+    def drop_lot(self, lot_id):
+        self._safe(self._drop_lot, lot_id)
+
+    def is_occupied(self, spot_id):
+        return bool(self.client.getbit(BITS_KEY, spot_id))
+
+    def availability(self):
+        """
+        Return [{lot_id, free, occupied, total}] straight from the index,
+        or counted in SQL while Redis is unavailable.
+        """
+        result = self._safe(self._availability)
+        if result is None:
+            return self.availability_from_db()
+        return result
+
+    def _availability(self):
+        # Builds the index from the database the first time it is needed
+        if not self.client.exists(BUILT_KEY):
+            self.rebuild()
+
+        pipe = self.client.pipeline()
+        pipe.hgetall(FREE_KEY)
+        pipe.hgetall(OCCUPIED_KEY)
+        free, occupied = pipe.execute()
+
+        result = []
+        for lot_id in sorted(set(free) | set(occupied), key=int):
+            f = int(free.get(lot_id, 0))
+            o = int(occupied.get(lot_id, 0))
+            result.append({"lot_id": int(lot_id), "free": f, "occupied": o, "total": f + o})
+        return result
+
+    def availability_from_db(self):
+        """The same counts with one grouped query over parking_spots."""
+        from sqlalchemy import func
+        from applications.models import db, ParkingLot, ParkingSpot
+
+        counts = {lot_id: {"free": 0, "occupied": 0} for (lot_id,) in db.session.query(ParkingLot.id)}
+        rows = db.session.query(ParkingSpot.lot_id, ParkingSpot.status, func.count()).group_by(
+            ParkingSpot.lot_id, ParkingSpot.status
+        )
+        for lot_id, status, count in rows:
+            counts.setdefault(lot_id, {"free": 0, "occupied": 0})["occupied" if status == "O" else "free"] += count
+        return [
+            {"lot_id": lot_id, "free": c["free"], "occupied": c["occupied"], "total": c["free"] + c["occupied"]}
+            for lot_id, c in sorted(counts.items())
+        ]
+
+    def rebuild(self):
+        """Recompute the whole index from the parking_lots/parking_spots tables."""
+        from applications.models import db, ParkingLot, ParkingSpot
+
+        lot_ids = [row.id for row in db.session.query(ParkingLot.id)]
+        spots = db.session.query(ParkingSpot.id, ParkingSpot.lot_id, ParkingSpot.status).all()
+
+        free = {lot_id: 0 for lot_id in lot_ids}
+        occupied = {lot_id: 0 for lot_id in lot_ids}
+
+        pipe = self.client.pipeline()
+        pipe.delete(BITS_KEY, FREE_KEY, OCCUPIED_KEY)
+        for spot in spots:
+            if spot.status == "O":
+                occupied[spot.lot_id] = occupied.get(spot.lot_id, 0) + 1
+                pipe.setbit(BITS_KEY, spot.id, 1)
+            else:
+                free[spot.lot_id] = free.get(spot.lot_id, 0) + 1
+        if free:
+            pipe.hset(FREE_KEY, mapping=free)
+            pipe.hset(OCCUPIED_KEY, mapping=occupied)
+        pipe.set(BUILT_KEY, 1)
+        pipe.execute()
+        return len(spots)
+
+
+occupancy = OccupancyIndex()
+
+occupancy_cli = AppGroup("occupancy", help="Manage the Redis occupancy index.")
+
+
+@occupancy_cli.command("rebuild")
+def rebuild_command():
+    """Rebuild the occupancy index from the database."""
+    count = occupancy.rebuild()
+    click.echo(f"Occupancy index rebuilt ({count} spots)")
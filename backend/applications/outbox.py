@@ -0,0 +1,403 @@
+# applications/outbox.py
+import random
+import threading
+import time
+import uuid
+import click
+import redis
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import bindparam, delete, func, insert, select, update
+from applications.models import db, NotificationOutbox
+from applications.rollups import UPSERT_INSERTS
+
+# Notifications are written to notification_outbox by producers (one bulk
+# INSERT per batch, duplicates dropped by dedupe_key) and delivered later by
+# the drain task, so provider latency never blocks a producer. Each channel
+# is paced by a token bucket shared by all workers through Redis; failed
+# deliveries are retried with exponential backoff until OUTBOX_MAX_ATTEMPTS.
+
+CHANNELS = ("email", "gchat", "sms")
+BUCKET_KEY = "outbox:bucket:{}"
+
+
+class TokenBucket:
+    """
+    Per-channel token buckets: `rate` tokens/second up to `burst`, kept in a
+    Redis hash so every worker draws from the same budget. Falls back to a
+    process-local bucket while Redis is unreachable.
+    """
+
+    def __init__(self, client=None):
+        self._client = client
+        self._local = {}
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        return self._client
+
+    @staticmethod
+    def _refill(tokens, stamp, now, rate, burst):
+        return min(burst, tokens + max(0.0, now - stamp) * rate)
+
+    def _take_local(self, channel, wanted, rate, burst, now):
+        with self._lock:
+            tokens, stamp = self._local.get(channel, (burst, now))
+            tokens = self._refill(tokens, stamp, now, rate, burst)
+            granted = min(wanted, int(tokens))
+            self._local[channel] = (tokens - granted, now)
+            return granted
+
+    def _take_shared(self, channel, wanted, rate, burst, now):
+        key = BUCKET_KEY.format(channel)
+
+        def attempt(pipe):
+            tokens, stamp = pipe.hmget(key, "tokens", "stamp")
+            tokens = burst if tokens is None else float(tokens)
+            tokens = self._refill(tokens, float(stamp or now), now, rate, burst)
+            granted = min(wanted, int(tokens))
+            pipe.multi()
+            pipe.hset(key, mapping={"tokens": tokens - granted, "stamp": now})
+            pipe.expire(key, 3600)
+            return granted
+
+        # WATCH/MULTI: retried by redis-py when another worker touched the bucket
+        return self.client.transaction(attempt, key, value_from_callable=True)
+
+    def take(self, channel, wanted, rate, burst):
+        """
+        Take up to `wanted` tokens without blocking. Returns (granted, wait)
+        where `wait` is the seconds until the next token when none are left.
+        """
+        now = time.time()
+        try:
+            granted = self._take_shared(channel, wanted, rate, burst, now)
+        except redis.RedisError:
+            current_app.logger.warning("Outbox rate limiter: Redis unavailable, using a local bucket")
+            granted = self._take_local(channel, wanted, rate, burst, now)
+        return granted, 0.0 if granted else 1.0 / rate
+
+    def acquire(self, channel, wanted, rate, burst, deadline):
+        """Block until at least one token is available (or `deadline`); returns the number granted."""
+        while True:
+            granted, wait = self.take(channel, wanted, rate, burst)
+            if granted or time.time() + wait > deadline:
+                return granted
+            time.sleep(wait)
+
+
+class Outbox:
+    """
+    Producer and consumer side of the notification outbox.
+
+    add() queues one message; inside `with outbox.batch():` messages are
+    buffered and written with a single INSERT when the block exits.
+    drain() claims due messages and hands them to the channel's sender
+    (see register_sender) at the channel's rate.
+    """
+
+    def __init__(self, client=None):
+        self.limiter = TokenBucket(client)
+        self._buffer = threading.local()
+        self._senders = {}
+        self._group_keys = {}
+
+    def init_app(self, app, client=None):
+        if client is not None:
+            self.limiter._client = client
+        elif self.limiter.client is None:
+            self.limiter._client = redis.Redis(
+                host=app.config.get("CACHE_REDIS_HOST", "localhost"),
+                port=app.config.get("CACHE_REDIS_PORT", 6379),
+                db=app.config.get("CACHE_REDIS_DB", 0),
+            )
+        app.extensions["outbox"] = self
+        app.cli.add_command(outbox_cli)
+
+    def register_sender(self, channel, send_many, group_key=None):
+        """
+        send_many(rows) delivers NotificationOutbox rows and returns one error
+        (None = sent) per row. Rows with the same non-None group_key(row) are
+        handed over together and rate limited as a single message.
+        """
+        self._senders[channel] = send_many
+        self._group_keys[channel] = group_key
+
+    def add(self, channel, recipient, body, subject="", user_id=None, dedupe_key=None, attachment=None, delay=0):
+        """Queue one message, due in `delay` seconds (committed immediately unless inside batch())."""
+        row = {
+            "channel": channel, "recipient": recipient, "subject": subject, "body": body,
+            "user_id": user_id, "dedupe_key": dedupe_key, "attachment": attachment,
+        }
+        if delay:
+            row["next_attempt_at"] = datetime.utcnow() + timedelta(seconds=delay)
+        pending = getattr(self._buffer, "rows", None)
+        if pending is not None:
+            pending.append(row)
+        else:
+            self.enqueue([row])
+            db.session.commit()
+        return True
+
+    def enqueue(self, rows):
+        """Insert messages in the caller's transaction; rows whose dedupe_key exists are skipped."""
+        if not rows:
+            return
+        now = datetime.utcnow()
+        for row in rows:
+            row.setdefault("status", "pending")
+            row.setdefault("attempts", 0)
+            row.setdefault("next_attempt_at", now)
+            row.setdefault("created_at", now)
+
+        upsert = UPSERT_INSERTS.get(db.session.get_bind().dialect.name)
+        if upsert is not None:
+            db.session.execute(
+                upsert(NotificationOutbox.__table__).on_conflict_do_nothing(index_elements=["dedupe_key"]),
+                rows,
+            )
+            return
+
+        keys = {row["dedupe_key"] for row in rows if row["dedupe_key"]}
+        existing = set(db.session.scalars(
+            select(NotificationOutbox.dedupe_key).where(NotificationOutbox.dedupe_key.in_(keys))
+        )) if keys else set()
+        fresh = []
+        for row in rows:
+            if row["dedupe_key"] is None or row["dedupe_key"] not in existing:
+                existing.add(row["dedupe_key"])
+                fresh.append(row)
+        if fresh:
+            db.session.execute(insert(NotificationOutbox.__table__), fresh)
+
+    @contextmanager
+    def batch(self):
+        """Buffer add() calls; one INSERT (and commit) when the outermost block exits cleanly."""
+        if getattr(self._buffer, "rows", None) is not None:
+            yield  # already batching: join the outer batch
+            return
+        self._buffer.rows = []
+        try:
+            yield
+            rows = self._buffer.rows
+        finally:
+            self._buffer.rows = None
+        self.enqueue(rows)
+        db.session.commit()
+
+    def _config(self):
+        config = current_app.config
+        return {
+            "limits": config["OUTBOX_RATE_LIMITS"],
+            "batch_size": config["OUTBOX_BATCH_SIZE"],
+            "max_attempts": config["OUTBOX_MAX_ATTEMPTS"],
+            "retry_base": config["OUTBOX_RETRY_BASE"],
+            "retry_max": config["OUTBOX_RETRY_MAX"],
+            "claim_timeout": config["OUTBOX_CLAIM_TIMEOUT"],
+        }
+
+    def release_stale_claims(self, claim_timeout):
+        """Put messages claimed by a worker that died mid-delivery back in the queue."""
+        cutoff = datetime.utcnow() - timedelta(seconds=claim_timeout)
+        outbox = NotificationOutbox.__table__
+        released = db.session.execute(
+            update(outbox)
+            .where(outbox.c.status == "sending", outbox.c.claimed_at < cutoff)
+            .values(status="pending", claimed_by=None)
+        ).rowcount
+        db.session.commit()
+        return released
+
+    def claim(self, channel, limit):
+        """Atomically mark up to `limit` due messages of a channel as ours; returns the rows."""
+        token = uuid.uuid4().hex
+        now = datetime.utcnow()
+        outbox = NotificationOutbox.__table__
+        due = (
+            select(outbox.c.id)
+            .where(outbox.c.status == "pending", outbox.c.channel == channel, outbox.c.next_attempt_at <= now)
+            .order_by(outbox.c.next_attempt_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        db.session.execute(
+            update(outbox)
+            .where(outbox.c.id.in_(due), outbox.c.status == "pending")
+            .values(status="sending", claimed_by=token, claimed_at=now)
+        )
+        db.session.commit()
+        # Plain rows, not ORM objects: nothing to expire/refresh after the commits that follow
+        return db.session.execute(
+            select(outbox).where(outbox.c.claimed_by == token).order_by(outbox.c.id)
+        ).all()
+
+    def backoff(self, attempts, settings):
+        """Seconds before retry number `attempts`: exponential with +/-20% jitter, capped."""
+        delay = min(settings["retry_max"], settings["retry_base"] * 2 ** (attempts - 1))
+        return delay * random.uniform(0.8, 1.2)
+
+    def complete(self, rows, errors, settings):
+        """Record delivery results: sent, scheduled for retry, or failed for good."""
+        now = datetime.utcnow()
+        sent, retry, dead = [], [], []
+        for row, error in zip(rows, errors):
+            if error is None:
+                sent.append({"b_id": row.id})
+                continue
+            attempts = row.attempts + 1
+            values = {"b_id": row.id, "b_attempts": attempts, "b_error": str(error)[:500]}
+            if attempts >= settings["max_attempts"]:
+                dead.append((row, values))
+            else:
+                values["b_next"] = now + timedelta(seconds=self.backoff(attempts, settings))
+                retry.append(values)
+
+        outbox = NotificationOutbox.__table__
+        by_id = outbox.c.id == bindparam("b_id")
+        if sent:
+            db.session.execute(
+                update(outbox).where(by_id).values(status="sent", sent_at=now, claimed_by=None), sent
+            )
+        if retry:
+            db.session.execute(
+                update(outbox).where(by_id).values(
+                    status="pending", attempts=bindparam("b_attempts"), last_error=bindparam("b_error"),
+                    next_attempt_at=bindparam("b_next"), claimed_by=None,
+                ),
+                retry,
+            )
+        if dead:
+            db.session.execute(
+                update(outbox).where(by_id).values(
+                    status="failed", attempts=bindparam("b_attempts"), last_error=bindparam("b_error"),
+                    claimed_by=None,
+                ),
+                [values for _, values in dead],
+            )
+            self._fall_back([row for row, _ in dead])
+        db.session.commit()
+        return len(sent), len(retry), len(dead)
+
+    def _fall_back(self, rows):
+        """Copy permanently failed messages to the global Google Chat webhook, if one is configured."""
+        webhook = current_app.config.get("GOOGLE_CHAT_WEBHOOK")
+        if not webhook:
+            return
+        self.enqueue([
+            {
+                "channel": "gchat", "recipient": webhook, "subject": row.subject, "body": row.body,
+                "user_id": row.user_id, "attachment": None,
+                "dedupe_key": f"fallback:{row.id}",
+            }
+            for row in rows if row.channel != "gchat"
+        ])
+
+    def drain(self, channels=CHANNELS, max_seconds=None):
+        """
+        Deliver due messages until none are left or `max_seconds` pass.
+        Returns {"sent", "retried", "failed"} counts for this run.
+        """
+        settings = self._config()
+        deadline = time.time() + (max_seconds or current_app.config["OUTBOX_DRAIN_SECONDS"])
+        totals = {"sent": 0, "retried": 0, "failed": 0}
+        self.release_stale_claims(settings["claim_timeout"])
+
+        active = [channel for channel in channels if channel in self._senders]
+        while active and time.time() < deadline:
+            for channel in list(active):
+                rows = self.claim(channel, settings["batch_size"])
+                if not rows:
+                    active.remove(channel)
+                    continue
+                self._deliver(channel, rows, settings, deadline, totals)
+        return totals
+
+    def _units(self, channel, rows):
+        """Split claimed rows into rate-limited units: single rows, or groups sharing a group key."""
+        group_key = self._group_keys.get(channel)
+        if group_key is None:
+            return [[row] for row in rows]
+        units, grouped = [], {}
+        for row in rows:
+            key = group_key(row)
+            if key is None:
+                units.append([row])
+            elif key in grouped:
+                grouped[key].append(row)
+            else:
+                grouped[key] = [row]
+                units.append(grouped[key])
+        return units
+
+    def _deliver(self, channel, rows, settings, deadline, totals):
+        """Send claimed rows as fast as the channel's bucket allows."""
+        rate, burst = settings["limits"][channel]
+        units = self._units(channel, rows)
+        position = 0
+        while position < len(units):
+            granted = self.limiter.acquire(channel, len(units) - position, rate, burst, deadline)
+            if not granted:
+                # Out of time: hand the rest back without counting an attempt
+                self._unclaim([row for unit in units[position:] for row in unit])
+                return
+            chunk = [row for unit in units[position:position + granted] for row in unit]
+            position += granted
+            sent, retried, failed = self.complete(chunk, self._senders[channel](chunk), settings)
+            totals["sent"] += sent
+            totals["retried"] += retried
+            totals["failed"] += failed
+
+    def _unclaim(self, rows):
+        outbox = NotificationOutbox.__table__
+        db.session.execute(
+            update(outbox).where(outbox.c.id.in_([row.id for row in rows])).values(status="pending", claimed_by=None)
+        )
+        db.session.commit()
+
+    def prune(self, days):
+        """Delete delivered and failed messages older than `days`. Returns the number deleted."""
+        cutoff = datetime.utcnow() - timedelta(days=days)
+        deleted = db.session.execute(
+            delete(NotificationOutbox).where(
+                NotificationOutbox.status.in_(("sent", "failed")), NotificationOutbox.created_at < cutoff
+            )
+        ).rowcount
+        db.session.commit()
+        return deleted
+
+    def stats(self):
+        rows = db.session.execute(
+            select(NotificationOutbox.channel, NotificationOutbox.status, func.count())
+            .group_by(NotificationOutbox.channel, NotificationOutbox.status)
+        )
+        return [(channel, status, count) for channel, status, count in rows]
+
+
+outbox = Outbox()
+
+outbox_cli = AppGroup("outbox", help="Notification outbox.")
+
+
+@outbox_cli.command("status")
+def status_command():
+    """Message counts per channel and delivery state."""
+    for channel, status, count in outbox.stats():
+        click.echo(f"{channel:6} {status:8} {count}")
+
+
+@outbox_cli.command("drain")
+@click.option("--seconds", default=60, show_default=True, help="Stop after this long.")
+def drain_command(seconds):
+    """Deliver due messages from this process."""
+    click.echo(outbox.drain(max_seconds=seconds))
+
+
+@outbox_cli.command("prune")
+@click.option("--days", default=7, show_default=True, help="Keep finished messages this many days.")
+def prune_command(days):
+    """Delete delivered/failed messages older than --days (their dedupe keys go with them)."""
+    click.echo(f"Pruned {outbox.prune(days)} messages")
@@ -1,53 +1,33 @@
 from flask import request
 from flask_restful import Resource, abort
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from applications.models import db, Users, ParkingLot, ParkingSpot, Reservation
-from .api import cache
+from applications.models import db, ParkingLot, ParkingSpot, Reservation
+from applications.authz import admin_required, user_required
+from applications.database import read_only
+from applications.loaders import load_lots_with_spots
+from applications.occupancy import occupancy
+from applications.cache_tags import cached
+from applications.provisioning import add_spots, remove_free_spots, delete_lot_spots, parse_import, import_lots
+from applications.reservation_api import parse_bool
 
 class ParkingLotsAPI(Resource):
-    @jwt_required()
-    @cache.memoize(timeout=60)
+    @user_required
+    @read_only
     def get(self, lot_id=None):
         """Fetch parking lots. If lot_id is provided, fetch specific lot."""
-        user_id = get_jwt_identity()
-        user = Users.query.get(user_id)
-        if not user:
-            abort(403, message="User not found")
-
-        def build_spot_data(spot):
-            spot_info = spot.convert_to_json()
-            if spot.status == "O" and spot.reservations:
-                latest_reservation = sorted(
-                    spot.reservations, key=lambda r: r.parking_timestamp
-                )[-1]
-                spot_info["reservation"] = latest_reservation.convert_to_json()
-                spot_info["user_id"] = latest_reservation.user_id
-                spot_info["car_number"] = getattr(latest_reservation, "vehicle_number", None)
-            return spot_info
-
         if lot_id:
-            lot = ParkingLot.query.get(lot_id)
-            if not lot:
+            lots_data = cached(
+                f"parking_lots:{lot_id}", [f"lot:{lot_id}"], lambda: load_lots_with_spots(lot_id)
+            )
+            if not lots_data:
                 abort(404, message="Parking lot not found")
-            spots_data = [build_spot_data(spot) for spot in lot.spots]
-            return {**lot.convert_to_json(include_spots=False), "spots": spots_data}, 200
-
-        lots = ParkingLot.query.all()
-        lots_data = []
-        for lot in lots:
-            spots_data = [build_spot_data(spot) for spot in lot.spots]
-            lots_data.append({**lot.convert_to_json(include_spots=False), "spots": spots_data})
+            return lots_data[0], 200
 
+        lots_data = cached("parking_lots:all", ["lots"], load_lots_with_spots)
         return {"parking_lots": lots_data}, 200
 
-    @jwt_required()
+    @admin_required
     def post(self):
         """Admin: Add a new parking lot."""
-        user_id = get_jwt_identity()
-        user = Users.query.get(user_id)
-        if not user or not user.is_admin:
-            abort(403, message="Admin access required")
-
         data = request.json or {}
         prime_location_name = data.get("prime_location_name", "").strip()
         price = data.get("price")
@@ -68,25 +48,18 @@ class ParkingLotsAPI(Resource):
             number_of_spots=number_of_spots
         )
         db.session.add(new_lot)
-        db.session.commit()
+        db.session.flush()
 
-        # Auto-create parking spots
-        for _ in range(number_of_spots):
-            spot = ParkingSpot(lot_id=new_lot.id, status="A")
-            db.session.add(spot)
+        # Auto-create parking spots in one statement, same transaction as the lot
+        add_spots(new_lot.id, number_of_spots)
         db.session.commit()
 
-        cache.delete_memoized(ParkingLotsAPI.get)
+        occupancy.add_spots(new_lot.id, number_of_spots)
         return new_lot.convert_to_json(include_spots=True), 201
 
-    @jwt_required()
+    @admin_required
     def put(self, lot_id):
         """Admin: Update parking lot details."""
-        user_id = get_jwt_identity()
-        user = Users.query.get(user_id)
-        if not user or not user.is_admin:
-            abort(403, message="Admin access required")
-
         lot = ParkingLot.query.get(lot_id)
         if not lot:
             abort(404, message="Parking lot not found")
@@ -100,36 +73,33 @@ class ParkingLotsAPI(Resource):
             lot.address = data["address"].strip()
         if "pin_code" in data:
             lot.pin_code = data["pin_code"].strip()
+        added = removed = 0
         if "number_of_spots" in data:
             difference = data["number_of_spots"] - lot.number_of_spots
             if difference > 0:
-                for _ in range(difference):
-                    spot = ParkingSpot(lot_id=lot.id, status="A")
-                    db.session.add(spot)
+                added = add_spots(lot.id, difference)
             elif difference < 0:
-                spots_to_remove = ParkingSpot.query.filter_by(lot_id=lot.id, status="A").limit(-difference).all()
-                if len(spots_to_remove) < -difference:
+                free = remove_free_spots(lot.id, -difference)
+                if free < -difference:
+                    db.session.rollback()
                     abort(
                         400,
                         message=f"Cannot reduce to {data['number_of_spots']} spots. "
-                                f"Only {len(spots_to_remove)} free spots available."
+                                f"Only {free} free spots available."
                     )
-                for spot in spots_to_remove:
-                    db.session.delete(spot)
+                removed = free
             lot.number_of_spots = data["number_of_spots"]
 
         db.session.commit()
-        cache.delete_memoized(ParkingLotsAPI.get)
+        if added:
+            occupancy.add_spots(lot.id, added)
+        if removed:
+            occupancy.remove_spots(lot.id, removed)
         return lot.convert_to_json(include_spots=True), 200
 
-    @jwt_required()
+    @admin_required
     def delete(self, lot_id):
         """Admin: Delete a parking lot only if all spots are free and no active reservations exist."""
-        user_id = get_jwt_identity()
-        user = Users.query.get(user_id)
-        if not user or not user.is_admin:
-            abort(403, message="Admin access required")
-
         lot = ParkingLot.query.get(lot_id)
         if not lot:
             abort(404, message="Parking lot not found")
@@ -145,8 +115,48 @@ class ParkingLotsAPI(Resource):
         if active_reservations > 0:
             abort(400, message="Cannot delete lot: active reservations exist")
 
+        delete_lot_spots(lot.id)
         db.session.delete(lot)
         db.session.commit()
-        cache.delete_memoized(ParkingLotsAPI.get)
+        occupancy.drop_lot(lot_id)
 
         return {"message": "Parking lot deleted successfully"}, 200
+
+
+class LotAvailabilityAPI(Resource):
+    @user_required
+    @read_only
+    def get(self):
+        """Free/occupied counts per lot, answered from the Redis occupancy index."""
+        return {"availability": occupancy.availability()}, 200
+
+
+class LotImportAPI(Resource):
+    @admin_required
+    def post(self):
+        """
+        Admin: create many lots (and their spots) from a CSV or JSON document
+        in a single transaction. Accepts a multipart "file" upload, a text/csv
+        body, or JSON ([...] or {"lots": [...]}) with columns
+        prime_location_name, price, address, pin_code, number_of_spots.
+        ?dry_run=true only validates. Any invalid row rejects the whole import.
+        """
+        upload = request.files.get("file")
+        try:
+            if upload:
+                rows = parse_import(upload.read(), upload.mimetype or "", upload.filename or "")
+            else:
+                rows = parse_import(request.get_data(), request.mimetype or "")
+        except (ValueError, UnicodeDecodeError) as e:
+            abort(400, message=f"Could not parse import: {e}")
+
+        report, created = import_lots(rows, dry_run=parse_bool(request.args.get("dry_run")))
+        if report["errors"]:
+            return report, 400
+        if not created:
+            return report, 200
+
+        db.session.commit()
+        for lot_id, spots in created:
+            occupancy.add_spots(lot_id, spots)
+        return report, 201
@@ -1,38 +1,23 @@
 from flask import request
-from applications.models import db, Users, ParkingLot, ParkingSpot, Reservation
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from applications.models import db, ParkingSpot
+from applications.authz import admin_required
+from applications.database import read_only
 from flask_restful import Resource, abort
-from .api import cache
+from applications.loaders import load_lots_with_spots
+from applications.cache_tags import cached
 
 
 class ParkingSpotsAPI(Resource):
-    @jwt_required()
-    @cache.memoize(timeout=60)
+    @admin_required
+    @read_only
     def get(self, lot_id):
         """Admin: Fetch all spots in a given lot with reservation details"""
-        user_id = get_jwt_identity()
-        user = Users.query.get(user_id)
-        if not user or not user.is_admin:
-            abort(403, message="Admin access required")
-
-        lot = ParkingLot.query.get(lot_id)
-        if not lot:
+        lots_data = cached(
+            f"parking_lots:{lot_id}", [f"lot:{lot_id}"], lambda: load_lots_with_spots(lot_id)
+        )
+        if not lots_data:
             abort(404, message="Parking lot not found")
 
-        spots_data = []
-        for spot in lot.spots:
-            spot_info = spot.convert_to_json()
-
-            if spot.status == "O":
-                active_reservation = Reservation.query.filter_by(
-                    spot_id=spot.id, leaving_timestamp=None
-                ).first()
-                if active_reservation:
-                    reservation_info = active_reservation.convert_to_json()
-                    spot_info["reservation"] = reservation_info
-                    spot_info["user_id"] = active_reservation.user_id
-                    spot_info["car_number"] = getattr(active_reservation, "vehicle_number", None)
-
-            spots_data.append(spot_info)
+        spots_data = lots_data[0]["spots"]
 
         return {"parking_spots": spots_data}, 200
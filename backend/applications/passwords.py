@@ -0,0 +1,78 @@
+# applications/passwords.py
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from flask import current_app
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+class HashingBusy(Exception):
+    """Raised when too many hash operations are already queued, or one did not finish in time."""
+
+
+class PasswordHasher:
+    """
+    Runs password hashing/verification on a bounded process pool so a login
+    burst cannot pin the request threads. At most PASSWORD_HASH_MAX_PENDING
+    operations may be queued; beyond that, or when an operation takes longer
+    than PASSWORD_HASH_TIMEOUT, callers get HashingBusy (-> 503).
+    PASSWORD_HASH_WORKERS = 0 hashes inline on the calling thread.
+    """
+
+    def __init__(self):
+        self._pool = None
+        self._slots = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.workers = app.config.get("PASSWORD_HASH_WORKERS", 2)
+        self.timeout = app.config.get("PASSWORD_HASH_TIMEOUT", 10)
+        self._slots = threading.BoundedSemaphore(app.config.get("PASSWORD_HASH_MAX_PENDING", 32))
+        app.extensions["password_hasher"] = self
+
+    def _executor(self):
+        with self._lock:
+            if self._pool is None:
+                # spawn: never fork a multi-threaded web worker
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._pool
+
+    def _run(self, fn, *args):
+        if not self.workers:
+            return fn(*args)
+        if not self._slots.acquire(blocking=False):
+            raise HashingBusy()
+        try:
+            future = self._executor().submit(fn, *args)
+            try:
+                return future.result(timeout=self.timeout)
+            except FutureTimeout:
+                future.cancel()  # still queued: never run it
+                current_app.logger.warning(f"Password hashing took longer than {self.timeout}s")
+                raise HashingBusy()
+        except BrokenProcessPool:
+            # A worker died; start a fresh pool on the next call
+            with self._lock:
+                self._pool = None
+            current_app.logger.exception("Password hashing pool broke")
+            raise HashingBusy()
+        finally:
+            self._slots.release()
+
+    def hash(self, password):
+        method = current_app.config.get("PASSWORD_HASH_METHOD", "scrypt:32768:8:1")
+        return self._run(generate_password_hash, password, method)
+
+    def verify(self, stored_hash, password):
+        return self._run(check_password_hash, stored_hash, password)
+
+    def needs_rehash(self, stored_hash):
+        """True if the stored hash was made with other parameters than PASSWORD_HASH_METHOD."""
+        method = current_app.config.get("PASSWORD_HASH_METHOD", "scrypt:32768:8:1")
+        return stored_hash.split("$", 1)[0] != method
+
+
+hasher = PasswordHasher()
@@ -0,0 +1,194 @@
+# applications/provisioning.py
+import csv
+import io
+import json
+import math
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import DBAPIError
+from applications.models import db, ParkingLot, ParkingSpot, Reservation
+from applications.cache_tags import invalidate_on_commit
+
+# Spots are created/removed with set-based Core statements (one table-level
+# executemany INSERT that skips the ORM bulk path, one DELETE) instead of one
+# ORM object per row, so large lots are provisioned in milliseconds and the
+# SQLite write lock is held briefly.
+# Callers commit, then update the occupancy index.
+
+MAX_IMPORT_LOTS = 5000
+MAX_SPOTS_PER_LOT = 10000
+MAX_IMPORT_SPOTS = 200000  # across all lots of one import
+SPOT_INSERT_CHUNK = 10000  # rows per executemany, bounding memory per statement
+
+
+def add_spots(lot_id, count):
+    """Insert `count` free spots into a lot with a single executemany INSERT."""
+    if count > 0:
+        db.session.execute(insert(ParkingSpot.__table__), [{"lot_id": lot_id, "status": "A"}] * count)
+    return max(count, 0)
+
+
+def remove_free_spots(lot_id, count):
+    """
+    Delete `count` free spots of a lot (highest ids first) and detach their
+    past reservations. Returns the number of free spots removed; when that is
+    fewer than `count` (too few free, or some were claimed meanwhile) the
+    caller must roll back.
+    """
+    spot_ids = db.session.scalars(
+        select(ParkingSpot.id)
+        .where(ParkingSpot.lot_id == lot_id, ParkingSpot.status == "A")
+        .order_by(ParkingSpot.id.desc())
+        .limit(count)
+    ).all()
+    if len(spot_ids) < count:
+        return len(spot_ids)
+    _detach_reservations(ParkingSpot.id.in_(spot_ids))
+    # Re-check the status: a claim may have taken one of these spots since the SELECT
+    result = db.session.execute(
+        delete(ParkingSpot).where(ParkingSpot.id.in_(spot_ids), ParkingSpot.status == "A"),
+        execution_options={"synchronize_session": False},
+    )
+    return result.rowcount
+
+
+def delete_lot_spots(lot_id):
+    """Delete every spot of a lot in a couple of statements instead of via the ORM cascade."""
+    _detach_reservations(ParkingSpot.lot_id == lot_id)
+    db.session.execute(
+        delete(ParkingSpot).where(ParkingSpot.lot_id == lot_id),
+        execution_options={"synchronize_session": False},
+    )
+
+
+def _detach_reservations(spot_filter):
+    """Set spot_id NULL on reservations of the matching spots, as ON DELETE SET NULL would."""
+    spot_ids = select(ParkingSpot.id).where(spot_filter).scalar_subquery()
+    user_ids = db.session.scalars(
+        select(Reservation.user_id).where(Reservation.spot_id.in_(spot_ids)).distinct()
+    ).all()
+    if not user_ids:
+        return
+    db.session.execute(
+        update(Reservation).where(Reservation.spot_id.in_(spot_ids)).values(spot_id=None),
+        execution_options={"synchronize_session": False},
+    )
+    invalidate_on_commit(db.session, *(f"user:{user_id}" for user_id in user_ids))
+
+
+def parse_import(payload, content_type="", filename=""):
+    """
+    Turn an uploaded CSV or JSON document into a list of row dicts.
+    JSON may be a list of lots or {"lots": [...]}; CSV needs a header row.
+    """
+    if isinstance(payload, bytes):
+        payload = payload.decode("utf-8-sig")
+
+    is_csv = "csv" in content_type or filename.lower().endswith(".csv")
+    if not is_csv:
+        data = json.loads(payload) if isinstance(payload, str) else payload
+        if isinstance(data, dict):
+            data = data.get("lots")
+        if not isinstance(data, list):
+            raise ValueError('Expected a list of lots or {"lots": [...]}')
+        return data
+
+    return list(csv.DictReader(io.StringIO(payload)))
+
+
+def validate_lot(row):
+    """Return (clean_values, errors) for one import row."""
+    if not isinstance(row, dict):
+        return None, ["Row must be an object"]
+
+    errors = []
+    clean = {}
+    for field in ("prime_location_name", "address", "pin_code"):
+        value = str(row.get(field) or "").strip()
+        if not value:
+            errors.append(f"{field} is required")
+        clean[field] = value
+    if len(clean["pin_code"]) > 10:
+        errors.append("pin_code must be at most 10 characters")
+
+    try:
+        clean["price"] = float(row.get("price"))
+        if not math.isfinite(clean["price"]) or clean["price"] <= 0:
+            errors.append("price must be a positive number")
+    except (TypeError, ValueError):
+        errors.append("price must be a number")
+
+    try:
+        clean["number_of_spots"] = int(row.get("number_of_spots"))
+        if not 0 < clean["number_of_spots"] <= MAX_SPOTS_PER_LOT:
+            errors.append(f"number_of_spots must be between 1 and {MAX_SPOTS_PER_LOT}")
+    except (TypeError, ValueError):
+        errors.append("number_of_spots must be an integer")
+
+    return clean, errors
+
+
+def import_lots(rows, dry_run=False):
+    """
+    Validate every row, then add all lots and their spots to the session
+    (nothing is added if any row is invalid); the caller commits once.
+    Returns (report, created_lots) where created_lots is [(lot_id, spots)].
+    """
+    report = {"rows": len(rows), "errors": [], "lots_created": 0, "spots_created": 0}
+    if len(rows) > MAX_IMPORT_LOTS:
+        report["errors"].append({"row": None, "errors": [f"At most {MAX_IMPORT_LOTS} lots per import"]})
+        return report, []
+
+    valid = []
+    for index, row in enumerate(rows, start=1):
+        clean, errors = validate_lot(row)
+        if errors:
+            report["errors"].append({"row": index, "errors": errors})
+        else:
+            valid.append(clean)
+
+    total_spots = sum(values["number_of_spots"] for values in valid)
+    if total_spots > MAX_IMPORT_SPOTS:
+        report["errors"].append({"row": None, "errors": [f"At most {MAX_IMPORT_SPOTS} spots per import"]})
+    if report["errors"] or dry_run:
+        return report, []
+
+    # ORM add so the lots fire the usual cache-tag events; ids come back in one round trip
+    lots = [ParkingLot(**values) for values in valid]
+    db.session.add_all(lots)
+    try:
+        db.session.flush()
+    except DBAPIError:
+        db.session.rollback()
+        report["errors"] = _rejected_rows(valid)
+        return report, []
+
+    pending = []
+    for lot in lots:
+        pending += [{"lot_id": lot.id, "status": "A"}] * lot.number_of_spots
+        if len(pending) >= SPOT_INSERT_CHUNK:
+            db.session.execute(insert(ParkingSpot.__table__), pending)
+            pending = []
+    if pending:
+        db.session.execute(insert(ParkingSpot.__table__), pending)
+
+    created = [(lot.id, lot.number_of_spots) for lot in lots]
+    report["lots_created"] = len(created)
+    report["spots_created"] = total_spots
+    report["lot_ids"] = [lot_id for lot_id, _ in created]
+    return report, created
+
+
+def _rejected_rows(valid):
+    """
+    After the batch insert failed: try each lot alone (rolled back either way)
+    to report which rows the database refuses and why.
+    """
+    errors = []
+    for index, values in enumerate(valid, start=1):
+        db.session.add(ParkingLot(**values))
+        try:
+            db.session.flush()
+        except DBAPIError as e:
+            errors.append({"row": index, "errors": [f"Rejected by the database: {e.orig}"]})
+        db.session.rollback()
+    return errors or [{"row": None, "errors": ["Rejected by the database"]}]
@@ -0,0 +1,80 @@
+# applications/query_plans.py
+import re
+from datetime import datetime
+from sqlalchemy import case, func, tuple_
+from applications.authz import Principal
+from applications.loaders import active_reservations_query
+from applications.activity import inactive_users_filter
+from applications.models import db, ParkingLot, ParkingSpot, Reservation, MonthlyUserStats, Users
+from applications.reservation_api import filter_reservations, free_spot_candidates
+
+TABLE_SCAN = re.compile(r"^SCAN (\w+)(?! USING)")
+
+
+def hot_queries():
+    """(name, query) pairs for the selective queries the APIs run on every request."""
+    admin, user = Principal(1, True), Principal(2, False)
+    page_order = (Reservation.parking_timestamp, Reservation.id)
+    after = tuple_(*page_order) > (datetime(2024, 1, 1), 1)
+
+    return [
+        ("reservations page (user)",
+         filter_reservations(Reservation.query, {}, user).order_by(*page_order).limit(101)),
+        ("reservations page (admin, after cursor)",
+         Reservation.query.filter(after).order_by(*page_order).limit(101)),
+        ("reservations by vehicle",
+         filter_reservations(Reservation.query, {"vehicle_number": "KA01"}, admin).order_by(*page_order).limit(101)),
+        ("reservations in lot",
+         filter_reservations(Reservation.query, {"lot_id": 1}, admin).order_by(*page_order).limit(101)),
+        ("active reservations of lot", active_reservations_query(1)),
+        ("spots of lot", ParkingSpot.query.filter(ParkingSpot.lot_id == 1).order_by(ParkingSpot.id)),
+        ("free spot candidates", free_spot_candidates(1)),
+        ("occupied spots in lot", ParkingSpot.query.filter_by(lot_id=1, status="O")),
+        ("active reservations in lot",
+         Reservation.query.join(ParkingSpot).filter(ParkingSpot.lot_id == 1, Reservation.leaving_timestamp.is_(None))),
+        ("open reservation of spot",
+         Reservation.query.filter_by(spot_id=1, leaving_timestamp=None)),
+        ("user summary totals",
+         db.session.query(
+             func.count(Reservation.id),
+             func.sum(Reservation.parking_cost),
+             func.sum(case((Reservation.leaving_timestamp.is_(None), 1), else_=0)),
+         ).filter(Reservation.user_id == 2)),
+        ("user lot usage",
+         db.session.query(ParkingLot.prime_location_name, func.count(Reservation.id))
+         .join(ParkingSpot, ParkingSpot.id == Reservation.spot_id)
+         .join(ParkingLot, ParkingLot.id == ParkingSpot.lot_id)
+         .filter(Reservation.user_id == 2)
+         .group_by(ParkingLot.id, ParkingLot.prime_location_name)),
+        ("user monthly stats", MonthlyUserStats.query.filter(MonthlyUserStats.user_id == 2)),
+        ("inactive users (reminders)",
+         Users.query.filter(Users.is_admin.is_(False), inactive_users_filter(datetime(2024, 1, 1)))),
+        ("new lots (broadcast)", ParkingLot.query.filter(ParkingLot.created_at >= datetime(2024, 1, 1))),
+    ]
+
+
+def explain(query):
+    stmt = getattr(query, "statement", query)
+    compiled = stmt.compile(dialect=db.engine.dialect, compile_kwargs={"render_postcompile": True})
+    params = tuple(compiled.params[name] for name in compiled.positiontup)
+    rows = db.session.connection().exec_driver_sql("EXPLAIN QUERY PLAN " + str(compiled), params)
+    return [row[-1] for row in rows]
+
+
+def check_plans(echo=print):
+    """Print each hot query's plan; return the names of queries that scan a whole table."""
+    if db.engine.dialect.name != "sqlite":
+        echo("Plan checks use EXPLAIN QUERY PLAN and only run on SQLite")
+        return []
+
+    tables = set(db.metadata.tables)
+    failures = []
+    for name, query in hot_queries():
+        plan = explain(query)
+        scans = [m.group(1) for m in map(TABLE_SCAN.match, plan) if m and m.group(1) in tables]
+        echo(f"{'FAIL' if scans else 'ok  '} {name}")
+        for line in plan:
+            echo(f"       {line}")
+        if scans:
+            failures.append(name)
+    return failures
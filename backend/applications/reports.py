@@ -0,0 +1,124 @@
+# applications/reports.py
+from collections import defaultdict
+from functools import lru_cache
+from flask import current_app
+from jinja2 import ChoiceLoader, DictLoader, Environment, FileSystemBytecodeCache, FileSystemLoader, select_autoescape
+from sqlalchemy import func, select
+from applications.models import db, ParkingLot, ParkingSpot, Reservation
+
+REPORT_TEMPLATE = "report.html"
+
+# Used when no report.html exists in REPORT_TEMPLATE_DIR
+INLINE_REPORT = """
+<html><body>
+  <h2>Monthly Parking Report for {{ username }} ({{ month }})</h2>
+  <div>
+    <h3>Summary</h3>
+    <ul>
+      <li>Total bookings this month: {{ summary.total_bookings }}</li>
+      <li>Most used parking lot: {{ summary.most_used_lot }}</li>
+      <li>Total amount spent: {{ summary.total_spent }}</li>
+    </ul>
+  </div>
+  <div>
+    <h3>Details</h3>
+    <table border='1' cellpadding='4'>
+      <tr><th>id</th><th>spot_id</th><th>lot</th><th>start</th><th>end</th><th>cost</th></tr>
+      {% for b in bookings %}
+      <tr><td>{{ b.id }}</td><td>{{ b.spot_id or '' }}</td><td>{{ b.lot_name or 'N/A' }}</td><td>{{ b.parking_timestamp }}</td><td>{{ b.leaving_timestamp or '' }}</td><td>{{ b.parking_cost or 0 }}</td></tr>
+      {% endfor %}
+    </table>
+  </div>
+</body></html>
+"""
+
+EMPTY_SUMMARY = {"total_bookings": 0, "total_spent": 0.0, "most_used_lot": "N/A"}
+
+
+@lru_cache(maxsize=None)
+def _environment(template_dir, cache_dir):
+    return Environment(
+        loader=ChoiceLoader([FileSystemLoader(template_dir), DictLoader({REPORT_TEMPLATE: INLINE_REPORT})]),
+        # Compiled templates survive worker restarts; auto_reload off skips the per-render stat()
+        bytecode_cache=FileSystemBytecodeCache(cache_dir) if cache_dir else FileSystemBytecodeCache(),
+        auto_reload=False,
+        autoescape=select_autoescape(["html"]),
+    )
+
+
+def template_env():
+    """The process-wide report Environment (templates are compiled once per worker)."""
+    config = current_app.config
+    return _environment(config["REPORT_TEMPLATE_DIR"], config.get("REPORT_TEMPLATE_CACHE_DIR"))
+
+
+def month_aggregates(id_range, start, end, user_ids=None):
+    """
+    Per-user bookings, spend and most used lot (by name) for reservations
+    parked in [start, end], for users in an inclusive id range, in one
+    grouped query. Returns {user_id: summary}.
+    """
+    stmt = (
+        select(
+            Reservation.user_id,
+            ParkingLot.prime_location_name,
+            func.count(Reservation.id),
+            func.coalesce(func.sum(Reservation.parking_cost), 0.0),
+        )
+        .outerjoin(ParkingSpot, ParkingSpot.id == Reservation.spot_id)
+        .outerjoin(ParkingLot, ParkingLot.id == ParkingSpot.lot_id)
+        .where(
+            Reservation.user_id.between(*id_range),
+            Reservation.parking_timestamp.between(start, end),
+        )
+        .group_by(Reservation.user_id, ParkingLot.id, ParkingLot.prime_location_name)
+    )
+    if user_ids is not None:
+        stmt = stmt.where(Reservation.user_id.in_(user_ids))
+
+    summaries = {}
+    top = {}
+    for user_id, lot_name, bookings, spent in db.session.execute(stmt):
+        summary = summaries.setdefault(user_id, {"total_bookings": 0, "total_spent": 0.0})
+        summary["total_bookings"] += bookings
+        summary["total_spent"] += spent
+        if lot_name and (user_id not in top or bookings > top[user_id][0]):
+            top[user_id] = (bookings, lot_name)
+
+    for user_id, summary in summaries.items():
+        summary["total_spent"] = round(summary["total_spent"], 2)
+        summary["most_used_lot"] = top[user_id][1] if user_id in top else "N/A"
+    return summaries
+
+
+def month_bookings(id_range, start, end, user_ids=None):
+    """Reservation rows for the report tables, {user_id: [row, ...]} in parking order, in one query."""
+    stmt = (
+        select(
+            Reservation.user_id, Reservation.id, Reservation.spot_id,
+            Reservation.parking_timestamp, Reservation.leaving_timestamp, Reservation.parking_cost,
+            ParkingLot.prime_location_name.label("lot_name"),
+        )
+        .outerjoin(ParkingSpot, ParkingSpot.id == Reservation.spot_id)
+        .outerjoin(ParkingLot, ParkingLot.id == ParkingSpot.lot_id)
+        .where(
+            Reservation.user_id.between(*id_range),
+            Reservation.parking_timestamp.between(start, end),
+        )
+        .order_by(Reservation.user_id, Reservation.parking_timestamp, Reservation.id)
+    )
+    if user_ids is not None:
+        stmt = stmt.where(Reservation.user_id.in_(user_ids))
+
+    rows = defaultdict(list)
+    for row in db.session.execute(stmt.execution_options(yield_per=1000)):
+        rows[row.user_id].append(row)
+    return rows
+
+
+def render_monthly_report(username, month, summary=None, bookings=()):
+    """Render the monthly report; rows are streamed through the template loop, not pre-built."""
+    template = template_env().get_template(REPORT_TEMPLATE)
+    return "".join(template.generate(
+        username=username, month=month, summary=summary or EMPTY_SUMMARY, bookings=bookings,
+    ))
@@ -1,9 +1,15 @@
 from flask import request
-from applications.models import db, Users, ParkingSpot, Reservation
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from applications.models import db, ParkingSpot, Reservation
+from applications.authz import current_principal, user_required
+from applications.database import read_only
+from applications.occupancy import occupancy
+from applications.rollups import record_reservation
+from applications.activity import record_reservation_activity
 from flask_restful import Resource
+from sqlalchemy import tuple_
 from sqlalchemy.exc import SQLAlchemyError
 from datetime import datetime, timezone, timedelta
+import base64, json, random
 
 # Define IST timezone
 IST = timezone(timedelta(hours=5, minutes=30))
@@ -28,14 +34,111 @@ def parse_iso_datetime(s: str) -> datetime:
     return dt
 
 
+# Page size for GET /api/reservations
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(reservation):
+    """Opaque keyset cursor for the (parking_timestamp, id) ordering."""
+    raw = json.dumps([reservation.parking_timestamp.isoformat(), reservation.id])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    ts, res_id = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+    return datetime.fromisoformat(ts), int(res_id)
+
+
+def parse_bool(value):
+    return str(value).lower() in ("1", "true", "yes")
+
+
+def filter_reservations(query, args, user):
+    """
+    Apply ReservationAPI.get query-string filters:
+    lot_id, user_id (admin only), active, vehicle_number,
+    parked_from/parked_to, left_from/left_to (ISO 8601).
+    """
+    if not user.is_admin:
+        query = query.filter(Reservation.user_id == user.id)
+    elif args.get("user_id"):
+        query = query.filter(Reservation.user_id == int(args["user_id"]))
+
+    if args.get("lot_id"):
+        spot_ids = db.session.query(ParkingSpot.id).filter(ParkingSpot.lot_id == int(args["lot_id"]))
+        query = query.filter(Reservation.spot_id.in_(spot_ids))
+
+    if "active" in args:
+        if parse_bool(args["active"]):
+            query = query.filter(Reservation.leaving_timestamp.is_(None))
+        else:
+            query = query.filter(Reservation.leaving_timestamp.isnot(None))
+
+    if args.get("vehicle_number"):
+        query = query.filter(Reservation.vehicle_number == args["vehicle_number"].strip())
+
+    if args.get("parked_from"):
+        query = query.filter(Reservation.parking_timestamp >= parse_iso_datetime(args["parked_from"]))
+    if args.get("parked_to"):
+        query = query.filter(Reservation.parking_timestamp <= parse_iso_datetime(args["parked_to"]))
+    if args.get("left_from"):
+        query = query.filter(Reservation.leaving_timestamp >= parse_iso_datetime(args["left_from"]))
+    if args.get("left_to"):
+        query = query.filter(Reservation.leaving_timestamp <= parse_iso_datetime(args["left_to"]))
+
+    return query
+
+
+# How many free spots to consider per round, and how many rounds to try.
+# A lost round means concurrent bookings took every candidate, so running
+# out of rounds while spots are still free takes very heavy contention.
+CLAIM_CANDIDATES = 8
+CLAIM_ROUNDS = 20
+
+
+class SpotContention(Exception):
+    """Raised when concurrent bookings won every candidate for CLAIM_ROUNDS rounds (-> 409, retry)."""
+
+
+def free_spot_candidates(lot_id, limit=CLAIM_CANDIDATES):
+    """Query for up to `limit` free spot ids in a lot (served by ix_parking_spots_lot_status)."""
+    return db.session.query(ParkingSpot.id).filter_by(lot_id=lot_id, status="A").limit(limit)
+
+
+def claim_spot(lot_id):
+    """
+    Atomically claim a free spot in a lot without a global lock.
+    Each candidate is taken with a conditional UPDATE ... WHERE status='A',
+    so only one concurrent caller can win a given spot. Returns the claimed
+    spot id (uncommitted, part of the caller's transaction), or None when the
+    lot has no free spot; raises SpotContention when free spots remain but
+    every round was lost.
+    """
+    for _ in range(CLAIM_ROUNDS):
+        candidates = [row.id for row in free_spot_candidates(lot_id)]
+        if not candidates:
+            return None
+
+        # Spread concurrent callers over different candidates
+        random.shuffle(candidates)
+        for spot_id in candidates:
+            claimed = (
+                ParkingSpot.query
+                .filter_by(id=spot_id, status="A")
+                .update({"status": "O"}, synchronize_session=False)
+            )
+            if claimed == 1:
+                return spot_id
+    raise SpotContention(lot_id)
+
+
 class ReservationAPI(Resource):
-    @jwt_required()
+    @user_required
+    @read_only
     def get(self, reservation_id=None):
         try:
-            user_id = get_jwt_identity()
-            user = Users.query.get(user_id)
-            if not user:
-                return {"error": "User not found"}, 404
+            user = current_principal()
 
             if reservation_id:
                 reservation = Reservation.query.get(reservation_id)
@@ -47,23 +150,38 @@ class ReservationAPI(Resource):
 
                 return reservation.convert_to_json(), 200
 
-            reservations = (
-                Reservation.query.all()
-                if user.is_admin
-                else Reservation.query.filter_by(user_id=user.id).all()
-            )
-            return {"reservations": [res.convert_to_json() for res in reservations]}, 200
+            args = request.args
+            try:
+                limit = min(max(int(args.get("limit", DEFAULT_PAGE_SIZE)), 1), MAX_PAGE_SIZE)
+                query = filter_reservations(Reservation.query, args, user)
+                key = tuple_(Reservation.parking_timestamp, Reservation.id)
+                descending = args.get("order", "asc").lower() == "desc"
+                if args.get("cursor"):
+                    after = decode_cursor(args["cursor"])
+                    query = query.filter(key < after if descending else key > after)
+            except (ValueError, TypeError):
+                return {"error": "Invalid filter or cursor value"}, 400
+
+            if descending:
+                query = query.order_by(Reservation.parking_timestamp.desc(), Reservation.id.desc())
+            else:
+                query = query.order_by(Reservation.parking_timestamp, Reservation.id)
+
+            # Fetch one extra row to know whether another page exists
+            reservations = query.limit(limit + 1).all()
+            next_cursor = encode_cursor(reservations[limit - 1]) if len(reservations) > limit else None
+            return {
+                "reservations": [res.convert_to_json() for res in reservations[:limit]],
+                "next_cursor": next_cursor,
+            }, 200
 
         except Exception as e:
             return {"error": "Internal server error", "details": str(e)}, 500
 
-    @jwt_required()
+    @user_required
     def post(self):
         try:
-            user_id = get_jwt_identity()
-            user = Users.query.get(user_id)
-            if not user:
-                return {"error": "User not found"}, 404
+            user = current_principal()
 
             data = request.get_json()
             lot_id = data.get("lot_id")
@@ -72,23 +190,29 @@ class ReservationAPI(Resource):
             if not lot_id or not vehicle_no:
                 return {"error": "lot_id and vehicle_no are required"}, 400
 
-            # Find first available spot in lot
-            spot = ParkingSpot.query.filter_by(lot_id=lot_id, status="A").first()
-            if not spot:
+            # Atomically claim a free spot in the lot
+            try:
+                spot_id = claim_spot(lot_id)
+            except SpotContention:
+                db.session.rollback()
+                return {"error": "Too many concurrent bookings for this lot, please retry"}, 409
+            if not spot_id:
+                db.session.rollback()
                 return {"error": "No available spots in this lot"}, 400
 
-            spot.status = "O"
-
             # Always store parking timestamp in IST (naive)
             reservation = Reservation(
-                spot_id=spot.id,
+                spot_id=spot_id,
                 user_id=user.id,
                 parking_timestamp=datetime.now(IST).replace(tzinfo=None),
                 vehicle_number=vehicle_no,
             )
 
             db.session.add(reservation)
+            record_reservation(reservation, int(lot_id), bookings=1)
+            record_reservation_activity(user.id, reservation.parking_timestamp)
             db.session.commit()
+            occupancy.mark_occupied(lot_id, spot_id)
 
             return {
                 "message": "Reservation created successfully",
@@ -102,13 +226,10 @@ class ReservationAPI(Resource):
             db.session.rollback()
             return {"error": "Internal server error", "details": str(e)}, 500
 
-    @jwt_required()
+    @user_required
     def patch(self, reservation_id):
         try:
-            user_id = get_jwt_identity()
-            user = Users.query.get(user_id)
-            if not user:
-                return {"error": "User not found"}, 404
+            user = current_principal()
 
             reservation = Reservation.query.get(reservation_id)
             if not reservation:
@@ -123,9 +244,14 @@ class ReservationAPI(Resource):
             if action == "occupied":
                 reservation.spot.status = "O"
                 db.session.commit()
+                occupancy.mark_occupied(reservation.spot.lot_id, reservation.spot_id)
                 return {"message": "Spot marked as occupied"}, 200
 
             elif action == "released":
+                # Releasing twice would free a spot someone else may hold now and count the revenue again
+                if reservation.leaving_timestamp is not None:
+                    return {"error": "Reservation already released"}, 409
+
                 leaving_time = data.get("leaving_time")
                 if not leaving_time:
                     return {"error": "leaving_time is required"}, 400
@@ -136,6 +262,7 @@ class ReservationAPI(Resource):
                     return {"error": "Invalid datetime format. Use ISO 8601"}, 400
 
                 reservation.leaving_timestamp = leaving_dt
+                previous_cost = reservation.parking_cost or 0
 
                 # Calculate duration in hours
                 duration_hours = (
@@ -147,7 +274,13 @@ class ReservationAPI(Resource):
                 # Free the spot
                 reservation.spot.status = "A"
 
+                record_reservation(
+                    reservation, reservation.spot.lot_id,
+                    revenue=reservation.parking_cost - previous_cost,
+                )
+
                 db.session.commit()
+                occupancy.mark_free(reservation.spot.lot_id, reservation.spot_id)
                 return reservation.convert_to_json(), 200
 
             else:
@@ -160,13 +293,10 @@ class ReservationAPI(Resource):
             db.session.rollback()
             return {"error": "Internal server error", "details": str(e)}, 500
 
-    @jwt_required()
+    @user_required
     def delete(self, reservation_id):
         try:
-            user_id = get_jwt_identity()
-            user = Users.query.get(user_id)
-            if not user:
-                return {"error": "User not found"}, 404
+            user = current_principal()
 
             reservation = Reservation.query.get(reservation_id)
             if not reservation:
@@ -178,6 +308,10 @@ class ReservationAPI(Resource):
             if reservation.spot.status == "O":
                 return {"error": "Cannot delete reservation after spot is occupied"}, 400
 
+            record_reservation(
+                reservation, reservation.spot.lot_id,
+                bookings=-1, revenue=-(reservation.parking_cost or 0),
+            )
             db.session.delete(reservation)
             db.session.commit()
             return {"message": "Reservation deleted successfully"}, 200
@@ -0,0 +1,133 @@
+# applications/rollups.py
+import click
+from collections import defaultdict
+from datetime import date
+from flask.cli import AppGroup
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from applications.models import db, Reservation, ParkingSpot, DailyLotStats, MonthlyUserStats
+
+UPSERT_INSERTS = {"sqlite": sqlite_insert, "postgresql": pg_insert}
+
+
+def _increment(model, keys, deltas):
+    """Add `deltas` to the rollup row identified by `keys`, creating it if needed."""
+    insert = UPSERT_INSERTS.get(db.session.get_bind().dialect.name)
+    if insert is not None:
+        stmt = insert(model).values(**keys, **deltas)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(keys),
+            set_={col: getattr(model, col) + stmt.excluded[col] for col in deltas},
+        )
+        db.session.execute(stmt)
+        return
+
+    updated = model.query.filter_by(**keys).update(
+        {getattr(model, col): getattr(model, col) + delta for col, delta in deltas.items()},
+        synchronize_session=False,
+    )
+    if not updated:
+        db.session.add(model(**keys, **deltas))
+
+
+def record_reservation(reservation, lot_id, bookings=0, revenue=0.0):
+    """
+    Apply a booking/revenue delta for `reservation` to both rollups.
+    Called inside the caller's transaction, before its commit.
+    """
+    ts = reservation.parking_timestamp
+    _increment(
+        DailyLotStats,
+        {"day": ts.date(), "lot_id": lot_id or 0},
+        {"bookings": bookings, "revenue": revenue},
+    )
+    _increment(
+        MonthlyUserStats,
+        {"month": date(ts.year, ts.month, 1), "user_id": reservation.user_id},
+        {"bookings": bookings, "spend": revenue},
+    )
+
+
+def record_reservations(entries):
+    """
+    Batch form of record_reservation: `entries` are
+    (parking_timestamp, lot_id, user_id, bookings, revenue) tuples, summed
+    per rollup row so each row gets a single upsert.
+    """
+    daily = defaultdict(lambda: [0, 0.0])
+    monthly = defaultdict(lambda: [0, 0.0])
+    for ts, lot_id, user_id, bookings, revenue in entries:
+        for totals in (daily[(ts.date(), lot_id or 0)], monthly[(date(ts.year, ts.month, 1), user_id)]):
+            totals[0] += bookings
+            totals[1] += revenue
+
+    for (day, lot_id), (bookings, revenue) in daily.items():
+        _increment(DailyLotStats, {"day": day, "lot_id": lot_id}, {"bookings": bookings, "revenue": revenue})
+    for (month, user_id), (bookings, revenue) in monthly.items():
+        _increment(MonthlyUserStats, {"month": month, "user_id": user_id}, {"bookings": bookings, "spend": revenue})
+
+
+def _rollup_totals(execute):
+    """Per lot-day and per user-month (bookings, revenue) over all reservations, via `execute`."""
+    day = func.date(Reservation.parking_timestamp)
+    bookings = func.count(Reservation.id)
+    revenue = func.coalesce(func.sum(Reservation.parking_cost), 0.0)
+
+    lot_rows = execute(
+        select(day, ParkingSpot.lot_id, bookings, revenue)
+        .select_from(Reservation)
+        .outerjoin(ParkingSpot, ParkingSpot.id == Reservation.spot_id)
+        .group_by(day, ParkingSpot.lot_id)
+    ).all()
+    user_rows = execute(select(day, Reservation.user_id, bookings, revenue).group_by(day, Reservation.user_id)).all()
+
+    daily = defaultdict(lambda: [0, 0.0])
+    for d, lot_id, count, total in lot_rows:
+        entry = daily[(date.fromisoformat(str(d)), lot_id or 0)]
+        entry[0] += count
+        entry[1] += total
+
+    monthly = defaultdict(lambda: [0, 0.0])
+    for d, user_id, count, total in user_rows:
+        d = date.fromisoformat(str(d))
+        entry = monthly[(date(d.year, d.month, 1), user_id)]
+        entry[0] += count
+        entry[1] += total
+
+    return (
+        [{"day": k[0], "lot_id": k[1], "bookings": v[0], "revenue": v[1]} for k, v in daily.items()],
+        [{"month": k[0], "user_id": k[1], "bookings": v[0], "spend": v[1]} for k, v in monthly.items()],
+    )
+
+
+def _replace_rollups(execute, daily, monthly):
+    for model, rows in ((DailyLotStats, daily), (MonthlyUserStats, monthly)):
+        execute(delete(model.__table__))
+        if rows:
+            execute(insert(model.__table__), rows)
+
+
+def rebuild_rollups():
+    """Recompute both rollup tables from the reservations table."""
+    daily, monthly = _rollup_totals(db.session.execute)
+    _replace_rollups(db.session.execute, daily, monthly)
+    db.session.commit()
+    return len(daily), len(monthly)
+
+
+def backfill_rollups(conn):
+    """rebuild_rollups on a migration's connection (inside its transaction)."""
+    daily, monthly = _rollup_totals(conn.execute)
+    _replace_rollups(conn.execute, daily, monthly)
+    return len(daily), len(monthly)
+
+
+rollups_cli = AppGroup("rollups", help="Manage revenue/usage rollup tables.")
+
+
+@rollups_cli.command("rebuild")
+def rebuild_command():
+    """Backfill the rollup tables from existing reservations."""
+    daily, monthly = rebuild_rollups()
+    click.echo(f"Rollups rebuilt ({daily} lot-days, {monthly} user-months)")
@@ -1,48 +1,104 @@
 # applications/routes.py
+import hashlib
 import os
-from flask import send_from_directory
+from flask import abort, request, send_file
 from flask_restful import Api
 from applications.api import HomeAPI
-from applications.parkinglot_api import ParkingLotsAPI
-from applications.auth_api import LoginAPI, SignupAPI, ProfileAPI
+from applications.parkinglot_api import ParkingLotsAPI, LotAvailabilityAPI, LotImportAPI
+from applications.auth_api import LoginAPI, LogoutAPI, SignupAPI, ProfileAPI
 from applications.parkingspot_api import ParkingSpotsAPI
 from applications.reservation_api import ReservationAPI
 from applications.user_api import UsersAPI
-from applications.summary_api import AdminSummaryAPI, UserSummaryAPI
-from applications.exports_api import ExportCSVAPI, ExportStatusAPI
+from applications.summary_api import AdminSummaryAPI, UserSummaryAPI, CacheStatsAPI
+from applications.exports_api import ExportCSVAPI, ExportStatusAPI, ExportEventsAPI
+from applications.events_api import GateEventsAPI
+from applications.export_storage import export_storage
 from applications.worker import celery
 
-EXPORTS_DIR = os.path.join(os.getcwd(), "exports")
-os.makedirs(EXPORTS_DIR, exist_ok=True)
-
 
 def register_routes(api: Api):
     """Register all API endpoints with Flask-RESTful"""
     api.add_resource(HomeAPI, "/api/home")
     api.add_resource(LoginAPI, "/api/login")
+    api.add_resource(LogoutAPI, "/api/logout")
     api.add_resource(SignupAPI, "/api/signup")
     api.add_resource(ProfileAPI, "/api/profile")
 
     # ✅ Export APIs
     api.add_resource(ExportCSVAPI, "/api/export")
     api.add_resource(ExportStatusAPI, "/api/export/status/<string:task_id>")
+    api.add_resource(ExportEventsAPI, "/api/export/events/<string:task_id>")
 
     # Other existing APIs
     api.add_resource(ParkingLotsAPI, "/api/parking_lots", "/api/parking_lots/<int:lot_id>")
+    api.add_resource(LotAvailabilityAPI, "/api/parking_lots/availability")
+    api.add_resource(LotImportAPI, "/api/parking_lots/import")
     api.add_resource(
         ParkingSpotsAPI,
         "/api/parking_lots/<int:lot_id>/spots",
         "/api/parking_lots/<int:lot_id>/spots/<int:spot_id>",
     )
     api.add_resource(ReservationAPI, "/api/reservations", "/api/reservations/<int:reservation_id>")
+    api.add_resource(GateEventsAPI, "/api/gate_events")
     api.add_resource(UsersAPI, "/api/users", "/api/users/<int:user_id>")
     api.add_resource(AdminSummaryAPI, "/api/admin/summary")
     api.add_resource(UserSummaryAPI, "/api/user/summary")
+    api.add_resource(CacheStatsAPI, "/api/admin/cache_stats")
+
+
+EXPORT_MIMETYPES = {
+    ".csv": "text/csv",
+    ".jsonl": "application/x-ndjson",
+    ".parquet": "application/vnd.apache.parquet",
+    ".gz": "application/gzip",
+}
+
+
+def export_etag(path):
+    """Strong ETag from file identity, size and mtime (no need to hash the contents)."""
+    st = os.stat(path)
+    return hashlib.sha1(f"{st.st_ino}-{st.st_size}-{st.st_mtime_ns}".encode()).hexdigest()
+
+
+def send_export(filename):
+    """
+    Serve an export with Range/If-Range, ETag and If-None-Match support.
+    A request for "x.csv" is answered with the precompressed "x.csv.gz"
+    (Content-Encoding: gzip) when it exists and the client accepts gzip.
+    """
+    path = export_storage.path(filename)
+    if path is None:
+        abort(404)
+    mimetype = EXPORT_MIMETYPES.get(os.path.splitext(filename)[1], "application/octet-stream")
+
+    gz_path = path + ".gz"
+    if not filename.endswith(".gz") and os.path.isfile(gz_path):
+        if "gzip" in request.accept_encodings:
+            response = send_file(
+                gz_path, mimetype=mimetype, as_attachment=True, download_name=filename,
+                conditional=True, etag=export_etag(gz_path),
+            )
+            response.headers["Content-Encoding"] = "gzip"
+            response.headers["Accept-Ranges"] = "bytes"
+            response.vary.add("Accept-Encoding")
+            return response
+        if not os.path.isfile(path):
+            # Only the compressed variant exists; hand it over as-is
+            path, filename, mimetype = gz_path, filename + ".gz", EXPORT_MIMETYPES[".gz"]
+
+    if not os.path.isfile(path):
+        abort(404)
+    response = send_file(
+        path, mimetype=mimetype, as_attachment=True, download_name=filename,
+        conditional=True, etag=export_etag(path),
+    )
+    response.headers["Accept-Ranges"] = "bytes"
+    return response
 
 
 def register_extra_routes(app):
     """Register extra non-REST routes like CSV download"""
     @app.route("/api/exports/<filename>", methods=["GET"])
     def download_export(filename):
-        """Download CSV exports (async task results)"""
-        return send_from_directory(EXPORTS_DIR, filename, as_attachment=True)
+        """Download exports (async task results) with resume and caching support"""
+        return send_export(filename)
@@ -1,49 +1,56 @@
 from flask import request
 from flask_restful import Resource
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from applications.models import db, Users, ParkingLot, ParkingSpot, Reservation
-from sqlalchemy import func
-from .api import cache
+from applications.authz import admin_required, current_principal, user_required
+from applications.database import read_only
+from applications.models import db, ParkingLot, ParkingSpot, Reservation, DailyLotStats, MonthlyUserStats
+from sqlalchemy import case, func
+from applications.cache_tags import tagged_key, cache_get, cache_set, cache_stats
 from collections import defaultdict
 from datetime import datetime
 
 
 class AdminSummaryAPI(Resource):
-    @jwt_required()
+    @admin_required
+    @read_only
     def get(self):
         """
         Admin: Get global summary including total lots, total spots,
         occupied/free spots, total reservations, total revenue, and weekly revenue trends.
-        Cached for 30 seconds.
+        Cached until a lot, spot or reservation changes.
         """
-        user_id = get_jwt_identity()
-        user = Users.query.get(user_id)
-        if not user or not user.is_admin:
-            return {"error": "Admin access required"}, 403
-
-        cache_key = "admin_summary"
-        summary = cache.get(cache_key)
+        cache_key = tagged_key("admin_summary", ["summary"])
+        summary = cache_get(cache_key)
         if summary:
             return summary, 200
 
         total_lots = ParkingLot.query.count()
-        total_spots = ParkingSpot.query.count()
-        occupied_spots = ParkingSpot.query.filter_by(status="O").count()
+        total_spots, occupied_spots = db.session.query(
+            func.count(ParkingSpot.id),
+            func.coalesce(func.sum(case((ParkingSpot.status == "O", 1), else_=0)), 0),
+        ).one()
         free_spots = total_spots - occupied_spots
-        total_reservations = Reservation.query.count()
-        total_revenue = db.session.query(func.sum(Reservation.parking_cost)).scalar() or 0
+
+        # Reservation totals and trends come from the daily rollup, not the raw history
+        daily = (
+            db.session.query(
+                DailyLotStats.day,
+                func.sum(DailyLotStats.bookings),
+                func.sum(DailyLotStats.revenue),
+            )
+            .group_by(DailyLotStats.day)
+            .order_by(DailyLotStats.day)
+            .all()
+        )
+        total_reservations = sum(bookings for _, bookings, _ in daily)
+        total_revenue = sum(revenue for _, _, revenue in daily)
 
         # Weekly revenue trend
-        reservations = Reservation.query.with_entities(
-            Reservation.parking_timestamp, Reservation.parking_cost
-        ).all()
         weekly_revenue = {}
-        for r in reservations:
-            if r.parking_timestamp and r.parking_cost:
-                date = r.parking_timestamp
+        for date, _, revenue in daily:
+            if revenue:
                 week_num = date.isocalendar()[1]  # ISO week number
                 key = f"{date.year}-W{week_num}"
-                weekly_revenue[key] = weekly_revenue.get(key, 0) + float(r.parking_cost)
+                weekly_revenue[key] = weekly_revenue.get(key, 0) + float(revenue)
 
         summary = {
             "total_lots": total_lots,
@@ -55,13 +62,14 @@ class AdminSummaryAPI(Resource):
             "weekly_revenue": weekly_revenue,
         }
 
-        cache.set(cache_key, summary, timeout=30)
+        cache_set(cache_key, summary)
         return summary, 200
 
       # Assuming you have a cache setup
 
 class UserSummaryAPI(Resource):
-    @jwt_required()
+    @user_required
+    @read_only
     def get(self):
         """
         User: Get personal summary including:
@@ -70,55 +78,62 @@ class UserSummaryAPI(Resource):
         - Total spent
         - Monthly cost trends (line chart)
         - Parking lot usage (donut chart)
-        Cached per-user for 15 seconds.
+        Cached per-user until one of the user's reservations or a lot changes.
         """
-        user_id = get_jwt_identity()
-        user = Users.query.get(user_id)
-        if not user:
-            return {"error": "User not found"}, 404
+        user = current_principal()
+        user_id = user.id
 
         # Check cache first
-        cache_key = f"user_summary:{user_id}"
-        summary = cache.get(cache_key)
+        cache_key = tagged_key(f"user_summary:{user_id}", [f"user:{user_id}", "lot_catalog"])
+        summary = cache_get(cache_key)
         if summary:
             return summary, 200
 
-        # Fetch all reservations
-        reservations = Reservation.query.filter_by(user_id=user.id).all()
-
-        # Separate active and past reservations
-        active_reservations = [r for r in reservations if not r.leaving_timestamp]
-        past_reservations = [r for r in reservations if r.leaving_timestamp]
-
-        # Total spent and total bookings
-        total_spent = sum(r.parking_cost or 0 for r in reservations)
-        total_bookings = len(reservations)
+        # Totals and active/past split in one aggregate query
+        total_bookings, total_spent, active = db.session.query(
+            func.count(Reservation.id),
+            func.coalesce(func.sum(Reservation.parking_cost), 0.0),
+            func.coalesce(func.sum(case((Reservation.leaving_timestamp.is_(None), 1), else_=0)), 0),
+        ).filter(Reservation.user_id == user.id).one()
 
-        # Monthly spending for line chart
+        # Monthly spending for line chart, from the per-user monthly rollup
         monthly_cost = defaultdict(float)
-        for r in reservations:
-            if r.parking_timestamp and r.parking_cost:
-                month_label = r.parking_timestamp.strftime("%b %Y")
-                monthly_cost[month_label] += r.parking_cost
+        monthly_rows = MonthlyUserStats.query.with_entities(
+            MonthlyUserStats.month, MonthlyUserStats.spend
+        ).filter(MonthlyUserStats.user_id == user.id)
+        for month, spend in monthly_rows:
+            if spend:
+                monthly_cost[month.strftime("%b %Y")] += spend
         monthly_cost = dict(sorted(monthly_cost.items()))
 
         # Parking lot usage for donut chart
         lot_usage = defaultdict(int)
-        for r in reservations:
-            if r.spot_id and r.spot and r.spot.lot:
-                # Use prime_location_name instead of name
-                lot_usage[r.spot.lot.prime_location_name] += 1
+        lot_rows = (
+            db.session.query(ParkingLot.prime_location_name, func.count(Reservation.id))
+            .join(ParkingSpot, ParkingSpot.id == Reservation.spot_id)
+            .join(ParkingLot, ParkingLot.id == ParkingSpot.lot_id)
+            .filter(Reservation.user_id == user.id)
+            .group_by(ParkingLot.id, ParkingLot.prime_location_name)
+        )
+        for name, count in lot_rows:
+            lot_usage[name] += count
 
         # Build summary response
         summary = {
             "total_bookings": total_bookings,
             "total_cost": round(total_spent, 2),
-            "active": len(active_reservations),
-            "past": len(past_reservations),
+            "active": active,
+            "past": total_bookings - active,
             "monthly_cost": monthly_cost,  # For line chart
             "lot_usage": lot_usage,        # For donut chart
         }
 
-        # Cache for 15 seconds
-        cache.set(cache_key, summary, timeout=15)
-        return summary, 200
\ No newline at end of file
+        cache_set(cache_key, summary)
+        return summary, 200
+
+
+class CacheStatsAPI(Resource):
+    @admin_required
+    def get(self):
+        """Admin: hit/miss/eviction counters of this process's cache tiers."""
+        return cache_stats(), 200
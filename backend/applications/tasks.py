@@ -1,40 +1,25 @@
 # applications/task.py
 from applications.worker import celery
 from flask import current_app as app, url_for
-from applications.models import Users, Reservation, ParkingLot
-from jinja2 import Template
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from email.mime.application import MIMEApplication
-import csv, os, smtplib, requests, io
+from applications.models import db, Users, ParkingLot
+from applications.export_engine import write_rows, id_ranges, merge_parts, export_extension, count_rows
+from applications.export_progress import export_progress, ProgressTracker
+from applications import export_reuse
+from applications.export_storage import export_storage
+from celery import chord
+from sqlalchemy import func
+from applications.reports import month_aggregates, month_bookings, render_monthly_report
+from applications.mailer import mailer, build_message
+from applications.outbox import outbox, CHANNELS
+from applications.http_clients import http_clients
+from applications.activity import inactive_users_filter
+from markupsafe import escape
+import os, io, time
 from datetime import datetime, timedelta
 
-EXPORTS_DIR = os.path.join(os.getcwd(), "exports")
-os.makedirs(EXPORTS_DIR, exist_ok=True)
 
-def send_via_smtp(receiver, subject, html_body, attachment_path=None):
-    smtp_host = app.config.get("SMTP_HOST", "localhost")
-    smtp_port = int(app.config.get("SMTP_PORT", 1025))
-    sender = app.config.get("SMTP_SENDER", "noreply@parkingapp.com")
-
-    msg = MIMEMultipart()
-    msg["From"], msg["To"], msg["Subject"] = sender, receiver, subject
-    msg.attach(MIMEText(html_body, "html"))
-
-    if attachment_path:
-        with open(attachment_path, "rb") as f:
-            part = MIMEApplication(f.read(), Name=os.path.basename(attachment_path))
-        part['Content-Disposition'] = f'attachment; filename="{os.path.basename(attachment_path)}"'
-        msg.attach(part)
-
-    try:
-        with smtplib.SMTP(host=smtp_host, port=smtp_port) as server:
-            server.send_message(msg)
-        app.logger.info(f"Email sent to {receiver}")
-        return True
-    except Exception as e:
-        app.logger.exception("Email send failed")
-        return False
+# Parallel subtasks used by the admin-wide export
+EXPORT_CHUNKS = 8
 
 def send_via_google_chat(webhook_url, title, html_body):
     """
@@ -43,10 +28,12 @@ def send_via_google_chat(webhook_url, title, html_body):
     """
     if not webhook_url:
         return False
+    return post_chat_text(webhook_url, f"{title}\n\n{strip_html(html_body)}")
+
+def post_chat_text(webhook_url, text):
+    """Post plain text to a Google Chat webhook over the shared keep-alive session."""
     try:
-        payload = {"text": f"{title}\n\n{strip_html(html_body)}"}
-        r = requests.post(webhook_url, json=payload, timeout=5)
-        r.raise_for_status()
+        http_clients.post_json(webhook_url, {"text": text})
         return True
     except Exception as e:
         app.logger.exception("Google Chat webhook failed")
@@ -64,16 +51,12 @@ def send_sms_via_twilio(to_number, message):
         return False
 
     try:
-        # import dynamically to avoid static analyzer errors when twilio isn't installed
-        import importlib
-        try:
-            twilio_rest = importlib.import_module("twilio.rest")
-            Client = getattr(twilio_rest, "Client")
-        except Exception:
+        # One client per worker process and account; it keeps its HTTP connections open
+        client = http_clients.twilio(account_sid, auth_token)
+        if client is None:
             app.logger.warning("Twilio library not installed or could not be imported; skipping SMS send")
             return False
 
-        client = Client(account_sid, auth_token)
         client.messages.create(body=message, from_=from_num, to=to_number)
         return True
     except Exception:
@@ -86,44 +69,326 @@ def strip_html(html):
     text = re.sub("<[^<]+?>", "", html)
     return text
 
-def dispatch_alert(user, subject, html_body, attachment=None):
+def alert_route(user):
     """
-    Delivery strategy:
-      - Prefer user's preferred channel if present (user.notification_channel),
-      - else: email using SMTP.
-      - Also attempt Google Chat webhook if configured globally.
-      - Also attempt SMS if user.phone exists and TWILIO config present.
+    (channel, recipient) for a user's alerts:
+      - the user's preferred channel if set up (user.notification_channel = "gchat"/"sms"),
+      - else email,
+      - else the global Google Chat webhook, if configured.
     """
-    # 1) Attempt user-specific channel (if you modeled it)
     user_channel = getattr(user, "notification_channel", None)
-    primary_result = False
-
-    # Try Google Chat webhook per-user if present
     user_gchat = getattr(user, "google_chat_webhook", None)
-    global_gchat = app.config.get("GOOGLE_CHAT_WEBHOOK")  # fallback global webhook
+    phone = getattr(user, "phone", None)
 
     if user_channel == "gchat" and user_gchat:
-        primary_result = send_via_google_chat(user_gchat, subject, html_body)
-    elif user_channel == "sms" and getattr(user, "phone", None):
-        primary_result = send_sms_via_twilio(user.phone, strip_html(html_body))
-    else:
-        # Default -> email
-        if getattr(user, "email", None):
-            primary_result = send_via_smtp(user.email, subject, html_body, attachment)
-
-    # Notify global webhook as well if configured and primary was not webhook (optional)
-    try:
-        if global_gchat and not primary_result:
-            send_via_google_chat(global_gchat, subject, html_body)
-    except Exception:
-        app.logger.exception("fallback gchat notify failed")
+        return "gchat", user_gchat
+    if user_channel == "sms" and phone:
+        return "sms", phone
+    if getattr(user, "email", None):
+        return "email", user.email
+    global_gchat = app.config.get("GOOGLE_CHAT_WEBHOOK")
+    if global_gchat:
+        return "gchat", global_gchat
+    return None, None
+
+
+def dispatch_alert(user, subject, html_body, attachment=None, dedupe_key=None):
+    """
+    Queue an alert in the notification outbox on the user's channel; the
+    drain task delivers it (with retries, and a copy to the global Google
+    Chat webhook if it finally fails). `dedupe_key` makes repeated calls
+    for the same alert queue it once. Returns None (skipped) if the user has
+    no reachable channel: that will not change on a retry.
+    """
+    channel, recipient = alert_route(user)
+    if channel is None:
+        app.logger.info(f"No notification channel for user {user.id}; alert skipped")
+        return None
+    return outbox.add(
+        channel, recipient, html_body, subject,
+        user_id=user.id,
+        dedupe_key=f"{dedupe_key}:{channel}" if dedupe_key else None,
+        attachment=attachment,
+        delay=digest_delay() if channel == "gchat" else 0,
+    )
+
+
+def digest_delay():
+    """
+    Digest mode: hold chat alerts until the end of the current
+    GCHAT_DIGEST_WINDOW so everything queued in one window goes out as one
+    post per webhook. 0 when digest mode is off.
+    """
+    window = app.config.get("GCHAT_DIGEST_WINDOW", 0)
+    return window - time.time() % window if window else 0
+
+
+def queue_email(receiver, subject, html_body, attachment=None, user_id=None, dedupe_key=None):
+    """Queue one email in the outbox and start delivering it right away."""
+    outbox.add("email", receiver, html_body, subject, user_id=user_id, dedupe_key=dedupe_key, attachment=attachment)
+    drain_outbox.delay(["email"])
+    return True
+
+
+def send_outbox_emails(rows):
+    """Outbox sender for email: the claimed rows go out concurrently over the SMTP pool."""
+    sender = app.config.get("SMTP_SENDER", "noreply@parkingapp.com")
+    errors = [None] * len(rows)
+    messages, positions = [], []
+    for index, row in enumerate(rows):
+        try:
+            # An export attached here may have been compacted to .gz since it was queued
+            attachment = row.attachment and (export_storage.locate(os.path.basename(row.attachment)) or row.attachment)
+            messages.append(build_message(sender, row.recipient, row.subject, row.body, attachment))
+            positions.append(index)
+        except OSError as e:
+            errors[index] = f"attachment unreadable: {e}"
+    for index, ok in zip(positions, mailer.send_many(messages)):
+        if not ok:
+            errors[index] = "SMTP delivery failed"
+    return errors
+
+
+def chat_digests(rows, max_chars):
+    """
+    Coalesce the rows for one webhook into as few texts as fit in max_chars
+    each. Returns (text, rows in that text) pairs, in order.
+    """
+    if len(rows) == 1:
+        return [(f"{rows[0].subject}\n\n{strip_html(rows[0].body)}", rows)]
+    parts, current, entries = [], [], []
+    for row in rows:
+        entry = f"*{row.subject}*\n{strip_html(row.body).strip()}"
+        if current and len("\n\n".join(entries + [entry])) > max_chars:
+            parts.append((entries, current))
+            current, entries = [], []
+        current.append(row)
+        entries.append(entry)
+    parts.append((entries, current))
+    return [(f"{len(part)} notifications\n\n" + "\n\n".join(texts), part) for texts, part in parts]
+
+
+def send_outbox_gchat(rows):
+    """Outbox sender for Google Chat: one post per message, or per webhook in digest mode."""
+    if not app.config.get("GCHAT_DIGEST_WINDOW"):
+        return [None if send_via_google_chat(row.recipient, row.subject, row.body) else "Google Chat post failed"
+                for row in rows]
+
+    groups = {}
+    for row in rows:
+        groups.setdefault(row.recipient, []).append(row)
+    errors = {}
+    max_chars = app.config.get("GCHAT_DIGEST_MAX_CHARS", 4000)
+    for webhook, group in groups.items():
+        error = None
+        for text, part in chat_digests(group, max_chars):
+            # Stop at the first failed post: only its rows and the later ones are retried,
+            # so the parts already posted are not posted again
+            if error is None and not post_chat_text(webhook, text):
+                error = "Google Chat digest post failed"
+            for row in part:
+                errors[row.id] = error
+    return [errors[row.id] for row in rows]
+
+
+def send_outbox_sms(rows):
+    return [None if send_sms_via_twilio(row.recipient, strip_html(row.body)) else "SMS send failed"
+            for row in rows]
+
+
+outbox.register_sender("email", send_outbox_emails)
+outbox.register_sender(
+    "gchat", send_outbox_gchat,
+    # In digest mode all due messages for a webhook are one post, so they cost one token
+    group_key=lambda row: row.recipient if app.config.get("GCHAT_DIGEST_WINDOW") else None,
+)
+outbox.register_sender("sms", send_outbox_sms)
+
+
+@celery.task
+def drain_outbox(channels=None):
+    """Deliver due outbox messages at each channel's rate (started by beat and after producers flush)."""
+    with app.app_context():
+        return outbox.drain(tuple(channels) if channels else CHANNELS)
+
+
+@celery.task
+def prune_outbox():
+    with app.app_context():
+        return outbox.prune(app.config["OUTBOX_RETENTION_DAYS"])
+
+
+def remind_user(user, thirty_days_ago, day):
+    """Personal reminder for a user who hasn't booked recently. Returns None if skipped."""
+    if user.last_reservation_at and user.last_reservation_at >= thirty_days_ago:
+        return None  # booked recently -> no reminder
+
+    msg = f"""
+        <h3>Hello {getattr(user, 'name', 'User')},</h3>
+        <p>We noticed you haven't booked parking recently. If you need parking tomorrow, please book your spot today.</p>
+        <p>Visit the app to reserve a slot.</p>
+    """
+    return dispatch_alert(user, "Daily Parking Reminder", msg, dedupe_key=f"reminder:{day}:{user.id}")
+
+
+def broadcast_new_lots(user, summary, day):
+    broadcast_msg = f"""
+        <h3>Hello {getattr(user, 'name', 'User')},</h3>
+        <p>New parking locations were added recently:</p>
+        {summary}
+        <p>Book now to reserve your preferred spot.</p>
+    """
+    return dispatch_alert(
+        user, "New Parking Locations Available", broadcast_msg, dedupe_key=f"new_lots:{day}:{user.id}"
+    )
+
+
+# Per-user notification jobs are split into chunks of user ids fanned out
+# over the workers (chord); each chunk retries only its failed users.
+NOTIFY_CHUNK_SIZE = 500
+NOTIFY_CHUNK_RETRIES = 3
+NOTIFY_RETRY_DELAY = 60  # seconds
+NOTIFY_PROGRESS_EVERY = 50  # users between chunk progress updates
+
+
+def user_id_ranges(chunk_size=NOTIFY_CHUNK_SIZE, criteria=()):
+    """Inclusive [first, last] id ranges of non-admin users matching `criteria`, `chunk_size` users each."""
+    ranked = (
+        db.session.query(
+            Users.id.label("id"),
+            func.row_number().over(order_by=Users.id).label("rn"),
+        )
+        .filter(Users.is_admin.is_(False), *criteria)
+        .subquery()
+    )
+    starts = [
+        row.id for row in
+        db.session.query(ranked.c.id).filter((ranked.c.rn - 1) % chunk_size == 0).order_by(ranked.c.id)
+    ]
+    if not starts:
+        return []
+    last = db.session.query(func.max(Users.id)).filter(Users.is_admin.is_(False), *criteria).scalar()
+    return [[lo, hi - 1] for lo, hi in zip(starts, starts[1:])] + [[starts[-1], last]]
+
+
+def fan_out(job, chunk_task, params, criteria=()):
+    """Dispatch one chunk task per user id range, with notification_report as the chord callback."""
+    ranges = user_id_ranges(criteria=criteria)
+    if not ranges:
+        return {"job": job, "chunks": 0}
+    header = [chunk_task.s(id_range, params) for id_range in ranges]
+    result = chord(header)(notification_report.s(job, datetime.utcnow().isoformat()))
+    app.logger.info(f"[TASK] {job}: {len(ranges)} chunks dispatched")
+    summary = {"job": job, "chunks": len(ranges), "report_task_id": result.id}
+    if celery.conf.task_always_eager:
+        summary["report"] = result.result  # already computed; eager results are not stored
+    return summary
+
+
+def notify_users(task, id_range, users, notify):
+    """Call notify(user) for each user; returns (sent, skipped, failed user ids)."""
+    sent, skipped, failed = 0, 0, []
+    for done, user in enumerate(users, start=1):
+        try:
+            outcome = notify(user)
+            if outcome is False:
+                failed.append(user.id)
+            elif outcome is None:
+                skipped += 1
+            else:
+                sent += 1
+        except Exception:
+            app.logger.exception(f"Failed to notify user {user.id}")
+            failed.append(user.id)
+        if done % NOTIFY_PROGRESS_EVERY == 0 and task.request.id:
+            task.update_state(state="PROGRESS", meta={"range": id_range, "done": done, "total": len(users)})
+    return sent, skipped, failed
+
+
+def run_chunk(task, id_range, params, user_ids, sent_before, notify, criteria=()):
+    """
+    Call notify(user) for the chunk's users matching `criteria` (or only
+    `user_ids` on a retry).
+    notify returns True when queued, None when skipped (nothing to send, or
+    no channel to send it on) and False or raises when it could not queue;
+    only the failed users are retried, with the task's retry policy. The chunk's outbox messages are written in one batch, then a
+    drain is started to deliver them.
+    """
+    query = Users.query.filter(Users.is_admin.is_(False), Users.id.between(*id_range), *criteria)
+    if user_ids is not None:
+        query = query.filter(Users.id.in_(user_ids))
+    users = query.order_by(Users.id).all()
+
+    retries = task.request.retries
+    with outbox.batch():
+        sent, skipped, failed = notify_users(task, id_range, users, notify)
+        sent += sent_before
+
+        if task.request.is_eager:
+            # No broker to requeue on (tests, task_always_eager): retry in place
+            while failed and retries < task.max_retries:
+                retries += 1
+                more, more_skipped, failed = notify_users(
+                    task, id_range, [u for u in users if u.id in failed], notify
+                )
+                sent += more
+                skipped += more_skipped
+    drain_outbox.delay()
+
+    if failed and retries < task.max_retries and not task.request.is_eager:
+        raise task.retry(
+            args=(id_range, params),
+            kwargs={"user_ids": failed, "sent_before": sent},
+            countdown=NOTIFY_RETRY_DELAY,
+        )
+    return {"range": id_range, "sent": sent, "skipped": skipped, "failed": failed, "retries": retries}
+
+
+@celery.task(bind=True, max_retries=NOTIFY_CHUNK_RETRIES)
+def daily_reminder_chunk(self, id_range, params, user_ids=None, sent_before=0):
+    thirty_days_ago = datetime.fromisoformat(params["thirty_days_ago"])
+    day = params.get("day") or (thirty_days_ago + timedelta(days=30)).date().isoformat()
+
+    def notify(user):
+        results = [remind_user(user, thirty_days_ago, day)]
+        if params.get("new_lots_summary"):
+            results.append(broadcast_new_lots(user, params["new_lots_summary"], day))
+        if False in results:
+            return False
+        return True if True in results else None  # None: nothing was sent (skipped)
+
+    with app.app_context():
+        return run_chunk(
+            self, id_range, params, user_ids, sent_before, notify,
+            reminder_criteria(thirty_days_ago, params.get("new_lots_summary")),
+        )
+
+
+def reminder_criteria(thirty_days_ago, new_lots_summary):
+    """Everyone gets the new-lots broadcast; otherwise only inactive users need a message."""
+    return () if new_lots_summary else (inactive_users_filter(thirty_days_ago),)
+
+
+@celery.task
+def notification_report(results, job, started_at):
+    """Chord callback: aggregate the chunk results of one fan-out job."""
+    report = {
+        "job": job,
+        "started_at": started_at,
+        "finished_at": datetime.utcnow().isoformat(),
+        "chunks": len(results),
+        "sent": sum(r["sent"] for r in results),
+        "skipped": sum(r.get("skipped", 0) for r in results),
+        "failed_users": sorted(uid for r in results for uid in r["failed"]),
+        "retried_chunks": sum(1 for r in results if r["retries"]),
+    }
+    app.logger.info(
+        f"[TASK] {job} finished: {report['sent']} sent, {report['skipped']} skipped, "
+        f"{len(report['failed_users'])} failed "
+        f"in {report['chunks']} chunks"
+    )
+    return report
 
-    # Try SMS as a last effort if Twilio is configured and user phone exists
-    try:
-        if getattr(user, "phone", None):
-            send_sms_via_twilio(user.phone, strip_html(html_body))
-    except Exception:
-        app.logger.exception("fallback sms failed")
 
 @celery.task
 def send_daily_reminders():
@@ -131,90 +396,57 @@ def send_daily_reminders():
     Two reminder scenarios:
      1) For users who have not booked recently (no reservations in the last 30 days) -> personal reminder
      2) For new parking lots created within the last 24 hours -> broadcast to all users
+    Coordinator only: users are handled by daily_reminder_chunk subtasks.
     """
     with app.app_context():
         now = datetime.utcnow()
         thirty_days_ago = now - timedelta(days=30)
         one_day_ago = now - timedelta(days=1)
 
-        # (A) Personal reminders: users who haven't booked recently
-        users = Users.query.filter_by(is_admin=False).all()
-        for user in users:
-            try:
-                # If model has last_seen/date_of_visit, prefer that. Otherwise fall back to reservations.
-                last_res = Reservation.query.filter_by(user_id=user.id).order_by(getattr(Reservation, "end_time", None).desc() if hasattr(Reservation, "end_time") else None).first()
-                # If last reservation exists and ended within 30 days -> skip
-                if last_res:
-                    # try to extract a timestamp attribute from reservation
-                    last_ts = getattr(last_res, "end_time", getattr(last_res, "start_time", None))
-                    if last_ts and last_ts >= thirty_days_ago:
-                        continue  # active/visited recently -> no reminder
-
-                # otherwise send reminder
-                msg = f"""
-                    <h3>Hello {getattr(user, 'name', 'User')},</h3>
-                    <p>We noticed you haven't booked parking recently. If you need parking tomorrow, please book your spot today.</p>
-                    <p>Visit the app to reserve a slot.</p>
-                """
-                dispatch_alert(user, "Daily Parking Reminder", msg)
-            except Exception:
-                app.logger.exception(f"Failed to process daily reminder for user {user.id}")
-
-        # (B) New parking lots: broadcast when new lots are created in last 24 hours
-        new_lots = ParkingLot.query.filter(getattr(ParkingLot, "created_at", None) >= one_day_ago).all() if hasattr(ParkingLot, "created_at") else []
+        # New parking lots: broadcast when new lots are created in last 24 hours
+        new_lots = (
+            ParkingLot.query.filter(ParkingLot.created_at >= one_day_ago)
+            .order_by(ParkingLot.created_at)
+            .all()
+        )
+        summary = None
         if new_lots:
-            summary = "<ul>"
-            for lot in new_lots:
-                name = getattr(lot, "name", getattr(lot, "lot_name", "Parking Lot"))
-                summary += f"<li>{name}</li>"
-            summary += "</ul>"
-            for user in users:
-                try:
-                    broadcast_msg = f"""
-                        <h3>Hello {getattr(user, 'name', 'User')},</h3>
-                        <p>New parking locations were added recently:</p>
-                        {summary}
-                        <p>Book now to reserve your preferred spot.</p>
-                    """
-                    dispatch_alert(user, "New Parking Locations Available", broadcast_msg)
-                except Exception:
-                    app.logger.exception(f"Failed to broadcast new lot alert to user {user.id}")
-
-    app.logger.info("[TASK] Daily reminders finished.")
-
-def render_html_report(username, bookings_summary, details_html=""):
-    # Use a dedicated template file if present; fallback to inline template
-    tpl_path = os.path.join(os.getcwd(), "templates", "report.html")
-    if os.path.exists(tpl_path):
-        with open(tpl_path) as f:
-            template = Template(f.read())
-        return template.render(username=username, bookings=bookings_summary, details_html=details_html)
-    else:
-        inline = """
-        <html><body>
-          <h2>Monthly Parking Report for {{ username }}</h2>
-          <div>
-            <h3>Summary</h3>
-            <ul>
-              <li>Total bookings this month: {{ bookings.total_bookings }}</li>
-              <li>Most used parking lot: {{ bookings.most_used_lot }}</li>
-              <li>Total amount spent: {{ bookings.total_spent }}</li>
-            </ul>
-          </div>
-          <div>
-            <h3>Details</h3>
-            {{ details_html|safe }}
-          </div>
-        </body></html>
-        """
-        template = Template(inline)
-        return template.render(username=username, bookings=bookings_summary, details_html=details_html)
+            summary = "<ul>" + "".join(f"<li>{escape(lot.prime_location_name)}</li>" for lot in new_lots) + "</ul>"
+
+        return fan_out("daily_reminders", daily_reminder_chunk, {
+            "thirty_days_ago": thirty_days_ago.isoformat(),
+            "day": now.date().isoformat(),
+            "new_lots_summary": summary,
+        }, reminder_criteria(thirty_days_ago, summary))
+
+def send_monthly_report(user, month, summary, bookings):
+    report_html = render_monthly_report(getattr(user, "name", "User"), month, summary, bookings)
+    return dispatch_alert(
+        user, "Your Monthly Parking Report", report_html, dedupe_key=f"monthly_report:{month}:{user.id}"
+    )
+
+
+@celery.task(bind=True, max_retries=NOTIFY_CHUNK_RETRIES)
+def monthly_summary_chunk(self, id_range, params, user_ids=None, sent_before=0):
+    start = datetime.fromisoformat(params["start"])
+    end = datetime.fromisoformat(params["end"])
+    month = start.strftime("%B %Y")
+    with app.app_context():
+        # Two set-based queries for the whole chunk instead of one per user
+        summaries = month_aggregates(id_range, start, end, user_ids)
+        bookings = month_bookings(id_range, start, end, user_ids)
+        return run_chunk(
+            self, id_range, params, user_ids, sent_before,
+            lambda user: send_monthly_report(user, month, summaries.get(user.id), bookings.get(user.id, ())),
+        )
+
 
 @celery.task
 def monthly_summary():
     """
     Generate a monthly HTML summary for each user and email it.
     Runs on the 1st of every month (cron configured in worker).
+    Coordinator only: users are handled by monthly_summary_chunk subtasks.
     """
     with app.app_context():
         now = datetime.utcnow()
@@ -223,120 +455,159 @@ def monthly_summary():
         last_month_end = first_of_this_month - timedelta(seconds=1)
         last_month_start = datetime(last_month_end.year, last_month_end.month, 1)
 
-        users = Users.query.filter_by(is_admin=False).all()
-        for user in users:
-            try:
-                # Query reservations in the month
-                reservations_q = Reservation.query.filter(
-                    Reservation.user_id == user.id
-                )
-                # Filter by timestamp if model has start_time/end_time
-                if hasattr(Reservation, "start_time"):
-                    reservations_q = reservations_q.filter(getattr(Reservation, "start_time") >= last_month_start,
-                                                          getattr(Reservation, "start_time") <= last_month_end)
-
-                bookings = reservations_q.all()
-                total_bookings = len(bookings)
-                # compute total_spent if a price/cost field exists
-                total_spent = 0.0
-                lot_counts = {}
-                details_rows = []
-                for r in bookings:
-                    cost = getattr(r, "price", None) or getattr(r, "cost", None) or getattr(r, "amount", None) or 0
-                    try:
-                        total_spent += float(cost or 0)
-                    except Exception:
-                        pass
-                    lot_name = None
-                    if hasattr(r, "parking_lot_id"):
-                        lot_name = getattr(r, "parking_lot_id")  # fallback to id if name not joined
-                    elif hasattr(r, "lot_name"):
-                        lot_name = getattr(r, "lot_name")
-                    else:
-                        lot_name = "Unknown"
-
-                    lot_counts[lot_name] = lot_counts.get(lot_name, 0) + 1
-
-                    # Build details row defensively
-                    details_rows.append({
-                        "slot_id": getattr(r, "slot_id", getattr(r, "spot_id", "")),
-                        "spot_id": getattr(r, "spot_id", ""),
-                        "start_time": getattr(r, "start_time", ""),
-                        "end_time": getattr(r, "end_time", ""),
-                        "cost": cost,
-                        "remarks": getattr(r, "remarks", "")
-                    })
-
-                most_used_lot = max(lot_counts.items(), key=lambda t: t[1])[0] if lot_counts else "N/A"
-                bookings_summary = {
-                    "total_bookings": total_bookings,
-                    "most_used_lot": most_used_lot,
-                    "total_spent": round(total_spent, 2)
-                }
-
-                # create details HTML table
-                details_html = "<table border='1' cellpadding='4'><tr><th>slot_id</th><th>spot_id</th><th>start</th><th>end</th><th>cost</th><th>remarks</th></tr>"
-                for row in details_rows:
-                    details_html += f"<tr><td>{row['slot_id']}</td><td>{row['spot_id']}</td><td>{row['start_time']}</td><td>{row['end_time']}</td><td>{row['cost']}</td><td>{row['remarks']}</td></tr>"
-                details_html += "</table>"
-
-                report_html = render_html_report(getattr(user, "name", "User"), bookings_summary, details_html)
-                dispatch_alert(user, "Your Monthly Parking Report", report_html)
+        return fan_out("monthly_summary", monthly_summary_chunk, {
+            "start": last_month_start.isoformat(),
+            "end": last_month_end.isoformat(),
+        })
 
-            except Exception:
-                app.logger.exception(f"Failed to generate monthly summary for user {user.id}")
 
-    app.logger.info("[TASK] Monthly summaries finished.")
+def export_filename(prefix, task_id, compress=False, fmt="csv"):
+    return f"parking_export_{prefix}_{task_id}" + export_extension(fmt, compress)
 
 
 @celery.task(bind=True)
-def export_parking_data(self, user_id, email=None, filters=None):
+def export_parking_data(self, user_id, email=None, filters=None, compress=False, fmt="csv", reuse_key=None):
     """
     Create CSV export for user parking history.
     - user_id: id of user requesting export
     - email: optional email to send the export to; if omitted use user's email
     - filters: optional dict (date_from/date_to etc)
+    - compress: gzip the output while writing it (csv/jsonl)
+    - fmt: "csv", "jsonl" or "parquet"
+    - reuse_key: export_reuse key to point at the result once it is done
     Returns: { "csv_file": "<relative path>", "rows": N }
+    Progress (rows, percent, ETA) is published to export_progress as it runs.
     """
     with app.app_context():
         try:
             user = Users.query.get(user_id)
             if not user:
+                export_progress.finish(self.request.id, {"error": "user_not_found"}, state="FAILURE")
+                export_reuse.complete(reuse_key, self.request.id, {"error": "user_not_found"})
                 return {"error": "user_not_found"}
 
-            # Query reservations for user with optional filtering
-            q = Reservation.query.filter_by(user_id=user_id)
-            if filters:
-                if filters.get("date_from") and hasattr(Reservation, "start_time"):
-                    q = q.filter(getattr(Reservation, "start_time") >= filters["date_from"])
-                if filters.get("date_to") and hasattr(Reservation, "start_time"):
-                    q = q.filter(getattr(Reservation, "start_time") <= filters["date_to"])
-
-            records = q.all()
-
-            filename = f"parking_export_user_{user_id}_{self.request.id}.csv"
-            csv_path = os.path.join(EXPORTS_DIR, filename)
-
-            fieldnames = ["slot_id", "spot_id", "start_time", "end_time", "cost", "remarks"]
-            with open(csv_path, "w", newline="") as f:
-                writer = csv.DictWriter(f, fieldnames=fieldnames)
-                writer.writeheader()
-                for r in records:
-                    writer.writerow({
-                        "slot_id": getattr(r, "slot_id", ""),
-                        "spot_id": getattr(r, "spot_id", ""),
-                        "start_time": getattr(r, "start_time", ""),
-                        "end_time": getattr(r, "end_time", ""),
-                        "cost": getattr(r, "price", getattr(r, "cost", "")),
-                        "remarks": getattr(r, "remarks", "")
-                    })
+            filename = export_filename(f"user_{user_id}", self.request.id, compress, fmt)
+            csv_path = export_storage.path(filename)
+            tracker = export_progress.start(self.request.id, user_id, count_rows(user_id, filters))
+            rows = write_rows(csv_path, user_id=user_id, filters=filters, compress=compress, fmt=fmt, progress=tracker)
+            export_storage.admit(filename, user_id)
 
             # Send email with attachment if email provided or user.email exists
             target_email = email or getattr(user, "email", None)
             if target_email:
-                send_via_smtp(target_email, "Your Parking Export is Ready", "<p>Your CSV export is attached.</p>", csv_path)
+                queue_email(
+                    target_email, "Your Parking Export is Ready", f"<p>Your {fmt.upper()} export is attached.</p>",
+                    csv_path, user_id=user_id, dedupe_key=f"export:{self.request.id}",
+                )
 
-            return {"csv_file": f"exports/{filename}", "rows": len(records)}
+            result = {"csv_file": f"exports/{filename}", "rows": rows}
+            export_progress.finish(self.request.id, result)
+            export_reuse.complete(reuse_key, self.request.id, result)
+            return result
         except Exception:
             app.logger.exception("Export job failed")
+            export_progress.finish(self.request.id, {"error": "export_failed"}, state="FAILURE")
+            export_reuse.complete(reuse_key, self.request.id, {"error": "export_failed"})
             return {"error": "export_failed"}
+
+
+@celery.task(bind=True)
+def export_all_parking_data(self, email=None, filters=None, compress=False, fmt="csv", chunks=EXPORT_CHUNKS,
+                            requested_by=None, reuse_key=None):
+    """
+    Admin-wide export across all users. Splits the reservation id space into
+    `chunks` ranges exported in parallel by export_chunk, then merged by
+    merge_export_chunks; this task is replaced by that chord so its result
+    is the merged file. The chunks report progress under this task's id.
+    """
+    with app.app_context():
+        filename = export_filename("all", self.request.id, compress, fmt)
+        ranges = id_ranges(chunks, filters=filters)
+        tracker = export_progress.start(self.request.id, requested_by, count_rows(filters=filters))
+        if not ranges:
+            write_rows(export_storage.path(filename), filters=filters, compress=compress, fmt=fmt)
+            export_storage.admit(filename)
+            result = {"csv_file": f"exports/{filename}", "rows": 0}
+            export_progress.finish(self.request.id, result)
+            export_reuse.complete(reuse_key, self.request.id, result)
+            return result
+
+        job = {
+            "task_id": self.request.id, "user_id": requested_by, "total": tracker.total,
+            "started": tracker.started, "reuse_key": reuse_key,
+        }
+        parts = [
+            export_chunk.s(export_storage.path(f"{filename}.part{i}"), id_range, filters, compress, fmt, job)
+            for i, id_range in enumerate(ranges)
+        ]
+        # A failed chunk (or merge) must not leave the job PROGRESS, nor its reuse key pending
+        callback = merge_export_chunks.s(filename, email, compress, fmt, job).on_error(export_chunks_failed.s(job))
+        if self.request.is_eager:
+            # replace() waits on the chord, which eager mode forbids; the chord has run inline
+            try:
+                return chord(parts)(callback).result
+            except Exception:
+                app.logger.exception("Admin export failed")
+                return fail_admin_export(job)
+        return self.replace(chord(parts, callback))
+
+
+@celery.task
+def export_chunk(part_path, id_range, filters=None, compress=False, fmt="csv", job=None):
+    """Write one headerless slice (inclusive reservation id range) of an admin export."""
+    with app.app_context():
+        tracker = None
+        if job:
+            tracker = ProgressTracker(
+                export_progress, job["task_id"], job["user_id"], job["total"], job["started"], shared=True
+            )
+        rows = write_rows(
+            part_path, filters=filters, id_range=tuple(id_range), compress=compress, header=False, fmt=fmt,
+            progress=tracker,
+        )
+        return {"part": part_path, "rows": rows}
+
+
+@celery.task
+def merge_export_chunks(results, filename, email=None, compress=False, fmt="csv", job=None):
+    """Chord callback: concatenate chunk files (in id order) into the final export."""
+    with app.app_context():
+        csv_path = export_storage.path(filename)
+        merge_parts(csv_path, [r["part"] for r in results], compress, fmt)
+        rows = sum(r["rows"] for r in results)
+        export_storage.admit(filename)
+
+        if email:
+            queue_email(
+                email, "Parking Export is Ready",
+                f"<p>The export exports/{filename} ({rows} rows) is ready for download.</p>",
+                dedupe_key=f"export:{filename}",
+            )
+
+        result = {"csv_file": f"exports/{filename}", "rows": rows}
+        if job:
+            export_progress.finish(job["task_id"], result)
+            export_reuse.complete(job.get("reuse_key"), job["task_id"], result)
+        return result
+
+
+def fail_admin_export(job):
+    result = {"error": "export_failed"}
+    export_progress.finish(job["task_id"], result, state="FAILURE")
+    export_reuse.complete(job.get("reuse_key"), job["task_id"], result)
+    return result
+
+
+@celery.task
+def export_chunks_failed(request, exc, traceback, job):
+    """Error callback of the admin export chord: publish FAILURE and release the reuse key."""
+    with app.app_context():
+        app.logger.error(f"Admin export {job['task_id']} failed: {exc!r}")
+        return fail_admin_export(job)
+
+
+@celery.task
+def compact_exports():
+    """Beat task: expire, compress and evict export files (see export_storage.compact)."""
+    with app.app_context():
+        return export_storage.compact()
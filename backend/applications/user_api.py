@@ -1,17 +1,14 @@
 from flask import request
 from flask_restful import Resource, abort
-from flask_jwt_extended import jwt_required, get_jwt_identity
 from applications.models import db, Users
+from applications.authz import admin_required, current_principal, mark_user_deleted
+from applications.database import read_only
 
 class UsersAPI(Resource):
-    @jwt_required()
+    @admin_required
+    @read_only
     def get(self, user_id=None):
         """Admin: Fetch all users or a single user by ID."""
-        current_user_id = get_jwt_identity()
-        current_user = Users.query.get(current_user_id)
-        if not current_user or not current_user.is_admin:
-            abort(403, message="Admin access required")
-
         if user_id:
             user = Users.query.get(user_id)
             if not user:
@@ -21,15 +18,10 @@ class UsersAPI(Resource):
         users = Users.query.all()
         return {"users": [user.convert_to_json() for user in users]}, 200
 
-    @jwt_required()
+    @admin_required
     def delete(self, user_id):
         """Admin: Delete a user by ID."""
-        current_user_id = get_jwt_identity()
-        current_user = Users.query.get(current_user_id)
-        if not current_user or not current_user.is_admin:
-            abort(403, message="Admin access required")
-
-        if current_user.id == user_id:
+        if current_principal().id == user_id:
             abort(400, message="Admin cannot delete themselves")
 
         user = Users.query.get(user_id)
@@ -38,4 +30,5 @@ class UsersAPI(Resource):
 
         db.session.delete(user)
         db.session.commit()
+        mark_user_deleted(user_id)
         return {"message": f"User {user_id} deleted successfully"}, 200
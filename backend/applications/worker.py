@@ -10,6 +10,7 @@ celery = Celery("parking_app")
 celery.conf.update(
     broker_url=Config.CELERY_BROKER_URL,
     result_backend=Config.CELERY_RESULT_BACKEND,
+    result_expires=Config.CELERY_RESULT_EXPIRES,
     timezone="Asia/Kolkata",
     enable_utc=False,
     beat_schedule={
@@ -21,6 +22,18 @@ celery.conf.update(
             "task": "applications.tasks.monthly_summary",
             "schedule": crontab(day_of_month=1, hour=9, minute=0),  # 1st day of month, 9 AM
         },
+        "drain-outbox": {
+            "task": "applications.tasks.drain_outbox",
+            "schedule": 30.0,  # seconds; picks up retries that came due
+        },
+        "prune-outbox": {
+            "task": "applications.tasks.prune_outbox",
+            "schedule": crontab(hour=3, minute=30),
+        },
+        "compact-exports": {
+            "task": "applications.tasks.compact_exports",
+            "schedule": crontab(minute="*/15"),
+        },
     },
 )
 
@@ -0,0 +1,52 @@
+# benchmarks/common.py
+"""
+Helpers for the benchmark scripts. Run them from backend/, e.g.
+
+    python -m benchmarks.smtp_throughput --messages 500
+
+They need the packages in requirements-dev.txt and print one line per
+variant; nothing is asserted, the numbers are for comparing changes.
+"""
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+
+
+def make_app(**config):
+    """
+    A full app on a throwaway SQLite file with in-process caches, inline
+    password hashing and an in-process Redis (fakeredis) for the occupancy
+    index; keyword arguments override Config settings.
+    """
+    import fakeredis
+    from applications import create_app
+    from applications.config import Config
+    from applications.occupancy import occupancy
+
+    settings = {
+        "SQLALCHEMY_DATABASE_URI": "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="bench"), "bench.sqlite3"),
+        "CACHE_TYPE": "SimpleCache",
+        "PASSWORD_HASH_WORKERS": 0,
+    }
+    settings.update(config)
+    for name, value in settings.items():
+        setattr(Config, name, value)
+    occupancy._client = fakeredis.FakeRedis()
+    return create_app()
+
+
+@contextmanager
+def timed(results, label, count):
+    """Time the block and append (label, count, seconds) to results."""
+    start = time.perf_counter()
+    yield
+    results.append((label, count, time.perf_counter() - start))
+
+
+def report(results, unit="ops"):
+    """Print throughput per variant, relative to the first one."""
+    baseline = results[0][1] / results[0][2] if results else 0
+    for label, count, seconds in results:
+        rate = count / seconds if seconds else float("inf")
+        print(f"{label:45} {count:7d} {unit} {seconds:8.3f}s {rate:10.1f} {unit}/s  x{rate / baseline:.1f}")
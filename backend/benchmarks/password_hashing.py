@@ -0,0 +1,73 @@
+# benchmarks/password_hashing.py
+"""
+Login throughput with password hashing inline on the request threads
+versus on the process pool, and the 503 backpressure once more logins
+are queued than PASSWORD_HASH_MAX_PENDING.
+
+    python -m benchmarks.password_hashing --logins 48 --threads 16 --workers 2 --max-pending 4
+"""
+import argparse
+import threading
+import time
+from applications.passwords import hasher
+from benchmarks.common import make_app
+
+
+def login_burst(app, logins, threads):
+    """`logins` concurrent logins from `threads` client threads; returns (statuses, latencies, seconds)."""
+    client = app.test_client()
+    statuses, latencies = [], []
+    lock = threading.Lock()
+    start = threading.Barrier(threads)
+
+    def worker(count):
+        start.wait()
+        for _ in range(count):
+            began = time.perf_counter()
+            response = client.post("/api/login", json={"email": "admin@gmail.com", "password": "admin"})
+            with lock:
+                statuses.append(response.status_code)
+                latencies.append(time.perf_counter() - began)
+
+    pool = [threading.Thread(target=worker, args=(logins // threads,)) for _ in range(threads)]
+    began = time.perf_counter()
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    return statuses, sorted(latencies), time.perf_counter() - began
+
+
+def run(label, logins, threads, **config):
+    app = make_app(**config)
+    with app.app_context():
+        hasher.verify(hasher.hash("warm-up"), "warm-up")  # start the pool's processes before timing
+    try:
+        statuses, latencies, seconds = login_burst(app, logins, threads)
+    finally:
+        if hasher._pool is not None:
+            hasher._pool.shutdown()
+            hasher._pool = None
+    ok = statuses.count(200)
+    p50, p95 = latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.95) - 1]
+    print(f"{label:38} {ok:4d} ok {statuses.count(503):4d} x 503 in {seconds:7.3f}s "
+          f"{ok / seconds:8.1f} logins/s  p50 {p50 * 1000:7.1f} ms  p95 {p95 * 1000:7.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--logins", type=int, default=48)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--max-pending", type=int, default=4)
+    args = parser.parse_args()
+
+    run("inline on request threads", args.logins, args.threads, PASSWORD_HASH_WORKERS=0)
+    run(f"pool of {args.workers}", args.logins, args.threads,
+        PASSWORD_HASH_WORKERS=args.workers, PASSWORD_HASH_MAX_PENDING=args.logins)
+    run(f"pool of {args.workers}, {args.max_pending} pending at most", args.logins, args.threads,
+        PASSWORD_HASH_WORKERS=args.workers, PASSWORD_HASH_MAX_PENDING=args.max_pending)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+# benchmarks/smtp_throughput.py
+"""
+SMTP throughput: one connection per message (the old send_via_smtp) versus
+the pooled mailer, sequential and with SMTP_CONCURRENCY connections.
+Messages go to a local aiosmtpd server; --latency adds a per-message
+delay on the server to stand in for a remote provider.
+
+    python -m benchmarks.smtp_throughput --messages 500 --concurrency 4 --latency 0.005
+"""
+import argparse
+import asyncio
+import smtplib
+import socket
+from flask import Flask
+from aiosmtpd.controller import Controller
+from applications.mailer import build_message, mailer
+from benchmarks.common import report, timed
+
+
+class SlowHandler:
+    def __init__(self, latency):
+        self.latency = latency
+        self.delivered = 0
+
+    async def handle_DATA(self, server, session, envelope):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self.delivered += 1
+        return "250 OK"
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--messages", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.0, help="server-side seconds per message")
+    args = parser.parse_args()
+
+    handler = SlowHandler(args.latency)
+    controller = Controller(handler, hostname="127.0.0.1", port=free_port())
+    controller.start()
+    # The mailer only needs the SMTP settings from the app config
+    app = Flask(__name__)
+    app.config.update(SMTP_HOST="127.0.0.1", SMTP_PORT=controller.port, SMTP_MAX_MESSAGES_PER_CONNECTION=100)
+    messages = [
+        build_message("noreply@parkingapp.com", f"user{i}@example.com", "Reminder", "<p>Book a spot</p>")
+        for i in range(args.messages)
+    ]
+    results = []
+    try:
+        with timed(results, "connection per message", len(messages)):
+            for msg in messages:
+                with smtplib.SMTP("127.0.0.1", controller.port, timeout=10) as server:
+                    server.send_message(msg)
+
+        with app.app_context():
+            app.config["SMTP_CONCURRENCY"] = 1
+            with timed(results, "pooled, 1 connection", len(messages)):
+                assert all(mailer.send_many(messages))
+            mailer.close()
+
+            app.config["SMTP_CONCURRENCY"] = args.concurrency
+            with timed(results, f"pooled, {args.concurrency} connections", len(messages)):
+                assert all(mailer.send_many(messages))
+            mailer.close()
+    finally:
+        controller.stop()
+    report(results, unit="msgs")
+    print(f"delivered: {handler.delivered}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+# benchmarks/user_summary.py
+"""
+User summary: the aggregate queries and rollups of /api/user/summary
+versus the original per-row computation (load every reservation, then its
+spot and lot one lazy load at a time). The cache is cleared before every
+call, so both sides compute from the database.
+
+    python -m benchmarks.user_summary --reservations 20000 --lots 20 --repeat 10
+"""
+import argparse
+import random
+from collections import defaultdict
+from datetime import datetime, timedelta
+from sqlalchemy import insert, select
+from applications.api import cache
+from applications.cache_tags import local_cache
+from applications.models import db, ParkingLot, ParkingSpot, Reservation
+from applications.provisioning import add_spots
+from applications.rollups import rebuild_rollups
+from applications.summary_api import UserSummaryAPI
+from benchmarks.common import make_app, report, timed
+
+
+def per_row_summary(user_id):
+    """The summary as computed before the aggregate queries (one object per reservation)."""
+    reservations = Reservation.query.filter_by(user_id=user_id).all()
+    monthly_cost = defaultdict(float)
+    lot_usage = defaultdict(int)
+    for r in reservations:
+        if r.parking_timestamp and r.parking_cost:
+            monthly_cost[r.parking_timestamp.strftime("%b %Y")] += r.parking_cost
+        if r.spot_id and r.spot and r.spot.lot:
+            lot_usage[r.spot.lot.prime_location_name] += 1
+    active = sum(1 for r in reservations if not r.leaving_timestamp)
+    return {
+        "total_bookings": len(reservations),
+        "total_cost": round(sum(r.parking_cost or 0 for r in reservations), 2),
+        "active": active,
+        "past": len(reservations) - active,
+        "monthly_cost": dict(sorted(monthly_cost.items())),
+        "lot_usage": lot_usage,
+    }
+
+
+def populate(user_id, reservations, lots, spots_per_lot=20):
+    for n in range(lots):
+        lot = ParkingLot(prime_location_name=f"Lot {n}", price=10, address="1 Main St", pin_code="560001",
+                         number_of_spots=spots_per_lot)
+        db.session.add(lot)
+        db.session.flush()
+        add_spots(lot.id, spots_per_lot)
+    db.session.commit()
+    spot_ids = db.session.scalars(select(ParkingSpot.id)).all()
+
+    rng = random.Random(1)
+    start = datetime(2025, 1, 1)
+    rows = []
+    for n in range(reservations):
+        parked = start + timedelta(minutes=37 * n)
+        rows.append({
+            "spot_id": rng.choice(spot_ids), "user_id": user_id, "vehicle_number": f"KA{n:06d}",
+            "parking_timestamp": parked, "leaving_timestamp": parked + timedelta(hours=2),
+            "parking_cost": 20.0,
+        })
+    db.session.execute(insert(Reservation.__table__), rows)
+    db.session.commit()
+    rebuild_rollups()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--reservations", type=int, default=20000)
+    parser.add_argument("--lots", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    app = make_app()
+    client = app.test_client()
+    token = client.post("/api/login", json={"email": "admin@gmail.com", "password": "admin"}).get_json()["token"]
+    with app.app_context():
+        populate(1, args.reservations, args.lots)
+
+    results = []
+    with app.test_request_context(headers={"Authorization": f"Bearer {token}"}):
+        per_row = aggregate = None
+        with timed(results, "per-row (before)", args.repeat):
+            for _ in range(args.repeat):
+                db.session.expunge_all()
+                per_row = per_row_summary(1)
+        with timed(results, "aggregate queries + rollups", args.repeat):
+            for _ in range(args.repeat):
+                cache.clear()
+                local_cache.clear()
+                aggregate, _ = UserSummaryAPI().get()
+    report(results, unit="summaries")
+    same = {key: per_row[key] for key in ("total_bookings", "total_cost", "active", "past")} == {
+        key: aggregate[key] for key in ("total_bookings", "total_cost", "active", "past")
+    } and dict(per_row["lot_usage"]) == dict(aggregate["lot_usage"])
+    print(f"{args.reservations} reservations in {args.lots} lots; results match: {same}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+# benchmarks/wal_mixed.py
+"""
+Mixed read/write load on SQLite: reader threads page through
+/api/reservations (a @read_only handler) while writer threads book and
+release spots, for the stock SQLite profile and for sqlite-wal with its
+separate reader pool. Reports reads/s, writes/s and failed requests.
+
+    python -m benchmarks.wal_mixed --seconds 5 --readers 6 --writers 2
+"""
+import argparse
+import threading
+import time
+from benchmarks.common import make_app
+
+RELEASE = {"action": "released", "leaving_time": "2031-01-01T10:00:00+05:30"}
+
+
+def run(profile, seconds, readers, writers, history):
+    app = make_app(DB_PROFILE=profile)
+    client = app.test_client()
+    token = client.post("/api/login", json={"email": "admin@gmail.com", "password": "admin"}).get_json()["token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    lot = client.post("/api/parking_lots", json={
+        "prime_location_name": "Bench", "price": 10, "address": "1 Main St", "pin_code": "560001",
+        "number_of_spots": writers * 4,
+    }, headers=headers).get_json()["id"]
+    for n in range(history):  # something to page through
+        booked = client.post("/api/reservations", json={"lot_id": lot, "vehicle_no": f"H{n}"}, headers=headers)
+        client.patch(f"/api/reservations/{booked.get_json()['reservation']['id']}", json=RELEASE, headers=headers)
+
+    counts = {"reads": 0, "writes": 0, "failed": 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def count(name, ok):
+        with lock:
+            counts[name if ok else "failed"] += 1
+
+    def reader():
+        while time.perf_counter() < deadline:
+            response = client.get("/api/reservations?active=false&order=desc&limit=50", headers=headers)
+            count("reads", response.status_code == 200)
+
+    def writer(n):
+        i = 0
+        while time.perf_counter() < deadline:
+            booked = client.post("/api/reservations", json={"lot_id": lot, "vehicle_no": f"W{n}-{i}"}, headers=headers)
+            count("writes", booked.status_code == 201)
+            if booked.status_code == 201:
+                reservation = booked.get_json()["reservation"]["id"]
+                released = client.patch(f"/api/reservations/{reservation}", json=RELEASE, headers=headers)
+                count("writes", released.status_code == 200)
+            i += 1
+
+    pool = [threading.Thread(target=reader) for _ in range(readers)]
+    pool += [threading.Thread(target=writer, args=(n,)) for n in range(writers)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    print(f"{profile:16} {counts['reads'] / seconds:9.1f} reads/s {counts['writes'] / seconds:9.1f} writes/s "
+          f"{counts['failed']:6d} failed")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--readers", type=int, default=6)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--history", type=int, default=500, help="closed reservations created first")
+    args = parser.parse_args()
+    for profile in ("sqlite-default", "sqlite-wal"):
+        run(profile, args.seconds, args.readers, args.writers, args.history)
+
+
+if __name__ == "__main__":
+    main()
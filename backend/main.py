@@ -1,6 +1,10 @@
 from applications import create_app
 
-app = create_app()
+# Processes spawned by the password hashing pool re-import this module as
+# __mp_main__ when the server was started with `python main.py`; only the
+# server itself builds the app (DB connections, migrations, default admin).
+if __name__ != "__mp_main__":
+    app = create_app()
 
 if __name__ == "__main__":
     app.run(debug=True, port=8000)
@@ -0,0 +1,131 @@
+# tests/conftest.py
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import insert
+from applications import create_app
+from applications.config import Config
+from applications.models import db, Reservation
+from applications.occupancy import occupancy
+
+try:
+    import fakeredis
+except ImportError:  # occupancy then falls back to SQL (Redis errors are swallowed)
+    fakeredis = None
+
+
+@pytest.fixture
+def redis_client():
+    if fakeredis is None:
+        pytest.skip("fakeredis is not installed")
+    return fakeredis.FakeRedis()
+
+
+@pytest.fixture
+def make_app(tmp_path, monkeypatch):
+    """
+    make_app(**config) -> a fresh app on its own SQLite file, with in-process
+    caches and inline hashing; keyword arguments override Config settings.
+    """
+    apps = []
+
+    def make_app(**config):
+        settings = {
+            "SQLALCHEMY_DATABASE_URI": "sqlite:///" + str(tmp_path / f"test{len(apps)}.sqlite3"),
+            "CACHE_TYPE": "SimpleCache",
+            "PASSWORD_HASH_WORKERS": 0,
+            "EXPORTS_DIR": str(tmp_path / "exports"),
+            "TESTING": True,
+        }
+        settings.update(config)
+        for name, value in settings.items():
+            monkeypatch.setattr(Config, name, value, raising=False)
+        if fakeredis is not None:
+            monkeypatch.setattr(occupancy, "_client", fakeredis.FakeRedis())
+        apps.append(create_app())
+        return apps[-1]
+
+    yield make_app
+    for app in apps:
+        with app.app_context():
+            db.session.remove()
+            for engine in db.engines.values():
+                engine.dispose()
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def login(client):
+    """login(email, password) -> Authorization headers; the default admin by default."""
+    def login(email="admin@gmail.com", password="admin"):
+        response = client.post("/api/login", json={"email": email, "password": password})
+        assert response.status_code == 200, response.get_json()
+        return {"Authorization": "Bearer " + response.get_json()["token"]}
+    return login
+
+
+@pytest.fixture
+def user_headers(client, login):
+    """A freshly signed-up regular user."""
+    response = client.post("/api/signup", json={"name": "user", "email": "user@example.com", "password": "Passw0rd!"})
+    assert response.status_code == 201, response.get_json()
+    return login("user@example.com", "Passw0rd!")
+
+
+@pytest.fixture
+def make_lot(client, login):
+    """make_lot(spots, price=10) -> id of a new lot."""
+    admin = login()
+
+    def make_lot(spots, price=10, name="Lot"):
+        response = client.post("/api/parking_lots", json={
+            "prime_location_name": name, "price": price, "address": "1 Main St",
+            "pin_code": "560001", "number_of_spots": spots,
+        }, headers=admin)
+        assert response.status_code == 201, response.get_json()
+        return response.get_json()["id"]
+    return make_lot
+
+
+@pytest.fixture
+def eager_celery(app, monkeypatch):
+    """Run Celery tasks inline with an in-memory result backend; export progress goes to fakeredis."""
+    from applications.export_progress import export_progress
+    from applications.worker import celery
+
+    if fakeredis is None:
+        pytest.skip("fakeredis is not installed")
+    monkeypatch.setattr(export_progress, "_client", fakeredis.FakeRedis())
+    saved = {key: celery.conf.get(key) for key in (
+        "task_always_eager", "task_store_eager_result", "result_backend", "CELERY_RESULT_BACKEND",
+    )}
+    celery.conf.update(
+        task_always_eager=True, task_store_eager_result=True,
+        result_backend="cache+memory://", CELERY_RESULT_BACKEND="cache+memory://",
+    )
+    celery.__dict__.pop("backend", None)
+    yield celery
+    celery.conf.update(saved)
+    celery.__dict__.pop("backend", None)
+
+
+@pytest.fixture
+def reservations(app):
+    """reservations(count, user_id=1) bulk-inserts closed reservations one minute apart."""
+    def add(count, user_id=1, start=datetime(2026, 1, 1)):
+        with app.app_context():
+            db.session.execute(insert(Reservation.__table__), [dict(
+                spot_id=None, user_id=user_id, vehicle_number=f"KA{i:05d}",
+                parking_timestamp=start + timedelta(minutes=i),
+                leaving_timestamp=start + timedelta(minutes=i + 30), parking_cost=1.5,
+            ) for i in range(count)])
+            db.session.commit()
+    return add
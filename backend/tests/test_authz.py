@@ -0,0 +1,37 @@
+import pytest
+import redis
+from applications.api import cache
+from applications.authz import principal_cache
+
+
+@pytest.fixture(autouse=True)
+def fresh_principal_cache():
+    principal_cache.clear()
+    yield
+    principal_cache.clear()
+
+
+def test_logout_revokes_the_token(client, user_headers):
+    assert client.get("/api/profile", headers=user_headers).status_code == 200
+    assert client.post("/api/logout", headers=user_headers).status_code == 200
+    assert client.get("/api/profile", headers=user_headers).status_code == 401
+
+
+def test_deleting_a_user_revokes_their_tokens(client, login, user_headers):
+    assert client.delete("/api/users/2", headers=login()).status_code == 200
+    assert client.get("/api/profile", headers=user_headers).status_code == 401
+
+
+def test_revocation_check_fails_closed_while_the_cache_is_down(client, user_headers, monkeypatch):
+    get_many = cache.get_many
+
+    def unavailable(*keys):
+        raise redis.ConnectionError("down")
+
+    monkeypatch.setattr(cache, "get_many", unavailable)
+    response = client.get("/api/profile", headers=user_headers)
+    assert response.status_code == 503
+    assert "retry" in response.get_json()["message"]
+
+    monkeypatch.setattr(cache, "get_many", get_many)  # the outage is not remembered: the next request checks again
+    assert client.get("/api/profile", headers=user_headers).status_code == 200
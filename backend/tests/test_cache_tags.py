@@ -0,0 +1,118 @@
+import threading
+import pytest
+from applications.api import cache
+from applications.cache_tags import (
+    LocalLRU, TAG_VERSION_KEY, cache_get, cache_stats, cached, invalidate, local_cache, shared_stats, version_cache,
+)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr("applications.cache_tags.time.monotonic", clock)
+    return clock
+
+
+@pytest.fixture
+def l1_app(make_app):
+    """An app with L1 enabled over the in-memory SimpleCache (L2); counts L2 reads."""
+    app = make_app(CACHE_L1_ENABLED=True, CACHE_L1_TTL=30, CACHE_L1_VERSION_TTL=1)
+    with app.app_context():
+        yield app
+
+
+@pytest.fixture
+def l2_reads(l1_app, monkeypatch):
+    reads = []
+
+    def counted(name, read):
+        def call(*keys):
+            reads.append(name)
+            return read(*keys)
+        return call
+
+    for name in ("get", "get_many"):
+        monkeypatch.setattr(cache, name, counted(name, getattr(cache, name)))
+    return reads
+
+
+def test_lru_hits_misses_and_evicts_the_least_recently_used(clock):
+    lru = LocalLRU(max_entries=2, ttl=10, enabled=True)
+    assert lru.get("a") is LocalLRU.MISSING
+    lru.set("a", 1)
+    lru.set("b", 2)
+    assert lru.get("a") == 1  # "b" is now the least recently used
+    lru.set("c", 3)
+    assert lru.get("b") is LocalLRU.MISSING
+    assert (lru.get("a"), lru.get("c")) == (1, 3)
+    assert lru.stats == {"hits": 3, "misses": 2, "evictions": 1, "expirations": 0}
+
+
+def test_lru_entries_expire(clock):
+    lru = LocalLRU(ttl=10, enabled=True)
+    lru.set("a", 1)
+    clock.now += 9
+    assert lru.get("a") == 1
+    clock.now += 2
+    assert lru.get("a") is LocalLRU.MISSING
+    assert lru.stats["expirations"] == 1 and len(lru) == 0
+
+
+def test_an_l1_hit_does_not_touch_l2(l1_app, l2_reads):
+    computed = []
+    assert cached("lots", ["lots"], lambda: computed.append(1) or "v1") == "v1"
+    l2_reads.clear()
+
+    assert cached("lots", ["lots"], lambda: computed.append(1) or "v2") == "v1"
+    assert computed == [1]
+    assert l2_reads == []
+    assert cache_stats()["l1"]["hits"] == 1
+
+
+def test_invalidation_is_seen_at_once_by_this_process(l1_app):
+    cached("lots", ["lots", "lot:1"], lambda: "old")
+    invalidate("lot:1")
+    assert cached("lots", ["lots", "lot:1"], lambda: "new") == "new"
+    assert cached("lots", ["lots"], lambda: "other") == "other"  # a different key
+
+
+def test_other_processes_invalidations_are_seen_within_the_version_ttl(l1_app, clock):
+    cached("lots", ["lots"], lambda: "old")
+    cache.cache.inc(TAG_VERSION_KEY.format("lots"))  # bumped by another worker
+    assert cached("lots", ["lots"], lambda: "new") == "old"
+    clock.now += 1.5
+    assert cached("lots", ["lots"], lambda: "new") == "new"
+
+
+def test_l1_disabled_reads_versions_from_l2(app):
+    with app.app_context():
+        assert not version_cache.enabled
+        cached("lots", ["lots"], lambda: "old")
+        cache.cache.inc(TAG_VERSION_KEY.format("lots"))
+        assert cached("lots", ["lots"], lambda: "new") == "new"
+
+
+def test_shared_stats_count_every_read_across_threads(app, monkeypatch):
+    monkeypatch.setattr(local_cache, "enabled", False)
+    monkeypatch.setitem(shared_stats, "hits", 0)
+    monkeypatch.setitem(shared_stats, "misses", 0)
+
+    def read():
+        with app.app_context():
+            for _ in range(500):
+                cache_get("missing")
+
+    threads = [threading.Thread(target=read) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert shared_stats == {"hits": 0, "misses": 4000}
@@ -0,0 +1,79 @@
+# tests/test_database.py
+import pytest
+from flask import Flask
+from sqlalchemy import text
+from applications.config import Config
+from applications.database import READ_BIND, configure_engines, is_memory_sqlite, read_only
+from applications.models import db, ParkingLot
+
+
+def pragma(engine, name):
+    with engine.connect() as conn:
+        return conn.execute(text(f"PRAGMA {name}")).scalar()
+
+
+@pytest.mark.parametrize("uri, memory", [
+    ("sqlite://", True),
+    ("sqlite:///:memory:", True),
+    ("sqlite:///file:shared?mode=memory&cache=shared&uri=true", True),
+    ("sqlite:////var/lib/parking/database.sqlite3", False),
+    ("postgresql://parking@db/parking", False),
+])
+def test_is_memory_sqlite(uri, memory):
+    assert is_memory_sqlite(uri) is memory
+
+
+def test_wal_profile_tunes_sqlite_and_adds_a_reader_pool(make_app):
+    app = make_app(DB_PROFILE="sqlite-wal")
+    with app.app_context():
+        assert set(db.engines) == {None, READ_BIND}
+        for engine in db.engines.values():
+            assert pragma(engine, "journal_mode") == "wal"
+            assert pragma(engine, "busy_timeout") == Config.SQLITE_BUSY_TIMEOUT_MS
+            assert pragma(engine, "synchronous") == 1  # NORMAL
+
+        # Queries in @read_only handlers go to the reader bind, writes to the primary
+        assert db.session.get_bind() is db.engines[None]
+        assert read_only(lambda: db.session.get_bind())() is db.engines[READ_BIND]
+
+
+def test_default_profile_keeps_stock_sqlite(make_app):
+    app = make_app(DB_PROFILE="sqlite-default")
+    with app.app_context():
+        assert set(db.engines) == {None}
+        assert pragma(db.engine, "journal_mode") == "delete"
+
+
+def test_memory_database_has_no_reader_bind(make_app):
+    app = make_app(SQLALCHEMY_DATABASE_URI="sqlite:///:memory:")
+    with app.app_context():
+        assert set(db.engines) == {None}
+
+    client = app.test_client()
+    token = client.post("/api/login", json={"email": "admin@gmail.com", "password": "admin"}).get_json()["token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    created = client.post("/api/parking_lots", json={
+        "prime_location_name": "A", "price": 10, "address": "x", "pin_code": "560001", "number_of_spots": 2,
+    }, headers=headers)
+    assert created.status_code == 201
+    # Read through a @read_only handler: must see the same in-memory database
+    listed = client.get("/api/parking_lots", headers=headers)
+    assert listed.status_code == 200
+    with app.app_context():
+        assert ParkingLot.query.count() == 1
+
+
+def test_server_profile_pools_connections():
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    app.config.update(
+        SQLALCHEMY_DATABASE_URI="postgresql://parking@db/parking",
+        DATABASE_READ_URL="postgresql://parking@replica/parking",
+        DB_PROFILE="server",
+    )
+    configure_engines(app)
+    options = app.config["SQLALCHEMY_ENGINE_OPTIONS"]
+    assert options["pool_size"] == Config.DB_POOL_SIZE
+    assert options["max_overflow"] == Config.DB_MAX_OVERFLOW
+    assert options["pool_pre_ping"] is True
+    assert app.config["SQLALCHEMY_BINDS"][READ_BIND]["url"] == "postgresql://parking@replica/parking"
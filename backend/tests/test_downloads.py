@@ -0,0 +1,86 @@
+# tests/test_downloads.py
+import gzip
+import os
+import pytest
+from applications.export_storage import export_storage
+
+NAME = "parking_export_user_2_0b5f3c1e-2a7d-4e8b-9c1f-3d2e1a0b9c8d.csv"
+DATA = b"".join(b"%d,2,KA%05d\r\n" % (i, i) for i in range(2000))
+
+
+@pytest.fixture
+def export_file(app):
+    path = export_storage.path(NAME)
+    with open(path, "wb") as f:
+        f.write(DATA)
+    return path
+
+
+def test_download_sends_etag_and_honours_if_none_match(client, export_file):
+    response = client.get(f"/api/exports/{NAME}")
+    assert response.status_code == 200
+    assert response.data == DATA
+    assert response.headers["Accept-Ranges"] == "bytes"
+    assert "attachment" in response.headers["Content-Disposition"]
+    etag = response.headers["ETag"]
+
+    cached = client.get(f"/api/exports/{NAME}", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.data == b""
+
+
+def test_range_requests_resume_a_download(client, export_file):
+    response = client.get(f"/api/exports/{NAME}", headers={"Range": "bytes=100-199"})
+    assert response.status_code == 206
+    assert response.data == DATA[100:200]
+    assert response.headers["Content-Range"] == f"bytes 100-199/{len(DATA)}"
+
+    etag = client.get(f"/api/exports/{NAME}").headers["ETag"]
+    resumed = client.get(f"/api/exports/{NAME}", headers={"Range": "bytes=100-", "If-Range": etag})
+    assert resumed.status_code == 206
+    assert resumed.data == DATA[100:]
+
+    # The file changed since: If-Range no longer matches, so the whole file is sent
+    with open(export_file, "ab") as f:
+        f.write(b"9999,2,KA09999\r\n")
+    changed = client.get(f"/api/exports/{NAME}", headers={"Range": "bytes=100-", "If-Range": etag})
+    assert changed.status_code == 200
+    assert changed.data.startswith(DATA)
+
+
+def test_precompressed_variant_is_served_to_gzip_clients(client, export_file):
+    with open(export_file + ".gz", "wb") as f:
+        f.write(gzip.compress(DATA))
+
+    compressed = client.get(f"/api/exports/{NAME}", headers={"Accept-Encoding": "gzip, deflate"})
+    assert compressed.status_code == 200
+    assert compressed.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in compressed.headers["Vary"]
+    assert gzip.decompress(compressed.data) == DATA
+    assert compressed.headers["ETag"] != client.get(f"/api/exports/{NAME}").headers["ETag"]
+
+    plain = client.get(f"/api/exports/{NAME}", headers={"Accept-Encoding": "identity"})
+    assert "Content-Encoding" not in plain.headers
+    assert plain.data == DATA
+
+
+def test_compacted_export_is_still_downloadable(client, export_file):
+    # Compaction replaced the file by its .gz: gzip clients get it decoded, others get the .gz itself
+    with open(export_file + ".gz", "wb") as f:
+        f.write(gzip.compress(DATA))
+    os.remove(export_file)
+
+    compressed = client.get(f"/api/exports/{NAME}", headers={"Accept-Encoding": "gzip"})
+    assert compressed.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(compressed.data) == DATA
+
+    raw = client.get(f"/api/exports/{NAME}", headers={"Accept-Encoding": "identity"})
+    assert raw.status_code == 200
+    assert raw.mimetype == "application/gzip"
+    assert f'filename={NAME}.gz' in raw.headers["Content-Disposition"]
+    assert gzip.decompress(raw.data) == DATA
+
+
+@pytest.mark.parametrize("name", ["missing.csv", "..%2Fconfig.py"])
+def test_unknown_or_outside_files_are_404(client, export_file, name):
+    assert client.get(f"/api/exports/{name}").status_code == 404
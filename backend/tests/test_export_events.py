@@ -0,0 +1,84 @@
+# tests/test_export_events.py
+import json
+import threading
+import time
+import pytest
+from applications.export_progress import export_progress
+
+
+@pytest.fixture
+def other_headers(client, login):
+    response = client.post("/api/signup", json={"name": "other", "email": "other@example.com", "password": "Passw0rd!"})
+    assert response.status_code == 201
+    return login("other@example.com", "Passw0rd!")
+
+
+@pytest.fixture
+def finished_export(client, user_headers, eager_celery, reservations, monkeypatch):
+    from applications import tasks
+    monkeypatch.setattr(tasks, "queue_email", lambda *args, **kwargs: True)
+    reservations(30, user_id=2)
+    return client.post("/api/export", json={}, headers=user_headers).get_json()["task_id"]
+
+
+def events(response):
+    """The JSON states of an SSE response, in order."""
+    body = b"".join(response.response).decode()
+    return [json.loads(block[len("data: "):]) for block in body.split("\n\n") if block.startswith("data: ")]
+
+
+def test_events_of_a_finished_export(client, user_headers, finished_export):
+    response = client.get(f"/api/export/events/{finished_export}", headers=user_headers, buffered=False)
+    assert response.status_code == 200
+    assert response.mimetype == "text/event-stream"
+    states = events(response)
+    assert [s["state"] for s in states] == ["SUCCESS"]
+    assert states[0]["result"]["rows"] == 30
+
+
+def test_events_stream_live_updates_until_done(app, client, user_headers, eager_celery):
+    with app.app_context():
+        export_progress.queued("job-live", 2)
+
+    def worker():
+        time.sleep(0.3)
+        with app.app_context():
+            tracker = export_progress.start("job-live", 2, 100)
+            tracker(50)
+            export_progress.finish("job-live", {"csv_file": "exports/x.csv", "rows": 100})
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    response = client.get("/api/export/events/job-live", headers=user_headers, buffered=False)
+    states = [s["state"] for s in events(response)]
+    thread.join()
+    assert states[0] == "PENDING"
+    assert states[-1] == "SUCCESS"
+    assert "PROGRESS" in states
+
+
+def test_only_the_owner_or_an_admin_may_watch(client, login, user_headers, other_headers, finished_export):
+    for path in ("status", "events"):
+        url = f"/api/export/{path}/{finished_export}"
+        assert client.get(url, headers=user_headers).status_code == 200
+        assert client.get(url, headers=login()).status_code == 200
+        assert client.get(url, headers=other_headers).status_code == 403
+        assert client.get(f"/api/export/{path}/no-such-task", headers=user_headers).status_code == 404
+
+
+def test_owner_is_known_after_the_snapshot_expires(app, client, user_headers, other_headers, finished_export):
+    with app.app_context():
+        export_progress.forget(finished_export)
+    # Answered from the result backend; the owner comes from the export file name
+    status = client.get(f"/api/export/status/{finished_export}", headers=user_headers)
+    assert status.status_code == 200
+    assert status.get_json()["state"] == "SUCCESS"
+    assert client.get(f"/api/export/status/{finished_export}", headers=other_headers).status_code == 403
+
+
+def test_queued_export_is_visible_to_its_owner_only(app, client, user_headers, other_headers, eager_celery):
+    with app.app_context():
+        export_progress.queued("job-queued", 2)
+    status = client.get("/api/export/status/job-queued", headers=user_headers)
+    assert status.get_json()["state"] == "PENDING"
+    assert client.get("/api/export/status/job-queued", headers=other_headers).status_code == 403
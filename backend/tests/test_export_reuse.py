@@ -0,0 +1,118 @@
+# tests/test_export_reuse.py
+import os
+import threading
+from datetime import datetime
+import pytest
+from applications import tasks
+from applications.export_progress import export_progress
+from applications.export_storage import export_storage
+from applications.models import db, Reservation
+
+
+@pytest.fixture
+def exports(client, user_headers, eager_celery, reservations, monkeypatch):
+    """post(**body) -> (status code, JSON) of POST /api/export as the regular user."""
+    monkeypatch.setattr(tasks, "queue_email", lambda *args, **kwargs: True)
+    reservations(20, user_id=2)
+
+    def post(**body):
+        response = client.post("/api/export", json=body, headers=user_headers)
+        return response.status_code, response.get_json()
+    return post
+
+
+@pytest.fixture
+def queued_tasks(eager_celery, monkeypatch):
+    """Task ids sent to a (stubbed) worker queue instead of running eagerly."""
+    started = []
+
+    class Queued:
+        def __init__(self, task_id):
+            self.id = task_id
+
+    def apply_async(*args, task_id=None, **kwargs):
+        started.append(task_id)
+        return Queued(task_id)
+    monkeypatch.setattr(tasks.export_parking_data, "apply_async", apply_async)
+    return started
+
+
+def test_identical_request_gets_the_finished_export(exports):
+    code, first = exports(date_from="2026-01-01T00:00:00")
+    assert code == 202
+    code, again = exports(date_from="2026-01-01T00:00:00")
+    assert code == 200
+    assert again["reused"] is True
+    assert again["task_id"] == first["task_id"]
+    assert again["state"] == "SUCCESS"
+    assert again["result"]["rows"] == 20
+
+
+@pytest.mark.parametrize("change", [{"gzip": True}, {"format": "jsonl"}, {"date_from": "2026-01-01T00:10:00"},
+                                    {"email": "me@example.com"}])
+def test_a_different_request_is_exported_again(exports, change):
+    _, first = exports(date_from="2026-01-01T00:00:00")
+    code, other = exports(**{"date_from": "2026-01-01T00:00:00", **change})
+    assert code == 202
+    assert other["task_id"] != first["task_id"]
+    assert not other.get("reused")
+
+
+def test_changed_data_is_exported_again(app, exports, reservations):
+    _, first = exports()
+    reservations(1, user_id=2)  # bulk insert: no ORM events, caught by the row count and max id
+    _, added = exports()
+    assert added["task_id"] != first["task_id"]
+
+    with app.app_context():
+        reservation = db.session.get(Reservation, 5)
+        reservation.leaving_timestamp = datetime(2026, 2, 1)
+        db.session.commit()  # same count and max id, caught by the cache tag version
+    _, updated = exports()
+    assert updated["task_id"] not in (first["task_id"], added["task_id"])
+
+
+def test_an_evicted_file_is_exported_again(exports):
+    _, first = exports()
+    _, again = exports()
+    os.remove(export_storage.locate(os.path.basename(again["result"]["csv_file"])))
+    code, rebuilt = exports()
+    assert code == 202
+    assert rebuilt["task_id"] != first["task_id"]
+
+
+def test_identical_requests_attach_to_the_running_export(exports, queued_tasks):
+    code, first = exports(date_to="2027-01-01T00:00:00")
+    assert code == 202
+    code, second = exports(date_to="2027-01-01T00:00:00")
+    assert code == 202
+    assert second == {"task_id": first["task_id"], "reused": True}
+    assert queued_tasks == [first["task_id"]]
+
+
+def test_concurrent_identical_requests_start_one_export(exports, queued_tasks):
+    ids = []
+    threads = [threading.Thread(target=lambda: ids.append(exports(date_to="2027-01-01T00:00:00")[1]["task_id"]))
+               for _ in range(12)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(queued_tasks) == 1
+    assert set(ids) == set(queued_tasks)
+
+
+def test_a_failed_run_is_not_reused(app, exports, queued_tasks):
+    _, first = exports()
+    with app.app_context():
+        export_progress.finish(first["task_id"], {"error": "export_failed"}, state="FAILURE")
+    _, retry = exports()
+    assert retry["task_id"] != first["task_id"]
+    assert len(queued_tasks) == 2
+
+
+@pytest.mark.parametrize("body", [{"date_from": "yesterday"}, {"date_to": "2026-13-45"}, {"format": 7}])
+def test_invalid_requests_are_rejected_before_reuse(exports, body):
+    code, response = exports(**body)
+    assert code == 400
+    assert "error" in response
@@ -0,0 +1,123 @@
+# tests/test_export_storage.py
+import gzip
+import os
+import time
+import uuid
+import pytest
+from applications.export_progress import export_progress
+from applications.export_storage import export_storage
+
+HOUR = 3600
+
+
+@pytest.fixture
+def storage_app(make_app):
+    return make_app(
+        EXPORT_TTL=24 * HOUR, EXPORT_PART_TTL=HOUR, EXPORT_GRACE=300, EXPORT_COMPRESS_THRESHOLD=4096,
+        EXPORT_USER_QUOTA=3000, EXPORT_TOTAL_QUOTA=10000,
+    )
+
+
+def write(owner="user_2", size=1000, age=0, ext=".csv", part=""):
+    """Create an export file `age` seconds old; returns its name."""
+    name = f"parking_export_{owner}_{uuid.uuid4()}{ext}{part}"
+    path = export_storage.path(name)
+    with open(path, "wb") as f:
+        f.write(b"1,2,KA01AB1234,2026-01-01 10:00:00\r\n" * (size // 36) + b"x" * (size % 36))
+    mtime = time.time() - age
+    os.utime(path, (mtime, mtime))
+    return name
+
+
+def names():
+    return {f.name for f in export_storage.files()}
+
+
+def test_compact_expires_old_files_and_orphaned_parts(storage_app):
+    old = write(age=25 * HOUR)
+    fresh = write(age=60)
+    stale_part = write(owner="all", age=2 * HOUR, part=".part3")
+    running_part = write(owner="all", age=60, part=".part4")
+    stats = export_storage.compact()
+    assert names() == {fresh, running_part}
+    assert (stats["expired"], stats["parts"]) == (1, 1)
+    assert old not in names() and stale_part not in names()
+
+
+def test_compact_gzips_large_text_exports_after_the_grace_period(storage_app, monkeypatch):
+    monkeypatch.setattr(export_storage, "total_quota", 10 ** 6)
+    big = write(owner="all", size=20000, age=HOUR)
+    young = write(owner="all", size=20000, age=10)
+    parquet = write(owner="all", size=20000, age=HOUR, ext=".parquet")
+    mtime = os.path.getmtime(export_storage.path(big))
+    with open(export_storage.path(big), "rb") as f:
+        original = f.read()
+
+    stats = export_storage.compact()
+    assert stats["compressed"] == 1
+    assert names() == {big + ".gz", young, parquet}
+    located = export_storage.locate(big)
+    assert located == export_storage.path(big + ".gz")
+    # The TTL still counts from when the export was made
+    assert os.path.getmtime(located) == pytest.approx(mtime)
+    with gzip.open(located, "rb") as f:
+        assert f.read() == original
+    assert stats["bytes_freed"] > 0
+
+
+def test_user_quota_evicts_that_users_oldest_exports(storage_app):
+    oldest = write(size=1500, age=300)
+    middle = write(size=1500, age=200)
+    newest = write(size=1500, age=100)
+    someone_else = write(owner="user_3", size=1500, age=400)
+    assert export_storage.enforce_quotas() == 1
+    assert names() == {middle, newest, someone_else}
+    assert oldest not in names()
+
+
+def test_total_quota_evicts_the_oldest_exports_overall(storage_app):
+    files = [write(owner=f"user_{i}", size=2500, age=1000 - i) for i in range(5)]
+    export_storage.enforce_quotas()
+    total, _ = export_storage.usage()
+    assert total <= 10000
+    assert names() == set(files[1:])
+
+
+def test_admit_keeps_the_new_export_even_over_quota(storage_app):
+    earlier = write(size=2000, age=100)
+    new = write(size=3500)
+    assert export_storage.admit(new, user_id=2) == 1
+    assert names() == {new}
+    assert earlier not in names()
+
+
+def test_removing_an_export_forgets_its_progress(storage_app, monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    monkeypatch.setattr(export_progress, "_client", fakeredis.FakeRedis())
+    name = write(age=25 * HOUR)
+    task_id = next(f.task_id for f in export_storage.files() if f.name == name)
+    with storage_app.app_context():
+        export_progress.finish(task_id, {"csv_file": f"exports/{name}", "rows": 1})
+        export_storage.compact()
+        assert export_progress.get(task_id) is None
+
+
+def test_cli_reports_and_compacts(storage_app):
+    write(size=1200)
+    write(age=25 * HOUR)
+    runner = storage_app.test_cli_runner()
+    status = runner.invoke(args=["exports", "status"])
+    assert status.exit_code == 0
+    assert "user 2" in status.output
+    compact = runner.invoke(args=["exports", "compact"])
+    assert compact.exit_code == 0
+    assert "'expired': 1" in compact.output
+
+
+def test_beat_task_compacts(storage_app):
+    from applications.tasks import compact_exports
+
+    write(age=25 * HOUR)
+    with storage_app.app_context():
+        assert compact_exports.run()["expired"] == 1
+    assert names() == set()
@@ -0,0 +1,120 @@
+# tests/test_exports.py
+import csv
+import gzip
+import json
+import pytest
+from applications import export_engine, tasks
+from applications.api import cache
+from applications.export_engine import EXPORT_COLUMNS, id_ranges, write_rows
+from applications.export_progress import export_progress
+from applications.export_reuse import REUSE_KEY
+from applications.export_storage import export_storage
+
+
+@pytest.fixture
+def sent_mail(monkeypatch):
+    """Export notifications, recorded instead of queued in the outbox."""
+    sent = []
+    monkeypatch.setattr(tasks, "queue_email", lambda receiver, subject, body, *args, **kwargs: sent.append(receiver))
+    return sent
+
+
+def export_path(result):
+    return export_storage.locate(result["csv_file"].split("/")[-1])
+
+
+def read_ids(path, compress=False):
+    opener = gzip.open if compress else open
+    with opener(path, "rt", newline="") as f:
+        rows = list(csv.reader(f))
+    return rows[0], [int(row[0]) for row in rows[1:]]
+
+
+def run_export(client, headers, **body):
+    response = client.post("/api/export", json=body, headers=headers)
+    assert response.status_code in (200, 202), response.get_json()
+    task_id = response.get_json()["task_id"]
+    status = client.get(f"/api/export/status/{task_id}", headers=headers).get_json()
+    assert status["state"] == "SUCCESS", status
+    return status["result"]
+
+
+def test_write_rows_streams_in_batches(app, reservations, monkeypatch, tmp_path):
+    reservations(25)
+    monkeypatch.setattr(export_engine, "BATCH_SIZE", 7)
+    reported = []
+    with app.app_context():
+        rows = write_rows(str(tmp_path / "out.csv"), progress=reported.append)
+    assert rows == 25
+    assert reported == [7, 14, 21, 25]
+    header, ids = read_ids(tmp_path / "out.csv")
+    assert header == EXPORT_COLUMNS
+    assert ids == list(range(1, 26))
+
+
+@pytest.mark.parametrize("chunks, count", [(8, 1), (8, 5), (3, 100), (8, 1001)])
+def test_id_ranges_cover_every_id_once(app, reservations, chunks, count):
+    reservations(count)
+    with app.app_context():
+        ranges = id_ranges(chunks)
+    assert len(ranges) <= chunks
+    covered = [i for low, high in ranges for i in range(low, high + 1)]
+    assert covered == list(range(1, count + 1))
+
+
+def test_admin_export_merges_chunks_in_id_order(app, client, login, eager_celery, reservations, sent_mail):
+    reservations(500, user_id=1)
+    reservations(300, user_id=2)
+    result = run_export(client, login(), scope="all", email="ops@example.com", gzip=True)
+    assert result["rows"] == 800
+    _, ids = read_ids(export_path(result), compress=True)
+    assert ids == list(range(1, 801))
+    assert not [f for f in export_storage.files() if f.part]
+    assert sent_mail == ["ops@example.com"]
+
+
+def test_user_export_applies_filters_and_formats(app, client, login, user_headers, eager_celery, reservations, sent_mail):
+    reservations(10, user_id=1)
+    reservations(40, user_id=2)
+    result = run_export(client, user_headers, date_from="2026-01-01T00:20:00", format="jsonl")
+    assert result["rows"] == 20
+    with open(export_path(result)) as f:
+        records = [json.loads(line) for line in f]
+    assert len(records) == 20
+    assert {record["user_id"] for record in records} == {2}
+    assert sent_mail == ["user@example.com"]
+
+
+def test_failed_admin_chunk_marks_the_export_failed(app, client, login, eager_celery, reservations, monkeypatch):
+    reservations(50)
+    admin = login()
+    write_rows = tasks.write_rows
+
+    def failing_chunks(*args, **kwargs):
+        if kwargs.get("header") is False:
+            raise OSError("disk full")
+        return write_rows(*args, **kwargs)
+    monkeypatch.setattr(tasks, "write_rows", failing_chunks)
+
+    failed = client.post("/api/export", json={"scope": "all"}, headers=admin).get_json()["task_id"]
+    status = client.get(f"/api/export/status/{failed}", headers=admin).get_json()
+    assert status["state"] == "FAILURE"
+    assert status["result"] == {"error": "export_failed"}
+
+    # The reuse key was released: an identical request starts a new export
+    monkeypatch.setattr(tasks, "write_rows", write_rows)
+    retry = client.post("/api/export", json={"scope": "all"}, headers=admin)
+    assert retry.status_code == 202
+    assert retry.get_json()["task_id"] != failed
+    assert not retry.get_json().get("reused")
+    assert client.get(f"/api/export/status/{retry.get_json()['task_id']}", headers=admin).get_json()["state"] == "SUCCESS"
+
+
+def test_chord_error_callback_publishes_failure(app, eager_celery):
+    with app.app_context():
+        export_progress.queued("job-1", 1)
+        cache.set(REUSE_KEY.format("key-1"), {"task_id": "job-1", "state": "pending"})
+        job = {"task_id": "job-1", "user_id": 1, "total": 10, "started": 0, "reuse_key": "key-1"}
+        tasks.export_chunks_failed.run(None, OSError("disk full"), None, job)
+        assert export_progress.get("job-1")["state"] == "FAILURE"
+        assert cache.get(REUSE_KEY.format("key-1")) is None
@@ -0,0 +1,131 @@
+# tests/test_fan_out.py
+from collections import Counter
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import delete, insert, select, update
+from applications.models import db, NotificationOutbox, ParkingLot, ParkingSpot, Reservation, Users
+from applications.outbox import outbox
+from applications.reports import month_aggregates
+from applications.tasks import send_daily_reminders, user_id_ranges
+
+SEPTEMBER = (datetime(2026, 9, 1), datetime(2026, 9, 30, 23, 59, 59))
+
+
+@pytest.fixture
+def fan_out_app(app, eager_celery, redis_client, monkeypatch):
+    """Eager Celery; queued notifications are delivered by a no-op email sender."""
+    monkeypatch.setattr(outbox.limiter, "_client", redis_client)
+    monkeypatch.setitem(outbox._senders, "email", lambda rows: [None] * len(rows))
+    with app.app_context():
+        yield app
+
+
+def add_users(prefix, count, **values):
+    """Insert `count` regular users named <prefix><n>; returns their ids in order."""
+    db.session.execute(insert(Users.__table__), [
+        dict({"name": f"{prefix}{n}", "email": f"{prefix}{n}@example.com", "password": "x", "is_admin": False},
+             **values)
+        for n in range(count)
+    ])
+    db.session.commit()
+    return db.session.scalars(select(Users.id).where(Users.name.startswith(prefix)).order_by(Users.id)).all()
+
+
+@pytest.mark.parametrize("chunk_size", [1, 4, 7, 50])
+def test_id_ranges_cover_every_user_once(fan_out_app, chunk_size):
+    ids = add_users("u", 23)
+    removed = ids[3:6] + ids[10:11]  # gaps in the ids must not give empty or overlapping chunks
+    db.session.execute(delete(Users).where(Users.id.in_(removed)))
+    db.session.commit()
+    remaining = [user_id for user_id in ids if user_id not in removed]
+
+    ranges = user_id_ranges(chunk_size=chunk_size)
+    chunks = [[user_id for user_id in remaining if lo <= user_id <= hi] for lo, hi in ranges]
+    assert [user_id for chunk in chunks for user_id in chunk] == remaining
+    assert all(0 < len(chunk) <= chunk_size for chunk in chunks)
+    assert all(hi < lo for (_, hi), (lo, _) in zip(ranges, ranges[1:]))
+
+
+def test_id_ranges_only_span_users_matching_the_criteria(fan_out_app):
+    active = add_users("active", 5, last_reservation_at=datetime.utcnow())
+    inactive = add_users("idle", 6)
+    ranges = user_id_ranges(chunk_size=4, criteria=(Users.last_reservation_at.is_(None),))
+    assert ranges == [[inactive[0], inactive[3]], [inactive[4], inactive[5]]]
+    assert not any(lo <= user_id <= hi for lo, hi in ranges for user_id in active)
+
+
+def test_reminders_go_to_users_without_a_booking_in_30_days(fan_out_app, client, user_headers, make_lot):
+    now = datetime.utcnow()
+    add_users("never", 2)
+    add_users("lapsed", 2, last_reservation_at=now - timedelta(days=31))
+    add_users("recent", 2, last_reservation_at=now - timedelta(days=29))
+    # A booking through the API records the activity too
+    response = client.post("/api/reservations", json={"lot_id": make_lot(1), "vehicle_no": "KA01"},
+                           headers=user_headers)
+    assert response.status_code == 201
+    # Old lots only: no new-lots broadcast, which would go to everyone
+    db.session.execute(update(ParkingLot).values(created_at=now - timedelta(days=2)))
+    db.session.commit()
+
+    report = send_daily_reminders.delay().result["report"]
+    reminded = sorted(db.session.scalars(select(NotificationOutbox.recipient)))
+    assert reminded == [f"{prefix}{n}@example.com" for prefix in ("lapsed", "never") for n in range(2)]
+    assert (report["sent"], report["failed_users"]) == (4, [])
+
+
+def per_user_summary(user_id, start, end):
+    """The monthly summary computed the slow way: one user's reservations through the ORM."""
+    mine = Reservation.query.filter(
+        Reservation.user_id == user_id, Reservation.parking_timestamp.between(start, end)
+    ).all()
+    if not mine:
+        return None
+    lots = Counter(r.spot.lot.prime_location_name for r in mine if r.spot)
+    return {
+        "total_bookings": len(mine),
+        "total_spent": round(sum(r.parking_cost or 0 for r in mine), 2),
+        "most_used_lot": lots.most_common(1)[0][0] if lots else "N/A",
+    }
+
+
+def test_month_aggregates_match_a_per_user_computation(fan_out_app, make_lot):
+    make_lot(3, name="North")
+    make_lot(3, name="South")
+    north, south = (
+        db.session.scalars(
+            select(ParkingSpot.id).join(ParkingLot).where(ParkingLot.prime_location_name == name)
+        ).all()
+        for name in ("North", "South")
+    )
+    users = add_users("u", 6)
+    start, end = SEPTEMBER
+
+    rows = []
+
+    def book(user_id, spot_id, parked, cost):
+        rows.append({
+            "user_id": user_id, "spot_id": spot_id, "vehicle_number": "KA01", "parking_timestamp": parked,
+            "leaving_timestamp": parked + timedelta(hours=1), "parking_cost": cost,
+        })
+
+    for k, user_id in enumerate(users[:-1]):  # the last user books nothing
+        favourite, other = (north, south) if k % 2 else (south, north)
+        day = start + timedelta(days=k, hours=8)
+        for n in range(k + 2):
+            book(user_id, favourite[n % 3], day + timedelta(hours=n), [4.5, None, 12.25][n % 3])
+        book(user_id, other[0], day, 20.0)
+        book(user_id, None, day, 3.0)  # its spot was removed since
+        # Outside the month: in the other lot, so a leaking filter would change the favourite
+        for n in range(k + 4):
+            book(user_id, other[1], start - timedelta(hours=n + 1), 99.0)
+            book(user_id, other[2], end + timedelta(hours=n + 1), 99.0)
+    db.session.execute(insert(Reservation.__table__), rows)
+    db.session.commit()
+
+    aggregates = month_aggregates([users[0], users[-1]], start, end)
+    expected = {user_id: per_user_summary(user_id, start, end) for user_id in users}
+    assert aggregates == {user_id: summary for user_id, summary in expected.items() if summary}
+    assert users[-1] not in aggregates
+    assert month_aggregates([users[0], users[-1]], start, end, user_ids=users[2:4]) == {
+        user_id: expected[user_id] for user_id in users[2:4]
+    }
@@ -0,0 +1,122 @@
+# tests/test_gate_events.py
+from itertools import count
+import pytest
+from applications.models import db, GateEvent, ParkingSpot, Reservation
+
+LATER = "2031-01-01T10:00:00+05:30"
+
+
+class Gate:
+    """Gate device simulator: builds events with fresh idempotency keys and posts them in batches."""
+
+    def __init__(self, client, headers):
+        self.client = client
+        self.headers = headers
+        self.keys = count(1)
+
+    def event(self, event_type, reservation_id, timestamp=None, key=None):
+        event = {"key": key or f"gate-1:{next(self.keys)}", "type": event_type, "reservation_id": reservation_id}
+        if timestamp:
+            event["timestamp"] = timestamp
+        return event
+
+    def check_in(self, reservation_id, **kwargs):
+        return self.event("check_in", reservation_id, **kwargs)
+
+    def check_out(self, reservation_id, timestamp=LATER, **kwargs):
+        return self.event("check_out", reservation_id, timestamp, **kwargs)
+
+    def send(self, *events):
+        response = self.client.post("/api/gate_events", json={"events": list(events)}, headers=self.headers)
+        assert response.status_code == 200, response.get_json()
+        return response.get_json()
+
+
+@pytest.fixture
+def gate(client, login):
+    return Gate(client, login())
+
+
+@pytest.fixture
+def book(client, user_headers):
+    def book(lot_id):
+        response = client.post("/api/reservations", json={"lot_id": lot_id, "vehicle_no": "KA01"}, headers=user_headers)
+        assert response.status_code == 201, response.get_json()
+        return response.get_json()["reservation"]
+    return book
+
+
+def statuses(reply):
+    return [result["status"] for result in reply["results"]]
+
+
+def test_a_replayed_batch_is_applied_once(app, gate, book, make_lot):
+    lot_id = make_lot(2)
+    first, second = book(lot_id), book(lot_id)
+    batch = [gate.check_in(first["id"]), gate.check_out(first["id"]), gate.check_in(second["id"])]
+
+    reply = gate.send(*batch)
+    assert statuses(reply) == ["applied"] * 3
+    cost = reply["results"][1]["parking_cost"]
+
+    replay = gate.send(*batch)
+    assert statuses(replay) == ["duplicate"] * 3
+    assert (replay["applied"], replay["duplicate"]) == (0, 3)
+    with app.app_context():
+        assert db.session.get(Reservation, first["id"]).parking_cost == cost
+        assert GateEvent.query.count() == 3
+
+
+def test_duplicates_within_a_batch_are_skipped(app, gate, book, make_lot):
+    reservation = book(make_lot(1))
+    check_out = gate.check_out(reservation["id"])
+    reply = gate.send(check_out, check_out, gate.check_in(reservation["id"], key=check_out["key"]))
+    assert statuses(reply) == ["applied", "duplicate", "duplicate"]
+    with app.app_context():
+        assert GateEvent.query.count() == 1
+
+
+def test_check_out_of_a_closed_reservation_is_rejected(client, user_headers, gate, book, make_lot):
+    released, still_open = book(make_lot(2)), book(make_lot(1, name="Other"))
+    response = client.patch(f"/api/reservations/{released['id']}", json={
+        "action": "released", "leaving_time": LATER,
+    }, headers=user_headers)
+    assert response.status_code == 200
+
+    reply = gate.send(
+        gate.check_out(released["id"]), gate.check_out(still_open["id"]), gate.check_out(still_open["id"]),
+    )
+    assert statuses(reply) == ["rejected", "applied", "rejected"]
+    assert reply["results"][0]["error"] == reply["results"][2]["error"] == "Reservation already checked out"
+    assert "parking_cost" not in reply["results"][2]
+
+
+def test_check_in_to_a_full_lot(app, client, user_headers, gate, book, make_lot):
+    lot_id = make_lot(1)
+    reservation = book(lot_id)
+    full = client.post("/api/reservations", json={"lot_id": lot_id, "vehicle_no": "KA02"}, headers=user_headers)
+    assert full.status_code == 400
+
+    # The reservation already holds the only spot: checking in keeps the lot full, nothing is double counted
+    assert statuses(gate.send(gate.check_in(reservation["id"]))) == ["applied"]
+    availability = client.get("/api/parking_lots/availability", headers=user_headers).get_json()["availability"]
+    assert availability == [{"lot_id": lot_id, "free": 0, "occupied": 1, "total": 1}]
+
+    assert statuses(gate.send(gate.check_out(reservation["id"]))) == ["applied"]
+    with app.app_context():
+        assert ParkingSpot.query.filter_by(lot_id=lot_id).one().status == "A"
+    assert client.post("/api/reservations", json={"lot_id": lot_id, "vehicle_no": "KA02"},
+                       headers=user_headers).status_code == 201
+
+
+def test_invalid_events_are_rejected_individually(gate, book, make_lot):
+    reservation = book(make_lot(1))
+    reply = gate.send(
+        {"key": "", "type": "check_in", "reservation_id": reservation["id"]},
+        {"key": "k", "type": "wave", "reservation_id": reservation["id"]},
+        gate.check_in(999),
+        gate.check_out(reservation["id"], timestamp="2000-01-01T00:00:00+05:30"),
+        gate.check_in(reservation["id"]),
+    )
+    assert statuses(reply) == ["rejected"] * 4 + ["applied"]
+    assert reply["results"][2]["error"] == "Reservation not found"
@@ -0,0 +1,107 @@
+# tests/test_http_clients.py
+import json
+import threading
+from collections import namedtuple
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from applications.http_clients import http_clients
+from applications.tasks import chat_digests, send_outbox_gchat
+
+Row = namedtuple("Row", ["id", "recipient", "subject", "body"])
+
+
+@pytest.fixture
+def webhook():
+    """A local keep-alive HTTP server recording each connection and posted text; posts numbered in "fail" get a 500."""
+    seen = {"connections": 0, "posts": [], "fail": set()}
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def setup(self):
+            seen["connections"] += 1
+            super().setup()
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            seen["posts"].append((self.path, body["text"]))
+            self.send_response(500 if len(seen["posts"]) in seen["fail"] else 200)
+            self.send_header("Content-Length", "2")
+            self.end_headers()
+            self.wfile.write(b"{}")
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    seen["url"] = f"http://127.0.0.1:{server.server_address[1]}"
+    yield seen
+    server.shutdown()
+    server.server_close()
+    http_clients.close()
+
+
+def test_posts_reuse_one_keep_alive_connection(app, webhook):
+    for i in range(20):
+        http_clients.post_json(webhook["url"] + "/hook", {"text": f"m{i}"})
+    assert len(webhook["posts"]) == 20
+    assert webhook["connections"] == 1
+    assert http_clients.session() is http_clients.session()
+
+
+def test_clients_are_rebuilt_after_a_fork(app, monkeypatch):
+    session = http_clients.session()
+    monkeypatch.setattr(http_clients, "_pid", -1)
+    assert http_clients.session() is not session
+
+
+def test_twilio_client_cached_per_account(app, monkeypatch):
+    class FakeClient:
+        def __init__(self, sid, token):
+            self.sid = sid
+
+    monkeypatch.setattr(http_clients, "_twilio_class", FakeClient)
+    first = http_clients.twilio("AC1", "secret")
+    assert http_clients.twilio("AC1", "secret") is first
+    assert http_clients.twilio("AC2", "secret") is not first
+
+
+def test_chat_digests_split_at_max_chars():
+    rows = [Row(i, "hook", f"Alert {i}", f"<p>Spot freed in lot {i}</p>") for i in range(40)]
+    parts = chat_digests(rows, max_chars=300)
+    assert len(parts) > 1
+    assert all(len(text.split("\n\n", 1)[1]) <= 300 for text, _ in parts)
+    assert sum(int(text.split(" ", 1)[0]) for text, _ in parts) == 40
+    assert [row for _, part in parts for row in part] == rows
+    assert chat_digests(rows[:1], max_chars=300) == [("Alert 0\n\nSpot freed in lot 0", rows[:1])]
+
+
+def test_digest_mode_posts_once_per_webhook(app, webhook):
+    app.config["GCHAT_DIGEST_WINDOW"] = 60
+    rows = [Row(i, f"{webhook['url']}/hook{i % 2}", f"Alert {i}", f"<p>lot {i}</p>") for i in range(10)]
+    with app.app_context():
+        assert send_outbox_gchat(rows) == [None] * 10
+    assert sorted(path for path, _ in webhook["posts"]) == ["/hook0", "/hook1"]
+    assert all(text.startswith("5 notifications") for _, text in webhook["posts"])
+
+
+def test_failed_digest_part_retries_only_the_unposted_rows(app, webhook):
+    app.config.update(GCHAT_DIGEST_WINDOW=60, GCHAT_DIGEST_MAX_CHARS=300)
+    rows = [Row(i, f"{webhook['url']}/hook", f"Alert {i}", f"<p>Spot freed in lot {i}</p>") for i in range(40)]
+    webhook["fail"] = {2}
+    with app.app_context():
+        parts = chat_digests(rows, 300)
+        errors = send_outbox_gchat(rows)
+    assert len(parts) > 2
+    assert len(webhook["posts"]) == 2  # stops at the failed part
+    posted = len(parts[0][1])
+    assert errors[:posted] == [None] * posted
+    assert all(errors[posted:])
+
+
+def test_digest_mode_off_posts_each_alert(app, webhook):
+    rows = [Row(i, f"{webhook['url']}/hook", f"Alert {i}", f"<p>lot {i}</p>") for i in range(3)]
+    with app.app_context():
+        assert send_outbox_gchat(rows) == [None] * 3
+    assert [text for _, text in webhook["posts"]] == [f"Alert {i}\n\nlot {i}" for i in range(3)]
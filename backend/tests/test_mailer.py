@@ -0,0 +1,72 @@
+# tests/test_mailer.py
+import socket
+import pytest
+from applications.mailer import build_message, mailer
+
+controller_module = pytest.importorskip("aiosmtpd.controller")
+
+
+class Recorder:
+    """aiosmtpd handler keeping every delivered message with the session (= connection) it came on."""
+
+    def __init__(self):
+        self.deliveries = []
+
+    async def handle_DATA(self, server, session, envelope):
+        self.deliveries.append((id(session), envelope.rcpt_tos[0]))
+        return "250 OK"
+
+    @property
+    def connections(self):
+        return len({session for session, _ in self.deliveries})
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture
+def smtp(app):
+    recorder = Recorder()
+    controller = controller_module.Controller(recorder, hostname="127.0.0.1", port=free_port())
+    controller.start()
+    app.config.update(SMTP_HOST="127.0.0.1", SMTP_PORT=controller.port, SMTP_CONCURRENCY=2)
+    with app.app_context():
+        yield recorder
+        mailer.close()
+    controller.stop()
+
+
+def messages(count):
+    return [build_message("noreply@parkingapp.com", f"user{i}@example.com", "Hi", "<p>Hi</p>") for i in range(count)]
+
+
+def test_send_many_reuses_a_bounded_pool(smtp):
+    assert mailer.send_many(messages(30)) == [True] * 30
+    assert sorted(rcpt for _, rcpt in smtp.deliveries) == sorted(f"user{i}@example.com" for i in range(30))
+    assert smtp.connections <= 2
+
+
+def test_connections_are_recycled(app, smtp):
+    app.config.update(SMTP_CONCURRENCY=1, SMTP_MAX_MESSAGES_PER_CONNECTION=5)
+    assert mailer.send_many(messages(12)) == [True] * 12
+    assert smtp.connections == 3
+
+
+def test_stale_connection_is_retried_on_a_new_one(smtp):
+    assert mailer.send(messages(1)[0])
+    server = mailer._idle.get_nowait()
+    server.close()  # as if the server had dropped the idle connection
+    mailer._idle.put(server)
+
+    assert mailer.send(messages(1)[0])
+    assert len(smtp.deliveries) == 2
+    assert smtp.connections == 2
+
+
+def test_unreachable_server_fails_the_message(app):
+    app.config.update(SMTP_HOST="127.0.0.1", SMTP_PORT=free_port(), SMTP_TIMEOUT=1)
+    with app.app_context():
+        assert mailer.send_many(messages(2)) == [False, False]
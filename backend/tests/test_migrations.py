@@ -0,0 +1,38 @@
+# tests/test_migrations.py
+from sqlalchemy import text
+from applications.migrations import MIGRATIONS, upgrade
+from applications.models import db
+from applications.query_plans import check_plans
+
+
+def recorded_versions():
+    return [row[0] for row in db.session.execute(text("SELECT version FROM schema_migrations ORDER BY version"))]
+
+
+def test_hot_queries_use_indexes(app):
+    with app.app_context():
+        assert check_plans(echo=lambda line: None) == []
+
+
+def test_migrations_add_the_indexes_to_an_old_database(app):
+    with app.app_context():
+        # A database created before the migrations: no secondary indexes, nothing recorded
+        with db.engine.begin() as conn:
+            names = [row[0] for row in conn.execute(text(
+                "SELECT name FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL"
+            ))]
+            for name in names:
+                conn.execute(text(f"DROP INDEX {name}"))
+            conn.execute(text("DELETE FROM schema_migrations"))
+        assert check_plans(echo=lambda line: None) != []
+        db.session.rollback()  # end the read snapshot taken before the upgrade
+
+        assert upgrade() == [version for version, _ in MIGRATIONS]
+        assert check_plans(echo=lambda line: None) == []
+
+
+def test_every_version_is_recorded_and_rerunning_is_a_no_op(app):
+    with app.app_context():
+        assert recorded_versions() == sorted(version for version, _ in MIGRATIONS)
+        assert upgrade() == []
+        assert recorded_versions() == sorted(version for version, _ in MIGRATIONS)
@@ -0,0 +1,73 @@
+# tests/test_occupancy.py
+import pytest
+import redis
+from applications.occupancy import occupancy, BITS_KEY, FREE_KEY, OCCUPIED_KEY
+
+pytest.importorskip("fakeredis")
+
+
+class RedisDown:
+    """Stands in for a Redis client whose server is unreachable."""
+
+    def __getattr__(self, name):
+        def fail(*args, **kwargs):
+            raise redis.ConnectionError("Redis is down")
+        return fail
+
+
+def availability(client, headers):
+    response = client.get("/api/parking_lots/availability", headers=headers)
+    assert response.status_code == 200
+    return response.get_json()["availability"]
+
+
+def test_index_follows_bookings_and_releases(app, client, user_headers, make_lot):
+    first, second = make_lot(3), make_lot(2)
+    booked = client.post("/api/reservations", json={"lot_id": first, "vehicle_no": "KA01"}, headers=user_headers)
+    reservation = booked.get_json()["reservation"]
+    client.post("/api/reservations", json={"lot_id": second, "vehicle_no": "KA02"}, headers=user_headers)
+
+    assert availability(client, user_headers) == [
+        {"lot_id": first, "free": 2, "occupied": 1, "total": 3},
+        {"lot_id": second, "free": 1, "occupied": 1, "total": 2},
+    ]
+    assert occupancy.is_occupied(reservation["spot_id"])
+
+    released = client.patch(f"/api/reservations/{reservation['id']}", json={
+        "action": "released", "leaving_time": "2030-01-01T10:00:00+05:30",
+    }, headers=user_headers)
+    assert released.status_code == 200
+    assert not occupancy.is_occupied(reservation["spot_id"])
+    with app.app_context():
+        assert availability(client, user_headers) == occupancy.availability_from_db()
+
+
+def test_one_global_bitmap_sized_by_spot_id(app, client, user_headers, make_lot):
+    lots = [make_lot(100, name=f"L{i}") for i in range(10)]
+    for lot_id in lots:
+        client.post("/api/reservations", json={"lot_id": lot_id, "vehicle_no": "KA01"}, headers=user_headers)
+
+    keys = {key.decode() for key in occupancy.client.keys("occupancy:*")}
+    assert keys == {BITS_KEY, FREE_KEY, OCCUPIED_KEY}
+    # 1000 spots -> about 125 bytes, not one 125-byte bitmap per lot
+    assert occupancy.client.strlen(BITS_KEY) <= 1000 // 8 + 1
+    assert occupancy.client.bitcount(BITS_KEY) == len(lots)
+
+
+def test_availability_falls_back_to_sql_when_redis_is_down(app, client, user_headers, make_lot, monkeypatch):
+    lot_id = make_lot(3)
+    client.post("/api/reservations", json={"lot_id": lot_id, "vehicle_no": "KA01"}, headers=user_headers)
+    expected = availability(client, user_headers)
+
+    redis_client = occupancy.client
+    monkeypatch.setattr(occupancy, "_client", RedisDown())
+    assert availability(client, user_headers) == expected
+    # Bookings keep working; the index misses them while Redis is down...
+    booked = client.post("/api/reservations", json={"lot_id": lot_id, "vehicle_no": "KA02"}, headers=user_headers)
+    assert booked.status_code == 201
+    assert availability(client, user_headers) == [{"lot_id": lot_id, "free": 1, "occupied": 2, "total": 3}]
+
+    # ...and is rebuilt from the database on the first read once it is back
+    monkeypatch.setattr(occupancy, "_client", redis_client)
+    assert availability(client, user_headers) == [{"lot_id": lot_id, "free": 1, "occupied": 2, "total": 3}]
+    assert occupancy.is_occupied(booked.get_json()["reservation"]["spot_id"])
@@ -0,0 +1,218 @@
+from datetime import datetime, timedelta
+import pytest
+import redis
+from sqlalchemy import insert, select, update
+from applications.models import db, NotificationOutbox, Users
+from applications.outbox import BUCKET_KEY, TokenBucket, outbox
+
+SETTINGS = {"retry_base": 30, "retry_max": 3600, "max_attempts": 3}
+
+
+class Sender:
+    """Fake outbox sender: records each call's row ids and fails rows sent to `failing` recipients."""
+
+    def __init__(self, failing=()):
+        self.calls = []
+        self.failing = set(failing)
+
+    def __call__(self, rows):
+        self.calls.append([row.id for row in rows])
+        return ["provider error" if row.recipient in self.failing else None for row in rows]
+
+
+class RedisDown:
+    def transaction(self, *args, **kwargs):
+        raise redis.ConnectionError("down")
+
+
+@pytest.fixture
+def outbox_app(app, redis_client, monkeypatch):
+    app.config.update(
+        OUTBOX_RATE_LIMITS={"email": (1000, 1000), "gchat": (1000, 1000), "sms": (1000, 1000)},
+        OUTBOX_MAX_ATTEMPTS=3, GOOGLE_CHAT_WEBHOOK=None, GCHAT_DIGEST_WINDOW=0,
+    )
+    monkeypatch.setattr(outbox.limiter, "_client", redis_client)
+    with app.app_context():
+        yield app
+
+
+@pytest.fixture
+def sender(monkeypatch):
+    """sender(channel, failing=()) replaces a channel's sender with a recording fake."""
+    def install(channel="email", failing=(), group_key=None):
+        fake = Sender(failing)
+        monkeypatch.setitem(outbox._senders, channel, fake)
+        monkeypatch.setitem(outbox._group_keys, channel, group_key)
+        return fake
+    return install
+
+
+def rows(**filters):
+    return db.session.execute(
+        select(NotificationOutbox).filter_by(**filters).order_by(NotificationOutbox.id)
+    ).scalars().all()
+
+
+def make_due(*ids):
+    """Skip the backoff wait of retried messages."""
+    db.session.execute(
+        update(NotificationOutbox).where(NotificationOutbox.id.in_(ids))
+        .values(next_attempt_at=datetime.utcnow() - timedelta(seconds=1))
+    )
+    db.session.commit()
+
+
+def test_a_dedupe_key_is_queued_once(outbox_app):
+    outbox.add("email", "a@example.com", "hi", dedupe_key="reminder:1")
+    outbox.add("email", "a@example.com", "hi again", dedupe_key="reminder:1")
+    with outbox.batch():
+        outbox.add("email", "a@example.com", "in batch", dedupe_key="reminder:1")
+        outbox.add("email", "b@example.com", "new", dedupe_key="reminder:2")
+        outbox.add("email", "b@example.com", "new twice", dedupe_key="reminder:2")
+        outbox.add("email", "c@example.com", "no key")
+        outbox.add("email", "c@example.com", "no key")
+
+    assert [row.body for row in rows()] == ["hi", "new", "no key", "no key"]
+
+
+def test_a_batch_is_written_on_exit_and_dropped_on_error(outbox_app):
+    with outbox.batch():
+        outbox.add("email", "a@example.com", "one")
+        with outbox.batch():  # nested blocks join the outer batch
+            outbox.add("email", "a@example.com", "two")
+        assert rows() == []
+    assert len(rows()) == 2
+
+    with pytest.raises(RuntimeError):
+        with outbox.batch():
+            outbox.add("email", "a@example.com", "three")
+            raise RuntimeError
+    assert len(rows()) == 2
+
+
+def test_claim_takes_due_messages_once(outbox_app):
+    outbox.add("email", "a@example.com", "now")
+    outbox.add("email", "b@example.com", "later", delay=60)
+    outbox.add("sms", "+10000000000", "other channel")
+
+    claimed = outbox.claim("email", 10)
+    assert [row.body for row in claimed] == ["now"]
+    assert outbox.claim("email", 10) == []
+    assert rows(body="now")[0].status == "sending"
+
+
+def test_stale_claims_are_released(outbox_app):
+    outbox.add("email", "a@example.com", "hi")
+    outbox.claim("email", 10)
+    assert outbox.release_stale_claims(claim_timeout=300) == 0
+
+    db.session.execute(update(NotificationOutbox).values(claimed_at=datetime.utcnow() - timedelta(seconds=301)))
+    db.session.commit()
+    assert outbox.release_stale_claims(claim_timeout=300) == 1
+    assert rows()[0].status == "pending" and rows()[0].claimed_by is None
+    assert len(outbox.claim("email", 10)) == 1
+
+
+@pytest.mark.parametrize("attempts, base", [(1, 30), (2, 60), (3, 120), (7, 1920), (8, 3600), (20, 3600)])
+def test_backoff_doubles_with_jitter_up_to_the_cap(attempts, base):
+    delays = [outbox.backoff(attempts, SETTINGS) for _ in range(50)]
+    assert all(base * 0.8 <= delay <= base * 1.2 for delay in delays)
+
+
+def test_failures_are_retried_then_dead_lettered(outbox_app, sender):
+    fake = sender(failing={"down@example.com"})
+    outbox.add("email", "down@example.com", "hi", subject="Reminder")
+    outbox.add("email", "up@example.com", "hi")
+
+    assert outbox.drain(("email",), max_seconds=5) == {"sent": 1, "retried": 1, "failed": 0}
+    failing = rows(recipient="down@example.com")[0]
+    assert (failing.status, failing.attempts, failing.last_error) == ("pending", 1, "provider error")
+    assert 24 <= (failing.next_attempt_at - datetime.utcnow()).total_seconds() <= 36
+    assert outbox.drain(("email",), max_seconds=5)["retried"] == 0  # not due yet
+
+    make_due(failing.id)
+    assert outbox.drain(("email",), max_seconds=5) == {"sent": 0, "retried": 1, "failed": 0}
+    make_due(failing.id)
+    assert outbox.drain(("email",), max_seconds=5) == {"sent": 0, "retried": 0, "failed": 1}
+
+    failing = rows(recipient="down@example.com")[0]
+    assert (failing.status, failing.attempts) == ("failed", 3)
+    assert sum(failing.id in call for call in fake.calls) == 3
+    assert rows(channel="gchat") == []  # no global webhook configured: no fallback copy
+
+
+def test_dead_letters_are_copied_to_the_global_webhook(outbox_app, sender):
+    outbox_app.config["GOOGLE_CHAT_WEBHOOK"] = "https://chat.example.com/hook"
+    outbox_app.config["OUTBOX_MAX_ATTEMPTS"] = 1
+    sender(failing={"down@example.com"})
+    chat = sender("gchat")
+    outbox.add("email", "down@example.com", "body", subject="Reminder", user_id=7)
+
+    assert outbox.drain(("email",), max_seconds=5)["failed"] == 1
+    copy, = rows(channel="gchat")
+    assert (copy.recipient, copy.subject, copy.body, copy.user_id) == (
+        "https://chat.example.com/hook", "Reminder", "body", 7,
+    )
+    assert copy.dedupe_key == f"fallback:{rows(channel='email')[0].id}"
+
+    assert outbox.drain(("gchat",), max_seconds=5)["sent"] == 1
+    assert chat.calls == [[copy.id]]
+
+
+def test_the_token_bucket_is_shared_between_workers(redis_client):
+    first, second = TokenBucket(redis_client), TokenBucket(redis_client)
+    assert first.take("email", 3, rate=1, burst=5) == (3, 0.0)
+    assert second.take("email", 5, rate=1, burst=5) == (2, 0.0)
+    assert first.take("email", 1, rate=4, burst=5) == (0, 0.25)
+
+    key = BUCKET_KEY.format("email")
+    redis_client.hset(key, "stamp", float(redis_client.hget(key, "stamp")) - 2)
+    assert second.take("email", 10, rate=1, burst=5)[0] == 2  # refilled at 1 token/second
+    assert redis_client.ttl(key) > 0
+
+
+def test_the_token_bucket_falls_back_to_a_local_bucket(outbox_app):
+    bucket = TokenBucket(RedisDown())
+    assert bucket.take("sms", 10, rate=1, burst=4) == (4, 0.0)
+    assert bucket.take("sms", 1, rate=1, burst=4) == (0, 1.0)
+
+
+def test_drain_hands_back_what_the_rate_limit_leaves_unsent(outbox_app, sender):
+    outbox_app.config["OUTBOX_RATE_LIMITS"] = {"email": (0.1, 3)}
+    fake = sender()
+    for n in range(5):
+        outbox.add("email", f"u{n}@example.com", "hi")
+
+    assert outbox.drain(("email",), max_seconds=0.5) == {"sent": 3, "retried": 0, "failed": 0}
+    assert sum(map(len, fake.calls)) == 3
+    left = rows(status="pending")
+    assert len(left) == 2
+    assert all(row.attempts == 0 and row.claimed_by is None for row in left)  # not counted as an attempt
+
+
+def test_grouped_messages_cost_one_token(outbox_app, sender):
+    outbox_app.config["OUTBOX_RATE_LIMITS"] = {"gchat": (0.1, 2)}
+    fake = sender("gchat", group_key=lambda row: row.recipient)
+    for hook in ("a", "a", "a", "b", "b", "c"):
+        outbox.add("gchat", f"https://chat.example.com/{hook}", "hi")
+
+    assert outbox.drain(("gchat",), max_seconds=0.5)["sent"] == 5  # "a" and "b" posted, "c" waits
+    assert [len(call) for call in fake.calls] == [5]
+    assert [row.recipient for row in rows(status="pending")] == ["https://chat.example.com/c"]
+
+
+def test_users_without_a_channel_are_skipped(outbox_app, eager_celery, sender):
+    from applications.tasks import send_daily_reminders
+
+    fake = sender()
+    db.session.execute(insert(Users.__table__), [
+        {"name": "reachable", "email": "reachable@example.com", "password": "x", "is_admin": False},
+        {"name": "unreachable", "email": "", "password": "x", "is_admin": False},
+    ])
+    db.session.commit()
+
+    report = send_daily_reminders.delay().result["report"]
+    assert (report["sent"], report["skipped"], report["failed_users"]) == (1, 1, [])
+    assert report["retried_chunks"] == 0
+    assert [row.recipient for row in rows()] == ["reachable@example.com"]
+    assert sum(map(len, fake.calls)) == 1
@@ -0,0 +1,59 @@
+# tests/test_passwords.py
+import threading
+import pytest
+from werkzeug.security import generate_password_hash
+from applications.models import db, Users
+from applications.passwords import hasher
+
+ADMIN = {"email": "admin@gmail.com", "password": "admin"}
+
+
+@pytest.fixture
+def pooled_hasher(app):
+    """The hasher on a real one-worker process pool (shut down afterwards)."""
+    hasher.workers = 1
+    yield hasher
+    if hasher._pool is not None:
+        hasher._pool.shutdown(cancel_futures=True)
+        hasher._pool = None
+
+
+def test_login_upgrades_outdated_hashes(app, client):
+    with app.app_context():
+        db.session.add(Users(name="old", email="old@example.com", is_admin=False,
+                             password=generate_password_hash("Passw0rd!", "pbkdf2:sha256:1000")))
+        db.session.commit()
+
+    assert client.post("/api/login", json={"email": "old@example.com", "password": "Passw0rd!"}).status_code == 200
+    with app.app_context():
+        stored = Users.query.filter_by(email="old@example.com").one().password
+        assert stored.startswith(app.config["PASSWORD_HASH_METHOD"] + "$")
+    assert client.post("/api/login", json={"email": "old@example.com", "password": "wrong"}).status_code == 401
+
+
+def test_pool_hashes_and_verifies(client, pooled_hasher):
+    assert client.post("/api/login", json=ADMIN).status_code == 200
+    assert client.post("/api/signup", json={
+        "name": "n", "email": "n@example.com", "password": "Passw0rd!",
+    }).status_code == 201
+
+
+def test_full_queue_answers_503(client, pooled_hasher):
+    pooled_hasher._slots = threading.BoundedSemaphore(1)
+    pooled_hasher._slots.acquire()
+    response = client.post("/api/login", json=ADMIN)
+    assert response.status_code == 503
+    assert response.headers["Retry-After"]
+    pooled_hasher._slots.release()
+    assert client.post("/api/login", json=ADMIN).status_code == 200
+
+
+def test_slow_hash_answers_503(client, pooled_hasher):
+    pooled_hasher.timeout = 0.001
+    response = client.post("/api/login", json=ADMIN)
+    assert response.status_code == 503
+    signup = client.post("/api/signup", json={"name": "n", "email": "n@example.com", "password": "Passw0rd!"})
+    assert signup.status_code == 503
+    # The slot of a timed-out hash is given back
+    pooled_hasher.timeout = 30
+    assert client.post("/api/login", json=ADMIN).status_code == 200
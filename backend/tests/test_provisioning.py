@@ -0,0 +1,159 @@
+# tests/test_provisioning.py
+import json
+import pytest
+from sqlalchemy import select, update
+from applications import provisioning
+from applications.models import db, ParkingLot, ParkingSpot, Reservation
+
+
+def lot_json(client, headers, lot_id):
+    response = client.get(f"/api/parking_lots/{lot_id}", headers=headers)
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def resize(client, headers, lot_id, spots):
+    return client.put(f"/api/parking_lots/{lot_id}", json={"number_of_spots": spots}, headers=headers)
+
+
+def import_lots(client, headers, body, content_type="application/json", query=""):
+    return client.post("/api/parking_lots/import" + query, data=body, content_type=content_type, headers=headers)
+
+
+def lot_rows(count, spots=3, **overrides):
+    return [dict({
+        "prime_location_name": f"Imported {n}", "price": 12.5, "address": f"{n} Main St",
+        "pin_code": "560001", "number_of_spots": spots,
+    }, **overrides) for n in range(count)]
+
+
+def test_resizing_adds_and_removes_free_spots(client, login, user_headers, make_lot):
+    admin = login()
+    lot_id = make_lot(3)
+    lot_json(client, admin, lot_id)  # cached now; the resizes must invalidate it
+
+    assert resize(client, admin, lot_id, 50).status_code == 200
+    assert len(lot_json(client, admin, lot_id)["spots"]) == 50
+    assert len(client.get("/api/parking_lots", headers=admin).get_json()["parking_lots"][0]["spots"]) == 50
+
+    booked = client.post("/api/reservations", json={"lot_id": lot_id, "vehicle_no": "KA01"}, headers=user_headers)
+    taken = booked.get_json()["reservation"]["spot_id"]
+    assert resize(client, admin, lot_id, 1).status_code == 200
+    spots = lot_json(client, admin, lot_id)["spots"]
+    assert [spot["id"] for spot in spots] == [taken]  # only free spots are removed
+    availability = client.get("/api/parking_lots/availability", headers=admin).get_json()["availability"]
+    assert availability == [{"lot_id": lot_id, "free": 0, "occupied": 1, "total": 1}]
+
+
+def test_shrinking_below_the_occupied_spots_is_refused(client, login, user_headers, make_lot):
+    admin = login()
+    lot_id = make_lot(2)
+    client.post("/api/reservations", json={"lot_id": lot_id, "vehicle_no": "KA01"}, headers=user_headers)
+    client.post("/api/reservations", json={"lot_id": lot_id, "vehicle_no": "KA02"}, headers=user_headers)
+
+    response = resize(client, admin, lot_id, 1)
+    assert response.status_code == 400
+    assert "Only 0 free spots available" in response.get_json()["message"]
+    assert lot_json(client, admin, lot_id)["number_of_spots"] == 2
+
+
+def test_removal_rechecks_the_status_of_the_selected_spots(app, client, login, make_lot, monkeypatch):
+    admin = login()
+    lot_id = make_lot(3)
+    detach = provisioning._detach_reservations
+
+    def claimed_meanwhile(spot_filter):
+        # A booking takes one of the selected spots between the SELECT and the DELETE
+        spot_id = db.session.scalars(select(ParkingSpot.id).where(spot_filter)).first()
+        db.session.execute(update(ParkingSpot).where(ParkingSpot.id == spot_id).values(status="O"))
+        return detach(spot_filter)
+
+    monkeypatch.setattr(provisioning, "_detach_reservations", claimed_meanwhile)
+    response = resize(client, admin, lot_id, 1)
+    assert response.status_code == 400
+    with app.app_context():
+        assert ParkingSpot.query.filter_by(lot_id=lot_id).count() == 3
+        assert ParkingSpot.query.filter_by(lot_id=lot_id, status="O").count() == 0  # rolled back too
+        assert db.session.get(ParkingLot, lot_id).number_of_spots == 3
+
+
+def test_removed_spots_detach_past_reservations(app, client, login, user_headers, make_lot):
+    admin = login()
+    lot_id = make_lot(2, name="North")
+    booked = []
+    for vehicle in ("KA01", "KA02"):  # both spots used once, then free again
+        response = client.post("/api/reservations", json={"lot_id": lot_id, "vehicle_no": vehicle},
+                               headers=user_headers)
+        booked.append(response.get_json()["reservation"])
+    for reservation in booked:
+        client.patch(f"/api/reservations/{reservation['id']}", json={
+            "action": "released", "leaving_time": "2031-01-01T10:00:00+05:30",
+        }, headers=user_headers)
+    assert client.get("/api/user/summary", headers=user_headers).get_json()["lot_usage"] == {"North": 2}
+
+    assert resize(client, admin, lot_id, 1).status_code == 200
+    with app.app_context():
+        spot_ids = [db.session.get(Reservation, reservation["id"]).spot_id for reservation in booked]
+    assert sorted(spot_ids, key=lambda spot_id: spot_id is None) == [min(r["spot_id"] for r in booked), None]
+    # The user's cached summary was invalidated along with the detach
+    assert client.get("/api/user/summary", headers=user_headers).get_json()["lot_usage"] == {"North": 1}
+
+
+def test_import_creates_lots_and_spots(app, client, login):
+    admin = login()
+    assert client.get("/api/parking_lots", headers=admin).get_json()["parking_lots"] == []
+
+    response = import_lots(client, admin, json.dumps({"lots": lot_rows(3, spots=4)}))
+    assert response.status_code == 201, response.get_json()
+    report = response.get_json()
+    assert (report["lots_created"], report["spots_created"]) == (3, 12)
+
+    lots = client.get("/api/parking_lots", headers=admin).get_json()["parking_lots"]
+    assert [len(lot["spots"]) for lot in lots] == [4, 4, 4]
+    availability = client.get("/api/parking_lots/availability", headers=admin).get_json()["availability"]
+    assert [(lot["lot_id"], lot["free"]) for lot in availability] == [(lot_id, 4) for lot_id in report["lot_ids"]]
+
+
+def test_import_accepts_csv_and_dry_runs(app, client, login):
+    admin = login()
+    csv_body = "prime_location_name,price,address,pin_code,number_of_spots\nCSV Lot,10,1 Main St,560001,2\n"
+    dry = import_lots(client, admin, csv_body, "text/csv", "?dry_run=true")
+    assert dry.status_code == 200 and dry.get_json()["lots_created"] == 0
+    with app.app_context():
+        assert ParkingLot.query.count() == 0
+
+    assert import_lots(client, admin, csv_body, "text/csv").status_code == 201
+    with app.app_context():
+        assert ParkingSpot.query.count() == 2
+
+
+@pytest.mark.parametrize("price", ["inf", "-inf", "nan", "NaN", "0", "-3", "cheap"])
+def test_import_rejects_non_finite_and_non_positive_prices(app, client, login, price):
+    admin = login()
+    rows = lot_rows(2)
+    rows[1]["price"] = price
+    response = import_lots(client, admin, json.dumps(rows))
+    assert response.status_code == 400
+    errors = response.get_json()["errors"]
+    assert [error["row"] for error in errors] == [2]
+    assert errors[0]["errors"][0].startswith("price must be")
+    with app.app_context():
+        assert ParkingLot.query.count() == 0  # one bad row rejects the whole import
+
+
+def test_import_caps_lots_and_spots(app, client, login, monkeypatch):
+    admin = login()
+    monkeypatch.setattr(provisioning, "MAX_IMPORT_LOTS", 3)
+    monkeypatch.setattr(provisioning, "MAX_IMPORT_SPOTS", 10)
+
+    too_many = import_lots(client, admin, json.dumps(lot_rows(4)))
+    assert too_many.status_code == 400
+    assert too_many.get_json()["errors"] == [{"row": None, "errors": ["At most 3 lots per import"]}]
+
+    too_big = import_lots(client, admin, json.dumps(lot_rows(3, spots=4)))
+    assert too_big.status_code == 400
+    assert too_big.get_json()["errors"] == [{"row": None, "errors": ["At most 10 spots per import"]}]
+
+    assert import_lots(client, admin, json.dumps(lot_rows(2, spots=5))).status_code == 201
+    with app.app_context():
+        assert ParkingSpot.query.count() == 10
@@ -0,0 +1,151 @@
+# tests/test_reservations.py
+import threading
+import time
+from collections import Counter, namedtuple
+from applications import reservation_api
+from applications.models import db, ParkingSpot, Reservation
+from applications.reservation_api import CLAIM_ROUNDS, claim_spot, free_spot_candidates
+
+
+def book(client, headers, lot_id, vehicle="KA01AB1234"):
+    return client.post("/api/reservations", json={"lot_id": lot_id, "vehicle_no": vehicle}, headers=headers)
+
+
+def test_booking_claims_a_free_spot(client, user_headers, make_lot):
+    lot_id = make_lot(2)
+    first = book(client, user_headers, lot_id)
+    second = book(client, user_headers, lot_id)
+    assert first.status_code == second.status_code == 201
+    assert first.get_json()["reservation"]["spot_id"] != second.get_json()["reservation"]["spot_id"]
+
+    full = book(client, user_headers, lot_id)
+    assert full.status_code == 400
+    assert full.get_json()["error"] == "No available spots in this lot"
+
+
+def test_claim_spot_on_a_full_lot(app, client, user_headers, make_lot):
+    lot_id = make_lot(1)
+    assert book(client, user_headers, lot_id).status_code == 201
+    with app.app_context():
+        assert claim_spot(lot_id) is None
+        db.session.rollback()
+
+
+def test_concurrent_bookings_never_share_a_spot(app, client, user_headers, make_lot):
+    spots, threads, attempts = 12, 8, 6
+    lot_id = make_lot(spots)
+    statuses, spot_ids = [], []
+    lock = threading.Lock()
+    start = threading.Barrier(threads)
+
+    def worker(n):
+        start.wait()
+        for i in range(attempts):
+            response = book(client, user_headers, lot_id, vehicle=f"KA{n:02d}{i:04d}")
+            with lock:
+                statuses.append(response.status_code)
+                if response.status_code == 201:
+                    spot_ids.append(response.get_json()["reservation"]["spot_id"])
+
+    pool = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    started = time.perf_counter()
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    elapsed = time.perf_counter() - started
+    print(f"{len(statuses)} booking attempts, {len(spot_ids)} claims in {elapsed:.3f}s: "
+          f"{len(statuses) / elapsed:.0f} attempts/s, {len(spot_ids) / elapsed:.0f} claims/s")
+
+    # Every request either got its own spot or was told the lot is full
+    assert set(statuses) <= {201, 400}
+    assert len(spot_ids) == spots
+    assert not [spot for spot, n in Counter(spot_ids).items() if n > 1]
+
+    with app.app_context():
+        assert Reservation.query.count() == spots
+        assert db.session.query(Reservation.spot_id).distinct().count() == spots
+        assert ParkingSpot.query.filter_by(lot_id=lot_id, status="A").count() == 0
+
+
+def lose_claim_rounds(monkeypatch, lot_id, rounds):
+    """The first `rounds` candidate lists only hold spots that concurrent bookings already took."""
+    Row = namedtuple("Row", ["id"])
+    taken = [Row(spot.id) for spot in ParkingSpot.query.filter_by(lot_id=lot_id, status="O")]
+    calls = []
+
+    def candidates(lot_id, limit=reservation_api.CLAIM_CANDIDATES):
+        calls.append(lot_id)
+        return taken if len(calls) <= rounds else free_spot_candidates(lot_id, limit)
+
+    monkeypatch.setattr(reservation_api, "free_spot_candidates", candidates)
+    return calls
+
+
+def test_claim_keeps_trying_while_spots_are_free(app, client, user_headers, make_lot, monkeypatch):
+    lot_id = make_lot(3)
+    assert book(client, user_headers, lot_id).status_code == 201
+    with app.app_context():
+        calls = lose_claim_rounds(monkeypatch, lot_id, CLAIM_ROUNDS - 1)
+        assert claim_spot(lot_id) is not None
+        assert len(calls) == CLAIM_ROUNDS
+        db.session.rollback()
+
+
+def test_claim_rounds_exhausted_is_a_retryable_conflict(app, client, user_headers, make_lot, monkeypatch):
+    lot_id = make_lot(3)
+    assert book(client, user_headers, lot_id).status_code == 201
+    with app.app_context():
+        lose_claim_rounds(monkeypatch, lot_id, CLAIM_ROUNDS)
+    response = book(client, user_headers, lot_id, vehicle="KA02")
+    assert response.status_code == 409
+    assert "retry" in response.get_json()["error"]
+
+    with app.app_context():
+        assert Reservation.query.count() == 1
+        assert ParkingSpot.query.filter_by(lot_id=lot_id, status="A").count() == 2
+    monkeypatch.setattr(reservation_api, "free_spot_candidates", free_spot_candidates)
+    assert book(client, user_headers, lot_id, vehicle="KA02").status_code == 201
+
+
+def test_dashboard_tabs_page_through_their_own_filter(client, user_headers, make_lot):
+    lot_id = make_lot(5)
+    booked = [book(client, user_headers, lot_id).get_json()["reservation"] for _ in range(5)]
+    for res in booked[:3]:
+        client.patch(f"/api/reservations/{res['id']}", json={
+            "action": "released", "leaving_time": "2031-01-01T10:00:00+05:30",
+        }, headers=user_headers)
+
+    active = client.get("/api/reservations?active=true&limit=1", headers=user_headers).get_json()
+    assert [r["id"] for r in active["reservations"]] == [booked[3]["id"]]
+    more = client.get(f"/api/reservations?active=true&limit=1&cursor={active['next_cursor']}", headers=user_headers)
+    assert [r["id"] for r in more.get_json()["reservations"]] == [booked[4]["id"]]
+    assert more.get_json()["next_cursor"] is None
+
+    # History: closed ones only, newest first, across pages
+    history, cursor = [], None
+    while True:
+        url = "/api/reservations?active=false&order=desc&limit=2" + (f"&cursor={cursor}" if cursor else "")
+        page = client.get(url, headers=user_headers).get_json()
+        history += [r["id"] for r in page["reservations"]]
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+    assert history == [res["id"] for res in reversed(booked[:3])]
+
+
+def test_releasing_twice_is_rejected(app, client, login, user_headers, make_lot):
+    lot_id = make_lot(1)
+    reservation = book(client, user_headers, lot_id).get_json()["reservation"]
+    release = {"action": "released", "leaving_time": "2031-01-01T10:00:00+05:30"}
+    assert client.patch(f"/api/reservations/{reservation['id']}", json=release, headers=user_headers).status_code == 200
+
+    # The spot goes to someone else; a second release must leave it (and the revenue) alone
+    admin = login()
+    assert book(client, admin, lot_id).status_code == 201
+    revenue = client.get("/api/admin/summary", headers=admin).get_json()["total_revenue"]
+    again = client.patch(f"/api/reservations/{reservation['id']}", json=release, headers=user_headers)
+    assert again.status_code == 409
+    with app.app_context():
+        assert ParkingSpot.query.filter_by(lot_id=lot_id).one().status == "O"
+    assert client.get("/api/admin/summary", headers=admin).get_json()["total_revenue"] == revenue
@@ -0,0 +1,50 @@
+# tests/test_summary.py
+import pytest
+
+
+def book(client, headers, lot_id):
+    response = client.post("/api/reservations", json={"lot_id": lot_id, "vehicle_no": "KA01"}, headers=headers)
+    assert response.status_code == 201
+    return response.get_json()["reservation"]
+
+
+def release(client, headers, reservation, leaving_time):
+    response = client.patch(f"/api/reservations/{reservation['id']}", json={
+        "action": "released", "leaving_time": leaving_time,
+    }, headers=headers)
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def test_user_summary_aggregates(client, login, user_headers, make_lot):
+    north, south = make_lot(3, price=10, name="North"), make_lot(3, price=20, name="South")
+    first = book(client, user_headers, north)
+    book(client, user_headers, north)
+    third = book(client, user_headers, south)
+    # Someone else's booking must not show up
+    book(client, login(), south)
+
+    costs = [
+        release(client, user_headers, first, "2031-01-01T10:00:00+05:30")["parking_cost"],
+        release(client, user_headers, third, "2031-01-01T12:00:00+05:30")["parking_cost"],
+    ]
+
+    summary = client.get("/api/user/summary", headers=user_headers).get_json()
+    assert summary["total_bookings"] == 3
+    assert summary["active"] == 1
+    assert summary["past"] == 2
+    assert summary["total_cost"] == pytest.approx(round(sum(costs), 2))
+    assert sum(summary["monthly_cost"].values()) == pytest.approx(sum(costs))
+    assert summary["lot_usage"] == {"North": 2, "South": 1}
+
+
+def test_user_summary_is_refreshed_after_a_booking(client, user_headers, make_lot):
+    lot_id = make_lot(2)
+    empty = client.get("/api/user/summary", headers=user_headers).get_json()
+    assert empty["total_bookings"] == 0
+    assert empty["total_cost"] == 0
+
+    book(client, user_headers, lot_id)
+    summary = client.get("/api/user/summary", headers=user_headers).get_json()
+    assert summary["total_bookings"] == 1
+    assert summary["active"] == 1